@@ -0,0 +1,57 @@
+# --- PREENCHIMENTO AUTOMÁTICO DE VAGAS ---
+# Atribuição vagas x voluntários: cada vaga recebe no máximo um voluntário e cada voluntário fica
+# com no máximo uma vaga por horário (data + Horario). Cada horário é um emparelhamento bipartido:
+# dentro dele a escolha gulosa (vaga com menos candidatos primeiro, voluntário menos carregado) é
+# completada por caminhos aumentantes, o que preenche o máximo possível de vagas. Resolvido um
+# horário, quem ficou com vaga nele sai dos horários que o cruzam. A carga acumulada de um horário
+# para o próximo (em ordem de data) é o que equilibra a escala entre os voluntários.
+import numpy as np
+import pandas as pd
+
+
+def alocar(aptos, grupos, carga, sobreposicoes=None):
+    # aptos: matriz vagas x usuários (já sem quem está ocupado no horário de cada vaga)
+    # grupos: rótulo do horário de cada vaga, na ordem em que os horários devem ser resolvidos
+    # carga: atividades que cada usuário já tem no período
+    # sobreposicoes: rótulo -> rótulos de outros horários que o cruzam
+    # Devolve o usuário de cada vaga (-1 = sem)
+    escolha = np.full(len(aptos), -1, dtype=np.intp)
+    aptos = aptos.copy()
+    carga = np.asarray(carga, dtype=np.int64).copy()
+    codigos, rotulos = pd.factorize(pd.Series(grupos, dtype=object))
+    ordem = np.argsort(codigos, kind='stable')
+    por_grupo = np.split(ordem, np.flatnonzero(np.diff(codigos[ordem])) + 1) if len(ordem) else []
+    codigo = {r: g for g, r in enumerate(rotulos)}
+    for g, vagas in enumerate(por_grupo):
+        vagas = vagas[np.argsort(aptos[vagas].sum(axis=1), kind='stable')]  # escassez primeiro
+        dono = {}  # usuário -> vaga que ele ocupa neste horário
+        livres = np.ones(aptos.shape[1], dtype=bool)
+        for v in vagas:
+            candidatos = np.flatnonzero(aptos[v] & livres)
+            if len(candidatos):
+                u = candidatos[np.argmin(carga[candidatos])]
+                escolha[v], dono[u], livres[u] = u, v, False
+                carga[u] += 1
+            else:
+                _aumentar(v, aptos, escolha, dono, livres, carga, set())
+        if dono and sobreposicoes:
+            for outro in sobreposicoes.get(rotulos[g], ()):
+                aptos[np.ix_(por_grupo[codigo[outro]], list(dono))] = False
+    return escolha
+
+
+def _aumentar(v, aptos, escolha, dono, livres, carga, visitados):
+    # Todos os aptos a v já têm vaga neste horário: passa a vaga de um deles para outro apto a ela,
+    # recursivamente, até chegar a um voluntário livre (que é o único cuja carga aumenta)
+    candidatos = np.flatnonzero(aptos[v])
+    for u in candidatos[np.argsort(carga[candidatos], kind='stable')]:
+        if u in visitados:
+            continue
+        visitados.add(u)
+        if livres[u] or _aumentar(dono[u], aptos, escolha, dono, livres, carga, visitados):
+            if livres[u]:
+                livres[u] = False
+                carga[u] += 1
+            escolha[v], dono[u] = u, v
+            return True
+    return False
@@ -5,7 +5,15 @@ import pandas as pd
 from datetime import datetime, date
 import textwrap
 import re
-import time
+from espelho import EspelhoLocal, Sincronizador
+from conexao import ConexaoPlanilha
+from indices import IndiceConflitos, fatia_por_data
+from elegibilidade import visao_usuario
+from preparo import QuadroEventos
+from responsaveis import IndiceDias
+import paginacao
+import medicao
+import instantaneo
 
 # --- 1. CONEXÃO RESILIENTE ---
 @st.cache_resource
@@ -29,29 +37,65 @@ def get_gspread_client():
     except Exception:
         st.error("Erro crítico de conexão."); st.stop()
 
-@st.cache_data(ttl=300)
-def load_data_cached():
-    client = get_gspread_client()
-    for tentativa in range(3):
-        try:
-            ss = client.open_by_key("1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c")
-            sheet_ev = ss.worksheet("Calendario_Eventos")
-            data_ev = sheet_ev.get_all_records()
-            df_ev = pd.DataFrame(data_ev)
-            df_ev.columns = [c.strip() for c in df_ev.columns]
-            sheet_us = ss.worksheet("Usuarios") 
-            data_us = sheet_us.get_all_records()
-            df_us = pd.DataFrame(data_us) if data_us else pd.DataFrame(columns=['Email', 'Nome', 'Telefone', 'Departamentos', 'Nivel'])
-            df_us.columns = [c.strip() for c in df_us.columns]
-            return df_ev, df_us
-        except Exception:
-            if tentativa < 2: time.sleep(2); continue
-            else: st.error("Erro ao carregar dados."); st.stop()
-
-def get_sheets():
+@st.cache_resource
+def get_espelho():
     client = get_gspread_client()
-    ss = client.open_by_key("1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c")
-    return ss.worksheet("Calendario_Eventos"), ss.worksheet("Usuarios")
+    espelho = EspelhoLocal()
+    sinc = Sincronizador(espelho, ConexaoPlanilha(client, "1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c"))
+    try:
+        if espelho.vazio(): sinc.sincronizar()  # a conexão já repete erros de cota/servidor com espera exponencial
+    except Exception:
+        st.error("Erro ao carregar dados."); st.stop()
+    # A cada versão nova o próprio sincronizador já monta os quadros (e grava o instantâneo em disco
+    # para o próximo reinício): nenhuma sessão paga a recarga
+    def preparar_versao(versao):
+        df_ev, df_us = load_data_cached(versao)
+        mudanca = get_quadro_eventos().mudanca  # só as linhas alteradas, quando a versão anterior já estava montada
+        get_indice_conflitos().atualizar(df_ev, versao, mudanca)
+        get_indice_dias().atualizar(df_ev, versao, mudanca)
+        if espelho.liderar(sinc.dono, chave="instantaneo:app"):  # um processo grava, não todos
+            instantaneo.gravar("app", versao, espelho.id, mapa_niveis_num, (df_ev, df_us))
+    sinc.ao_atualizar(preparar_versao)
+    sinc.start()
+    return espelho, sinc
+
+# Um só quadro por versão, o mesmo objeto para todas as sessões: st.cache_resource não copia (o
+# st.cache_data desserializava uma cópia inteira a cada rerun). Somente leitura: quem precisa de
+# um recorte usa máscara/iloc, que devolvem objetos novos; nada altera estes quadros no lugar.
+@st.cache_resource(max_entries=2)
+def load_data_cached(versao):
+    medicao.falta("load_data_cached")
+    espelho, _ = get_espelho()
+    quadro = get_quadro_eventos()
+    if quadro.versao is None:  # depois de um reinício: quadros desta versão já prontos em disco
+        salvo = instantaneo.ler("app", versao, espelho.id, mapa_niveis_num)
+        if salvo is not None: quadro.guardar(salvo[0], versao); return salvo
+    df_ev = quadro.atualizar(espelho, versao)  # a partir da versão anterior, só as linhas alteradas
+    df_us = espelho.ler_aba("Usuarios", ['Email', 'Nome', 'Telefone', 'Departamentos', 'Nivel'])
+    return df_ev, df_us
+
+# Atividades que cada voluntário pode ver, por (e-mail, versão); _user fica fora da chave do cache.
+# Também compartilhada sem cópia: são só as posições em df_ev e as marcas de status do usuário.
+@st.cache_resource(max_entries=256)
+def visao_do_usuario(email, versao, _user):
+    medicao.falta("visao_do_usuario")
+    df_ev, _ = load_data_cached(versao)
+    deps = [d.strip() for d in str(_user['Departamentos']).split(",") if d.strip() and d.lower() not in ['nan', 'none']]
+    return visao_usuario(df_ev, mapa_niveis_num.get(_user['Nivel'], 0), deps, _user['Nome'])
+
+# Último quadro de eventos preparado: a versão seguinte é um remendo dele, não uma preparação completa
+@st.cache_resource
+def get_quadro_eventos():
+    return QuadroEventos(mapa_niveis_num)
+
+@st.cache_resource
+def get_indice_conflitos():
+    return IndiceConflitos()
+
+# Painel público: data -> HTML pronto e contagem de vagas, montado uma vez por versão para todas as datas
+@st.cache_resource
+def get_indice_dias():
+    return IndiceDias("atividade", cores_niveis)
 
 # --- 2. CONFIGURAÇÕES ---
 cores_niveis = {
@@ -88,10 +132,32 @@ def confirmar_dialog(linha, row, col_idx):
     st.write("Deseja confirmar sua participação nesta escala?")
     
     if st.button("Confirmar Inscrição", type="primary", use_container_width=True):
-        with st.spinner("Salvando..."):
-            sheet_ev, _ = get_sheets()
-            sheet_ev.update_cell(linha, col_idx, st.session_state.user['Nome'])
-            st.cache_data.clear(); st.rerun()
+        with st.spinner("Salvando..."), medicao.medir("app", "inscricao", linha=linha):
+            espelho, sinc = get_espelho()
+            versao_antes = espelho.versao()
+            # Só grava numa vaga que ainda está vazia no espelho: se outra pessoa pegou esta, tenta a outra
+            ticket = next((t for c in (col_idx, 17 - col_idx) if (t := espelho.atualizar_celula("Calendario_Eventos", linha, c, st.session_state.user['Nome'], esperado="")) is not None), None)
+        if ticket is None:
+            st.error("😕 Esta atividade acabou de ser preenchida por outra pessoa.")
+        else:
+            sinc.acordar()
+            get_indice_conflitos().ocupar(row, st.session_state.user['Nome'], versao_antes, espelho.versao())
+            st.session_state.escritas[ticket] = "Inscrição"
+            st.rerun()
+
+@st.fragment(run_every=2)
+def acompanhar_escritas():
+    espelho, _ = get_espelho()
+    for ticket, (status, erro) in espelho.status_escritas(list(st.session_state.escritas)).items():
+        if status == "ok": st.toast(f"✅ {st.session_state.escritas.pop(ticket)}: gravado na planilha.")
+        elif status in ("erro", "substituida"): st.toast(f"⚠️ {st.session_state.escritas.pop(ticket)}: não foi gravado na planilha ({erro}).")
+    if not st.session_state.escritas: st.rerun()
+
+# Planilha fora do ar: a tela segue com a última cópia boa do espelho e diz de quando ela é
+def aviso_desatualizado(sinc):
+    if not sinc.desatualizado(): return
+    quando = sinc.atualizado_em()
+    st.warning(f"⚠️ Sem conexão com a planilha no momento. Exibindo os dados de {quando:%d/%m às %H:%M}." if quando else "⚠️ Sem conexão com a planilha no momento. Exibindo os últimos dados salvos.")
 
 # --- 4. STYLE ---
 st.set_page_config(page_title="Escala Indaiatuba", layout="centered")
@@ -109,9 +175,16 @@ st.markdown("""
 
 if 'user' not in st.session_state: st.session_state.user = None
 if 'ver_painel' not in st.session_state: st.session_state.ver_painel = False
+if 'escritas' not in st.session_state: st.session_state.escritas = {}
 
-df_ev, df_us = load_data_cached()
-df_ev['Data_Dt'] = pd.to_datetime(df_ev['Data Específica'], errors='coerce', dayfirst=True)
+med = medicao.iniciar("app")
+with med.etapa("espelho"): espelho, sinc = get_espelho()
+med.acompanhar_api(sinc.conexao)
+versao_dados = espelho.versao()
+with med.etapa("carregar", cache="load_data_cached"): df_ev, df_us = load_data_cached(versao_dados)
+med.anotar(versao=versao_dados, linhas_eventos=len(df_ev))
+if st.session_state.escritas: acompanhar_escritas()
+aviso_desatualizado(sinc)
 deps_na_planilha = sorted([d for d in df_ev['Departamento'].unique() if str(d).strip() != ""])
 
 # --- 5. FLUXO DE TELAS ---
@@ -121,21 +194,15 @@ if st.session_state.ver_painel:
     st.title("🏃‍♂️ Responsáveis do Dia")
     if st.button("⬅️ Voltar"): st.session_state.ver_painel = False; st.rerun()
     data_sel = st.date_input("Filtrar data:", value=date.today())
-    df_dia = df_ev[df_ev['Data_Dt'].dt.date == data_sel].copy()
-    if df_dia.empty: st.warning("Nenhuma atividade encontrada.")
-    else:
-        for (nivel, nome_ev, horario), grupo in df_dia.sort_values(['Horario', 'Nível']).groupby(['Nível', 'Nome do Evento', 'Horario']):
-            bg_c = cores_niveis.get(str(nivel).strip(), "#f8f9fa")
-            tx_c = "#FFFFFF" if "AV2" in str(nivel) else "#000000"
-            html_parts = [f'<div class="public-card" style="background-color: {bg_c}; color: {tx_c};">', f'<div class="public-title" style="border-color: {tx_c}44;">{nivel} - {nome_ev} - {horario}</div>']
-            for _, row in grupo.iterrows():
-                v1, v2 = str(row['Voluntário 1']).strip(), str(row['Voluntário 1']).strip() # (Ajuste técnico v1/v2)
-                v1, v2 = str(row['Voluntário 1']).strip(), str(row['Voluntário 2']).strip()
-                v1_st = f'<span class="vol-filled">🟢 {v1}</span>' if v1 and v1 not in ["", "---", "nan", "None"] else '<span class="vol-empty">🔴 Vaga Aberta</span>'
-                v2_st = f'<span class="vol-filled">🟢 {v2}</span>' if v2 and v2 not in ["", "---", "nan", "None"] else '<span class="vol-empty">🔴 Vaga Aberta</span>'
-                html_parts.append(f'<div class="depto-box"><b>🏢 {row["Departamento"]}</b><div class="vol-status">{v1_st}{v2_st}</div></div>')
-            html_parts.append('</div>')
-            st.markdown("".join(html_parts), unsafe_allow_html=True)
+    with med.etapa("responsaveis"):
+        indice_dias = get_indice_dias().atualizar(df_ev, versao_dados, get_quadro_eventos().mudanca)
+        html_dia = indice_dias.html(data_sel)
+        if not html_dia: st.warning("Nenhuma atividade encontrada.")
+        else:
+            preenchidas, abertas = indice_dias.vagas(data_sel)
+            st.caption(f"🟢 {preenchidas} vagas preenchidas · 🔴 {abertas} vagas abertas")
+            st.markdown(html_dia, unsafe_allow_html=True)
+    med.concluir("publico")
     st.stop()
 
 # B) LOGIN
@@ -154,6 +221,7 @@ if st.session_state.user is None:
                 st.rerun()
             else: 
                 st.error("⚠️ Acesso não autorizado. E-mail não encontrado na base de dados.")
+    med.concluir("login")
     st.stop()
 
 # --- 6. DASHBOARD (LOGADO) ---
@@ -167,71 +235,51 @@ f_depto_pill = st.pills("Departamento:", ["Todos"] + meus_deps, default="Todos")
 c1, c2 = st.columns(2)
 with c1: f_nivel = st.selectbox("Filtrar por Nível:", ["Todos"] + list(cores_niveis.keys()))
 with c2: f_data = st.date_input("A partir de:", value=date.today())
+modo_pag, tam_pag = paginacao.controles("pag_dash")
 
-# --- 6. DASHBOARD (LOGADO) ---
-# ... (mantenha as definições de meus_deps, st.title e os filtros de pills/selectbox)
-
-# Preparação dos dados
-df_ev['Niv_N'] = df_ev['Nível'].astype(str).str.strip().map(mapa_niveis_num).fillna(99)
-df_ev = df_ev.sort_values(by=['Data_Dt', 'Horario']).reset_index(drop=False)
-
-# Filtro inicial: Departamento e Data
-df_f = df_ev[df_ev['Departamento'].isin(meus_deps)].copy()
-
-# --- NOVA LÓGICA DE RESTRIÇÃO POR TIPO ---
-user_niv_num = mapa_niveis_num.get(user['Nivel'], 0)
-
-# 1. Regra: Nível da atividade e superiores (Aceita >= nível da atividade)
-# Ou seja, se o nível do usuário for maior ou igual ao nível exigido
-cond_mesmo_nivel = (df_f['Tipo'] == "Nível da atividade e superiores") & (user_niv_num >= df_f['Niv_N'])
-
-# 2. Regra: Nível Superior (Aceita apenas > nível da atividade)
-# Ou seja, o usuário precisa ter um nível estritamente maior que o da atividade
-cond_nivel_estrito = (df_f['Tipo'] == "Nível Superior") & (user_niv_num > df_f['Niv_N'])
-
-# 3. Caso a coluna Tipo esteja vazia, definimos um comportamento padrão (ex: igual à regra 1)
-cond_padrao = (~df_f['Tipo'].isin(["Nível Superior", "Nível da atividade e superiores"])) & (user_niv_num >= df_f['Niv_N'])
-
-# Aplicação final do filtro de permissão + data
-df_f = df_f[(cond_mesmo_nivel | cond_nivel_estrito | cond_padrao) & (df_f['Data_Dt'].dt.date >= f_data)]
-# ----------------------------------------
-
-# ... (restante do código: filtros de pills de status e loop de cards)
-
-if f_depto_pill != "Todos": df_f = df_f[df_f['Departamento'] == f_depto_pill]
-if f_nivel != "Todos": df_f = df_f[df_f['Nível'].astype(str).str.strip() == f_nivel]
-
+# Elegibilidade (departamentos + regras de nível/Tipo) e status de cada vaga vêm prontos da visão
+# do usuário; aqui só combinamos as máscaras dos filtros escolhidos.
+with med.etapa("filtros", cache="visao_do_usuario"):
+    v = visao_do_usuario(str(user['Email']).lower(), versao_dados, user)
+    v = v.iloc[slice(*fatia_por_data(v['Data_Dt'].to_numpy(), f_data))]  # a visão segue a ordem de data: "a partir de" é busca binária
+    sel = pd.Series(True, index=v.index)
+    if f_depto_pill != "Todos": sel &= v['Departamento'] == f_depto_pill
+    if f_nivel != "Todos": sel &= v['Nível'] == f_nivel
+    if filtro_status == "Minhas Inscrições": sel &= v['Minha']
+    elif filtro_status == "Vagas Abertas": sel &= v['Aberta']
+    elif filtro_status == "Vagas Vazias": sel &= v['Vazia']
+    df_f = df_ev.iloc[v['Pos'][sel]]
 nome_u_comp = user['Nome'].lower().strip()
-if filtro_status == "Minhas Inscrições":
-    df_f = df_f[(df_f['Voluntário 1'].astype(str).str.lower().str.strip() == nome_u_comp) | (df_f['Voluntário 2'].astype(str).str.lower().str.strip() == nome_u_comp)]
-elif filtro_status == "Vagas Abertas":
-    df_f = df_f[(df_f['Voluntário 1'].astype(str).str.strip() == "") | (df_f['Voluntário 2'].astype(str).str.strip() == "")]
-elif filtro_status == "Vagas Vazias":
-    df_f = df_f[(df_f['Voluntário 1'].astype(str).str.strip() == "") & (df_f['Voluntário 2'].astype(str).str.strip() == "")]
-
-for i, row in df_f.iterrows():
-    v1, v2 = str(row['Voluntário 1']).strip(), str(row['Voluntário 2']).strip()
-    dia_abr = dias_semana.get(row['Data_Dt'].strftime('%A'), "")[:3]
-    bg = cores_niveis.get(str(row['Nível']).strip(), "#FFFFFF")
-    tx = "#FFFFFF" if "AV2" in str(row['Nível']) else "#000000"
-    st_vaga = "🟢 Cheio" if v1 and v2 else ("🟡 1 Vaga" if v1 or v2 else "🔴 2 Vagas")
-    st.markdown(f'<div class="card-container" style="background-color: {bg}; color: {tx};"><div style="display: flex; justify-content: space-between; font-weight: 800;"><span>{st_vaga}</span><span>{dia_abr} - {row["Data_Dt"].strftime("%d/%m")}</span></div><h2 style="margin: 5px 0; font-size: 1.4em; color: {tx};">{row["Nível"]} - {row["Nome do Evento"]}</h2><div style="font-weight: 800; margin-bottom: 10px;">🏢 {row["Departamento"]} | ⏰ {row["Horario"]}</div><div style="background: rgba(0,0,0,0.07); padding: 10px; border-radius: 8px;"><b>Vol. 1:</b> {v1 if v1 else "---"}<br><b>Vol. 2:</b> {v2 if v2 else "---"}</div></div>', unsafe_allow_html=True)
-    if (v1.lower() == nome_u_comp or v2.lower() == nome_u_comp): st.button("✅ INSCRITO", key=f"bi_{i}", disabled=True, use_container_width=True)
-    elif v1 and v2: st.button("🚫 CHEIO", key=f"bf_{i}", disabled=True, use_container_width=True)
-    else:
-        if st.button("Quero me inscrever", key=f"bq_{i}", type="primary", use_container_width=True):
-            conflito = df_ev[
-                (df_ev['Data Específica'] == row['Data Específica']) & 
-                (df_ev['Horario'] == row['Horario']) & 
-                ((df_ev['Voluntário 1'].astype(str).str.lower().str.strip() == nome_u_comp) | 
-                 (df_ev['Voluntário 2'].astype(str).str.lower().str.strip() == nome_u_comp))
-            ]
-            if not conflito.empty:
-                conflito_dialog(conflito.iloc[0])
-            else:
-                confirmar_dialog(int(row['index'])+2, row, 8 if v1 == "" else 9)
+
+# Só a página atual vira cartão; as chaves dos botões continuam presas ao índice original da linha
+df_pag = paginacao.pagina_atual(df_f, "pag_dash", modo_pag, tam_pag, (filtro_status, f_depto_pill, f_nivel, f_data))
+with med.etapa("cartoes", linhas=len(df_pag)):
+    for i, row in df_pag.iterrows():
+        v1, v2 = str(row['Voluntário 1']).strip(), str(row['Voluntário 2']).strip()
+        dia_abr = dias_semana.get(row['Data_Dt'].strftime('%A'), "")[:3]
+        bg = cores_niveis.get(str(row['Nível']).strip(), "#FFFFFF")
+        tx = "#FFFFFF" if "AV2" in str(row['Nível']) else "#000000"
+        st_vaga = "🟢 Cheio" if v1 and v2 else ("🟡 1 Vaga" if v1 or v2 else "🔴 2 Vagas")
+        st.markdown(f'<div class="card-container" style="background-color: {bg}; color: {tx};"><div style="display: flex; justify-content: space-between; font-weight: 800;"><span>{st_vaga}</span><span>{dia_abr} - {row["Data_Dt"].strftime("%d/%m")}</span></div><h2 style="margin: 5px 0; font-size: 1.4em; color: {tx};">{row["Nível"]} - {row["Nome do Evento"]}</h2><div style="font-weight: 800; margin-bottom: 10px;">🏢 {row["Departamento"]} | ⏰ {row["Horario"]}</div><div style="background: rgba(0,0,0,0.07); padding: 10px; border-radius: 8px;"><b>Vol. 1:</b> {v1 if v1 else "---"}<br><b>Vol. 2:</b> {v2 if v2 else "---"}</div></div>', unsafe_allow_html=True)
+        if (v1.lower() == nome_u_comp or v2.lower() == nome_u_comp): st.button("✅ INSCRITO", key=f"bi_{i}", disabled=True, use_container_width=True)
+        elif v1 and v2: st.button("🚫 CHEIO", key=f"bf_{i}", disabled=True, use_container_width=True)
+        else:
+            if st.button("Quero me inscrever", key=f"bq_{i}", type="primary", use_container_width=True):
+                conflito = get_indice_conflitos().atualizar(df_ev, versao_dados, get_quadro_eventos().mudanca).conflito(row['Data Específica'], row['Horario'], nome_u_comp)
+                if conflito:
+                    conflito_dialog(conflito)
+                else:
+                    confirmar_dialog(int(i)+2, row, 8 if v1 == "" else 9)
+paginacao.navegacao("pag_dash")
 
 st.divider()
-if st.button("🔄 Sincronizar"): st.cache_data.clear(); st.rerun()
+if (quando := sinc.atualizado_em()): st.caption(f"🕒 Dados atualizados em {quando:%d/%m às %H:%M}")
+if st.button("🔄 Sincronizar"): sinc.recarregar(); st.toast("🔄 Sincronização pedida. Os dados novos aparecem em instantes.")
 if st.button("Sair"): st.session_state.user = None; st.rerun()
 
+# Diagnóstico do rerun: ?debug=1 na URL, só para quem está na aba Diretores
+if medicao.depuracao_pedida() and str(user['Email']).lower() in espelho.ler_aba("Diretores", ['Email', 'Departamento'])['Email'].astype(str).str.lower().values:
+    medicao.mostrar(med, "painel")
+else:
+    med.concluir("painel")
+
@@ -2,10 +2,19 @@ import streamlit as st
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import textwrap
 import re
 import time
+from espelho import EspelhoLocal, Sincronizador
+from conexao import ConexaoPlanilha
+from indices import IndiceConflitos, IndiceDatas
+from elegibilidade import MotorElegibilidade
+from preparo import QuadroEventos
+import paginacao
+import medicao
+import instantaneo
+import lote
 
 # --- 1. CONEXÃO RESILIENTE ---
 @st.cache_resource
@@ -29,25 +38,60 @@ def get_gspread_client():
     except Exception:
         st.error("Erro crítico de conexão."); st.stop()
 
-@st.cache_data(ttl=60)
-def load_admin_data():
+@st.cache_resource
+def get_espelho():
     client = get_gspread_client()
+    espelho = EspelhoLocal()
+    sinc = Sincronizador(espelho, ConexaoPlanilha(client, "1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c"))
     try:
-        ss = client.open_by_key("1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c")
-        df_ev = pd.DataFrame(ss.worksheet("Calendario_Eventos").get_all_records())
-        df_ev.columns = [c.strip() for c in df_ev.columns]
-        df_us = pd.DataFrame(ss.worksheet("Usuarios").get_all_records())
-        df_us.columns = [c.strip() for c in df_us.columns]
-        df_dir = pd.DataFrame(ss.worksheet("Diretores").get_all_records())
-        df_dir.columns = [c.strip() for c in df_dir.columns]
-        return df_ev, df_us, df_dir
+        if espelho.vazio(): sinc.sincronizar()
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}"); st.stop()
+    # A cada versão nova o próprio sincronizador já monta os quadros (e grava o instantâneo em disco
+    # para o próximo reinício): nenhuma sessão paga a recarga
+    def preparar_versao(versao):
+        quadros = load_admin_data(versao)
+        mudanca = get_quadro_eventos().mudanca  # só as linhas alteradas, quando a versão anterior já estava montada
+        get_indice_conflitos().atualizar(quadros[0], versao, mudanca)
+        get_indice_datas().atualizar(quadros[0], versao, mudanca)
+        if espelho.liderar(sinc.dono, chave="instantaneo:admin"):  # um processo grava, não todos
+            instantaneo.gravar("admin", versao, espelho.id, mapa_niveis_num, quadros)
+    sinc.ao_atualizar(preparar_versao)
+    sinc.start()
+    return espelho, sinc
 
-def get_sheets():
-    client = get_gspread_client()
-    ss = client.open_by_key("1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c")
-    return ss.worksheet("Calendario_Eventos"), ss.worksheet("Usuarios")
+# Quadros compartilhados entre as sessões sem cópia (cache_resource); só leitura, os filtros
+# abaixo sempre geram recortes novos
+@st.cache_resource(max_entries=2)
+def load_admin_data(versao):
+    medicao.falta("load_admin_data")
+    espelho, _ = get_espelho()
+    quadro = get_quadro_eventos()
+    if quadro.versao is None:  # depois de um reinício: quadros desta versão já prontos em disco
+        salvo = instantaneo.ler("admin", versao, espelho.id, mapa_niveis_num)
+        if salvo is not None: quadro.guardar(salvo[0], versao); return salvo
+    df_ev = quadro.atualizar(espelho, versao)  # a partir da versão anterior, só as linhas alteradas
+    df_us = espelho.ler_aba("Usuarios")
+    df_dir = espelho.ler_aba("Diretores")
+    return df_ev, df_us, df_dir
+
+# Último quadro de eventos preparado: a versão seguinte é um remendo dele, não uma preparação completa
+@st.cache_resource
+def get_quadro_eventos():
+    return QuadroEventos(mapa_niveis_num)
+
+@st.cache_resource
+def get_indice_conflitos():
+    return IndiceConflitos()
+
+@st.cache_resource
+def get_indice_datas():
+    return IndiceDatas()
+
+@st.cache_resource(max_entries=2)
+def get_motor_elegibilidade(versao, _df_us):
+    medicao.falta("get_motor_elegibilidade")
+    return MotorElegibilidade(_df_us, mapa_niveis_num)
 
 # --- 2. CONFIGURAÇÕES ---
 cores_niveis = {
@@ -68,35 +112,118 @@ def usuario_existe_dialog(email):
         st.rerun()
 
 @st.dialog("Gerenciar Inscrição")
-def gerenciar_inscricao_dialog(linha_planilha, row_data, v_index, df_us, df_ev):
+def gerenciar_inscricao_dialog(linha_planilha, row_data, v_index, df_us):
     st.subheader("Inscrever Voluntário")
     st.info(f"📍 {row_data['Departamento']} | ⏰ {row_data['Horario']}")
-    nivel_atividade = mapa_niveis_num.get(str(row_data['Nível']).strip(), 0)
-    usuarios_aptos = []
-    for _, u in df_us.iterrows():
-        u_deps = [d.strip() for d in str(u['Departamentos']).split(",")]
-        u_nivel = mapa_niveis_num.get(str(u['Nivel']).strip(), 0)
-        if row_data['Departamento'] in u_deps and u_nivel >= nivel_atividade:
-            conflito = df_ev[(df_ev['Data Específica'] == row_data['Data Específica']) & (df_ev['Horario'] == row_data['Horario']) & ((df_ev['Voluntário 1'] == u['Nome']) | (df_ev['Voluntário 2'] == u['Nome']))]
-            if conflito.empty:
-                usuarios_aptos.append(f"{u['Nome']} ({u['Nivel']})")
+    indice = get_indice_conflitos()
+    motor = get_motor_elegibilidade(versao_dados, df_us)
+    aptos = motor.aptos(row_data['Departamento'], row_data['Nível'], row_data.get('Tipo', ''), indice.ocupados(row_data['Data Específica'], row_data['Horario']))
+    # Carga de cada apto na semana da atividade, para o diretor dividir as vagas
+    usuarios_aptos = [f"{r} · {indice.carga_semanal(n, row_data['Data_Dt'])} na semana" for n, r in zip(motor.nomes[aptos], motor.rotulos(aptos))]
     if not usuarios_aptos:
         st.warning("Nenhum voluntário disponível/apto para este horário.")
     else:
         u_selecionado = st.selectbox("Selecione o Voluntário:", [""] + sorted(usuarios_aptos))
         if st.button("Confirmar Inscrição", type="primary", use_container_width=True) and u_selecionado:
             nome_final = u_selecionado.split(" (")[0]
-            sheet_ev, _ = get_sheets()
-            sheet_ev.update_cell(linha_planilha, v_index, nome_final)
-            st.cache_data.clear(); st.success("Inscrito!"); time.sleep(1); st.rerun()
+            with medicao.medir("admin", "inscricao", linha=linha_planilha):
+                espelho, sinc = get_espelho()
+                versao_antes = espelho.versao()
+                # Só grava se a vaga ainda tem o que a tela mostrava (outro diretor pode ter preenchido)
+                ticket = espelho.atualizar_celula("Calendario_Eventos", linha_planilha, v_index, nome_final, esperado=row_data[f'Voluntário {v_index - 7}'])
+            if ticket is None:
+                st.error("Esta vaga mudou desde que a tela foi aberta. Feche e confira a escala de novo.")
+            else:
+                sinc.acordar()
+                indice.ocupar(row_data, nome_final, versao_antes, espelho.versao())
+                st.session_state.escritas[ticket] = f"Inscrição de {nome_final}"
+                st.success("Inscrito!"); time.sleep(1); st.rerun()
 
 @st.dialog("Cancelar Inscrição")
-def cancelar_dialog(linha, col_idx, nome):
+def cancelar_dialog(linha, col_idx, nome, row_data):
     st.warning(f"Tem certeza que deseja remover **{nome}** desta atividade?")
     if st.button("Sim, Remover", type="primary", use_container_width=True):
-        sheet_ev, _ = get_sheets()
-        sheet_ev.update_cell(linha, col_idx, "")
-        st.cache_data.clear(); st.success("Removido!"); time.sleep(1); st.rerun()
+        with medicao.medir("admin", "remocao", linha=linha):
+            espelho, sinc = get_espelho()
+            versao_antes = espelho.versao()
+            ticket = espelho.atualizar_celula("Calendario_Eventos", linha, col_idx, "", esperado=nome)
+        if ticket is None:
+            st.error("Esta vaga mudou desde que a tela foi aberta. Feche e confira a escala de novo.")
+        else:
+            sinc.acordar()
+            get_indice_conflitos().liberar(row_data, nome, versao_antes, espelho.versao())
+            st.session_state.escritas[ticket] = f"Remoção de {nome}"
+            st.success("Removido!"); time.sleep(1); st.rerun()
+
+# Plano de uma ação em lote: mostra o que vai ser gravado e o que foi barrado (com o motivo) e grava
+# as alterações aprovadas numa escrita só. Ao gravar, o plano é conferido de novo com os dados do
+# momento (lote.validar) e cada célula só é gravada se ainda tem o valor que o plano viu; o que não
+# passar fica num aviso para o próximo rerun. `descartar`: chave do session_state que deixa de valer
+# depois da gravação (seleção ou proposta).
+def aplicar_plano(plano, rotulo, chave, descartar=None):
+    if plano is None or plano.empty:
+        st.info("Nenhuma vaga a alterar."); return
+    ok, barradas = plano[plano['motivo'] == ""], plano[plano['motivo'] != ""]
+    st.write(f"✅ **{len(ok)}** alterações prontas · ⛔ **{len(barradas)}** barradas")
+    colunas = ['Data Específica', 'Horario', 'Departamento', 'Nome do Evento', 'Vaga', 'Atual', 'valor']
+    if not ok.empty:
+        with st.expander("Ver alterações"): st.dataframe(ok[colunas].rename(columns={'valor': 'Novo'}), hide_index=True, use_container_width=True)
+    if not barradas.empty:
+        with st.expander("Ver vagas barradas"): st.dataframe(barradas[colunas + ['motivo']].rename(columns={'valor': 'Novo', 'motivo': 'Motivo'}), hide_index=True, use_container_width=True)
+    if st.button(f"Gravar {len(ok)} alterações", type="primary", disabled=ok.empty, use_container_width=True, key=chave):
+        with medicao.medir("admin", "lote", celulas=len(ok)):
+            espelho, sinc = get_espelho()
+            indice = get_indice_conflitos()
+            conferido = lote.validar(ok, df_ev, get_motor_elegibilidade(versao_dados, df_us), indice)
+            aceitas = conferido[conferido['motivo'] == ""]
+            versao_antes = espelho.versao()
+            tickets = espelho.atualizar_celulas("Calendario_Eventos", zip(aceitas['linha'], aceitas['coluna'], aceitas['valor'], aceitas['Atual']))
+            gravadas = pd.Series([t is not None for t in tickets], index=aceitas.index, dtype=bool)
+            barradas = pd.concat([conferido[conferido['motivo'] != ""], aceitas[~gravadas].assign(motivo="a vaga mudou durante a gravação")])
+            aceitas, tickets = aceitas[gravadas], [t for t in tickets if t is not None]
+            if tickets:
+                sinc.acordar()
+                indice.aplicar([(r, r['Atual'] or None, r['valor'] or None) for _, r in aceitas.iterrows()], versao_antes, espelho.versao())
+                st.session_state.escritas[tuple(tickets)] = (f"{rotulo} ({len(aceitas)} vagas)", [f"{r['Data Específica']} {r['Horario']} {r['Nome do Evento']} (vaga {r['Vaga']})" for _, r in aceitas.iterrows()])
+            if not barradas.empty: st.session_state.aviso_lote = (rotulo, barradas[colunas + ['motivo']])
+        if descartar: st.session_state.pop(descartar, None)
+        st.rerun()
+
+# on_change da tabela de vagas: o data_editor informa as marcações pela posição na tabela; a seleção
+# fica guardada por vaga (linha, coluna da planilha) e a tabela é montada de novo a partir dela
+def marcar_vagas(chave_tabela, chaves):
+    for pos, mudanca in st.session_state[chave_tabela]["edited_rows"].items():
+        if "Selecionar" in mudanca:
+            if mudanca["Selecionar"]: st.session_state.lote_sel.add(chaves[int(pos)])
+            else: st.session_state.lote_sel.discard(chaves[int(pos)])
+    st.session_state.lote_edicao += 1
+
+@st.fragment(run_every=2)
+def acompanhar_escritas():
+    # Escrita avulsa: ticket -> rótulo. Lote: tupla de tickets -> (rótulo, descrição de cada item);
+    # o lote só é anunciado quando todos os itens terminaram, com quantos entraram e quais falharam
+    espelho, _ = get_espelho()
+    todos = [t for chave in st.session_state.escritas for t in (chave if isinstance(chave, tuple) else (chave,))]
+    estados = espelho.status_escritas(todos)
+    for chave in list(st.session_state.escritas):
+        if not isinstance(chave, tuple):
+            status, erro = estados.get(chave, ("pendente", None))
+            if status == "ok": st.toast(f"✅ {st.session_state.escritas.pop(chave)}: gravado na planilha.")
+            elif status in ("erro", "substituida"): st.toast(f"⚠️ {st.session_state.escritas.pop(chave)}: não foi gravado na planilha ({erro}).")
+            continue
+        lote_estados = [estados.get(t, ("pendente", None)) for t in chave]
+        if any(status in ("pendente", "enviando") for status, _ in lote_estados): continue
+        rotulo, itens = st.session_state.escritas.pop(chave)
+        falhas = [f"{item} ({erro})" for item, (status, erro) in zip(itens, lote_estados) if status != "ok"]
+        if not falhas: st.toast(f"✅ {rotulo}: gravado na planilha.")
+        else: st.toast(f"⚠️ {rotulo}: {len(chave) - len(falhas)} de {len(chave)} gravados na planilha. Não gravados: {'; '.join(falhas[:5])}" + (f" e mais {len(falhas) - 5}." if len(falhas) > 5 else "."))
+    if not st.session_state.escritas: st.rerun()
+
+# Planilha fora do ar: a tela segue com a última cópia boa do espelho e diz de quando ela é
+def aviso_desatualizado(sinc):
+    if not sinc.desatualizado(): return
+    quando = sinc.atualizado_em()
+    st.warning(f"⚠️ Sem conexão com a planilha no momento. Exibindo os dados de {quando:%d/%m às %H:%M}." if quando else "⚠️ Sem conexão com a planilha no momento. Exibindo os últimos dados salvos.")
 
 # --- 4. STYLE ---
 st.set_page_config(page_title="Gestor ProVida", layout="wide")
@@ -112,8 +239,17 @@ st.markdown("""
 # --- 5. LOGIN ---
 if 'admin' not in st.session_state: st.session_state.admin = None
 if 'menu_ativo' not in st.session_state: st.session_state.menu_ativo = "escala"
+if 'escritas' not in st.session_state: st.session_state.escritas = {}
 
-df_ev, df_us, df_dir = load_admin_data()
+med = medicao.iniciar("admin")
+with med.etapa("espelho"): espelho, sinc = get_espelho()
+med.acompanhar_api(sinc.conexao)
+versao_dados = espelho.versao()
+with med.etapa("carregar", cache="load_admin_data"): df_ev, df_us, df_dir = load_admin_data(versao_dados)
+with med.etapa("indice_conflitos"): get_indice_conflitos().atualizar(df_ev, versao_dados, get_quadro_eventos().mudanca)
+med.anotar(versao=versao_dados, linhas_eventos=len(df_ev))
+if st.session_state.escritas: acompanhar_escritas()
+aviso_desatualizado(sinc)
 
 if st.session_state.admin is None:
     st.title("🛡️ Painel do Gestor")
@@ -125,22 +261,30 @@ if st.session_state.admin is None:
                 st.rerun()
             else:
                 st.error("Acesso negado. E-mail não consta na lista de Diretores.")
+    med.concluir("login")
     st.stop()
 
 # --- NOVO: LÓGICA DE MULTIPLOS DEPARTAMENTOS ---
 string_deptos = df_dir[df_dir['Email'].astype(str).str.lower() == st.session_state.admin]['Departamento'].iloc[0]
 deptos_autorizados = [d.strip() for d in str(string_deptos).split(",")]
 
+# Voluntários que pertencem a QUALQUER um dos departamentos do diretor
+df_us_filtrado = df_us[df_us['Departamentos'].apply(lambda x: any(d in [i.strip() for i in str(x).split(",")] for d in deptos_autorizados))]
+
 # --- 6. NAVEGAÇÃO SUPERIOR ---
-c_nav1, c_nav2, c_nav3 = st.columns([1, 1, 0.5])
+c_nav1, c_nav2, c_nav4, c_nav3 = st.columns([1, 1, 1, 0.5])
 with c_nav1:
-    if st.button("📅 Gestão de Escala", use_container_width=True, type="secondary" if st.session_state.menu_ativo == "usuarios" else "primary"):
+    if st.button("📅 Gestão de Escala", use_container_width=True, type="primary" if st.session_state.menu_ativo == "escala" else "secondary"):
         st.session_state.menu_ativo = "escala"
         st.rerun()
 with c_nav2:
-    if st.button("👥 Gestão de Usuários", use_container_width=True, type="secondary" if st.session_state.menu_ativo == "escala" else "primary"):
+    if st.button("👥 Gestão de Usuários", use_container_width=True, type="primary" if st.session_state.menu_ativo == "usuarios" else "secondary"):
         st.session_state.menu_ativo = "usuarios"
         st.rerun()
+with c_nav4:
+    if st.button("🧩 Ações em Lote", use_container_width=True, type="primary" if st.session_state.menu_ativo == "lote" else "secondary"):
+        st.session_state.menu_ativo = "lote"
+        st.rerun()
 with c_nav3:
     if st.button("🚪 Sair", use_container_width=True):
         st.session_state.admin = None
@@ -153,7 +297,7 @@ st.divider()
 if st.session_state.menu_ativo == "usuarios":
     st.title(f"Gestão de Voluntários")
     st.info(f"Gerenciando: {', '.join(deptos_autorizados)}")
-    aba1, aba2 = st.tabs(["Criar Novo", "Alterar Existente"])
+    aba1, aba2, aba3 = st.tabs(["Criar Novo", "Alterar Existente", "Importar CSV"])
     
     with aba1:
         with st.form("novo_user"):
@@ -168,13 +312,12 @@ if st.session_state.menu_ativo == "usuarios":
                 if new_email in df_us['Email'].astype(str).str.lower().values:
                     usuario_existe_dialog(new_email)
                 else:
-                    _, sheet_us = get_sheets()
-                    sheet_us.append_row([new_email, new_nome, new_tel, ",".join(new_deps), new_niv])
-                    st.cache_data.clear(); st.success("Cadastrado!"); time.sleep(1); st.rerun()
+                    espelho, sinc = get_espelho()
+                    ticket = espelho.acrescentar_linha("Usuarios", [new_email, new_nome, new_tel, ",".join(new_deps), new_niv]); sinc.acordar()
+                    st.session_state.escritas[ticket] = f"Cadastro de {new_email}"
+                    st.success("Cadastrado!"); time.sleep(1); st.rerun()
 
     with aba2:
-        # Filtra voluntários que pertencem a QUALQUER um dos departamentos do diretor
-        df_us_filtrado = df_us[df_us['Departamentos'].apply(lambda x: any(d in [i.strip() for i in str(x).split(",")] for d in deptos_autorizados))]
         user_list = df_us_filtrado['Email'].tolist()
         
         if not user_list:
@@ -192,10 +335,103 @@ if st.session_state.menu_ativo == "usuarios":
                     ed_niv = st.selectbox("Nível:", list(cores_niveis.keys()), index=list(cores_niveis.keys()).index(u_data['Nivel']))
                     
                     if st.form_submit_button("Salvar Alterações"):
-                        _, sheet_us = get_sheets()
+                        espelho, sinc = get_espelho()
                         row_idx = df_us[df_us['Email'] == sel_user_email].index[0] + 2
-                        sheet_us.update(f"B{row_idx}:E{row_idx}", [[ed_nome, ed_tel, ",".join(ed_deps), ed_niv]])
-                        st.cache_data.clear(); st.success("Atualizado!"); time.sleep(1); st.rerun()
+                        ticket = espelho.atualizar_linha("Usuarios", row_idx, 2, [ed_nome, ed_tel, ",".join(ed_deps), ed_niv]); sinc.acordar()
+                        st.session_state.escritas[ticket] = f"Alteração de {sel_user_email}"
+                        st.success("Atualizado!"); time.sleep(1); st.rerun()
+
+    with aba3:
+        # Cadastro de vários voluntários de uma vez: tudo é validado antes e entra num único append
+        st.caption("Colunas: Email, Nome, Telefone, Departamentos (separados por vírgula) e Nivel. Vírgula ou ponto e vírgula como separador.")
+        arquivo = st.file_uploader("Arquivo CSV:", type="csv")
+        if arquivo is not None:
+            try:
+                novos = lote.validar_usuarios(pd.read_csv(arquivo, dtype=str, sep=None, engine="python", encoding="utf-8-sig"), df_us, deptos_autorizados, list(cores_niveis.keys()))
+            except Exception as e:
+                st.error(f"Não foi possível ler o arquivo: {e}")
+            else:
+                ok = novos[novos['motivo'] == ""]
+                st.write(f"✅ **{len(ok)}** prontos para cadastrar · ⛔ **{len(novos) - len(ok)}** barrados")
+                st.dataframe(novos.rename(columns={'motivo': 'Motivo'}), hide_index=True, use_container_width=True)
+                if st.button(f"Cadastrar {len(ok)} voluntários", type="primary", disabled=ok.empty):
+                    espelho, sinc = get_espelho()
+                    tickets = espelho.acrescentar_linhas("Usuarios", ok[lote.CAMPOS_USUARIO].values.tolist()); sinc.acordar()
+                    st.session_state.escritas[tuple(tickets)] = (f"Importação de {len(ok)} voluntários", ok['Email'].tolist())
+                    st.success("Cadastrados!"); st.rerun()
+
+elif st.session_state.menu_ativo == "lote":
+    st.title("Ações em Lote")
+    st.info(f"Gerenciando: {', '.join(deptos_autorizados)}")
+    indice_datas = get_indice_datas().atualizar(df_ev, versao_dados, get_quadro_eventos().mudanca)
+    motor = get_motor_elegibilidade(versao_dados, df_us)
+    if (aviso := st.session_state.pop('aviso_lote', None)) is not None:
+        st.warning(f"⚠️ {aviso[0]}: {len(aviso[1])} vagas não foram gravadas porque mudaram desde que o plano foi montado.")
+        st.dataframe(aviso[1].rename(columns={'valor': 'Novo', 'motivo': 'Motivo'}), hide_index=True, use_container_width=True)
+    aba_vagas, aba_copia, aba_auto = st.tabs(["Selecionar Vagas", "Copiar Escala", "Preencher Automaticamente"])
+
+    with aba_vagas:
+        c1, c2, c3 = st.columns([1, 1, 2])
+        with c1: l_ini = st.date_input("De:", value=date.today(), key="lote_ini")
+        with c2: l_fim = st.date_input("Até:", value=date.today() + timedelta(days=6), key="lote_fim")
+        with c3: l_deptos = st.multiselect("Departamentos:", deptos_autorizados, default=deptos_autorizados, key="lote_deptos")
+        slots = lote.vagas(df_ev.iloc[indice_datas.posicoes(l_ini, l_fim + timedelta(days=1), l_deptos)])
+        if slots.empty:
+            st.info("Nenhuma vaga no período.")
+        else:
+            # A seleção é por vaga (linha, coluna) e vale para este recorte: gravações de outras sessões
+            # não desmarcam nada, mudar os filtros começa uma seleção nova
+            filtro = (l_ini, l_fim, tuple(l_deptos))
+            if st.session_state.get('lote_filtro') != filtro:
+                st.session_state.lote_filtro, st.session_state.lote_sel = filtro, set()
+            st.session_state.setdefault('lote_edicao', 0)
+            chaves = [(int(l), int(c)) for l, c in zip(slots['linha'], slots['coluna'])]
+            marcadas = [k in st.session_state.lote_sel for k in chaves]
+            chave_tabela = f"lote_tabela_{st.session_state.lote_edicao}"
+            st.data_editor(
+                slots[['Data Específica', 'Horario', 'Departamento', 'Nível', 'Nome do Evento', 'Vaga', 'Atual']].astype(str).assign(Selecionar=marcadas),
+                column_order=['Selecionar', 'Data Específica', 'Horario', 'Departamento', 'Nível', 'Nome do Evento', 'Vaga', 'Atual'],
+                disabled=['Data Específica', 'Horario', 'Departamento', 'Nível', 'Nome do Evento', 'Vaga', 'Atual'],
+                hide_index=True, use_container_width=True, key=chave_tabela, on_change=marcar_vagas, args=(chave_tabela, chaves))
+            selecionadas = slots[marcadas]
+            acao = st.radio("Ação:", ["Inscrever voluntário", "Limpar vagas"], horizontal=True, key="lote_acao")
+            if selecionadas.empty:
+                st.caption("Marque as vagas na coluna Selecionar.")
+            elif acao == "Inscrever voluntário":
+                voluntario = st.selectbox("Voluntário:", [""] + sorted(df_us_filtrado['Nome'].astype(str).unique()), key="lote_voluntario")
+                if voluntario: aplicar_plano(lote.planejar_inscricao(selecionadas, voluntario, motor, get_indice_conflitos()), f"Inscrição de {voluntario}", "gravar_lote", "lote_filtro")
+            else:
+                aplicar_plano(lote.planejar_limpeza(selecionadas), "Limpeza de vagas", "gravar_lote", "lote_filtro")
+
+    with aba_copia:
+        c1, c2, c3 = st.columns([1, 1, 2])
+        with c1: periodo = st.radio("Copiar:", ["Semana anterior", "Mês anterior (4 semanas)"], key="copia_periodo")
+        with c2: c_ini = st.date_input("Para a semana de:", value=date.today() - timedelta(days=date.today().weekday()), key="copia_ini")
+        with c3: c_deptos = st.multiselect("Departamentos:", deptos_autorizados, default=deptos_autorizados, key="copia_deptos")
+        semanas = 1 if periodo == "Semana anterior" else 4
+        st.caption(f"De {c_ini - timedelta(weeks=semanas):%d/%m} a {c_ini - timedelta(days=1):%d/%m} ➡️ para {c_ini:%d/%m} a {c_ini + timedelta(weeks=semanas) - timedelta(days=1):%d/%m}. "
+                   "Cada vaga preenchida vai para o mesmo evento (departamento, nome, horário e vaga) no mesmo dia da semana.")
+        aplicar_plano(lote.planejar_copia(df_ev, indice_datas, c_ini, semanas, c_deptos, motor, get_indice_conflitos()), "Cópia da escala", "gravar_copia")
+
+    with aba_auto:
+        st.caption("Sugere um voluntário apto para cada vaga vazia, sem ninguém em duas atividades no mesmo horário e dividindo as vagas entre quem tem menos atividades no período.")
+        c1, c2, c3 = st.columns([1, 1, 2])
+        with c1: a_ini = st.date_input("De:", value=date.today(), key="auto_ini")
+        with c2: a_fim = st.date_input("Até:", value=date.today() + timedelta(days=27), key="auto_fim")
+        with c3: a_deptos = st.multiselect("Departamentos:", deptos_autorizados, default=deptos_autorizados, key="auto_deptos")
+        # A proposta só é refeita a pedido e vale enquanto os filtros forem os mesmos. Gravações feitas
+        # depois dela não a descartam: ao gravar, cada vaga é conferida de novo (aplicar_plano)
+        chave_auto = (a_ini, a_fim, tuple(a_deptos))
+        if st.button("Gerar proposta", use_container_width=True, key="gerar_auto"):
+            with med.etapa("preenchimento_automatico"):
+                st.session_state.proposta_auto = (chave_auto, lote.planejar_automatico(df_ev, indice_datas, a_ini, a_fim + timedelta(days=1), a_deptos, motor, get_indice_conflitos()))
+        proposta = st.session_state.get('proposta_auto')
+        if proposta is not None and proposta[0] == chave_auto:
+            prontas = proposta[1][proposta[1]['motivo'] == ""]
+            if not prontas.empty:
+                with st.expander("Vagas por voluntário na proposta"):
+                    st.dataframe(prontas['valor'].value_counts().rename_axis('Voluntário').reset_index(name='Vagas'), hide_index=True, use_container_width=True)
+            aplicar_plano(proposta[1], "Preenchimento automático", "gravar_auto", "proposta_auto")
 
 else: # 📅 Gestão de Escala
     st.title("Painel de Escala")
@@ -211,50 +447,52 @@ else: # 📅 Gestão de Escala
             options=["Todos"] + deptos_autorizados,
             default=["Todos"]
         )
+    modo_pag, tam_pag = paginacao.controles("pag_escala")
 
     # --- Lógica de Filtragem ---
-    df_ev['Data_Dt'] = pd.to_datetime(df_ev['Data Específica'], dayfirst=True)
-    df_f = df_ev[df_ev['Data_Dt'].dt.date >= f_data].copy()
-
-    # Aplica restrição: Apenas eventos dos deptos autorizados
-    if "Todos" in f_deptos_sel or not f_deptos_sel:
-        df_f = df_f[df_f['Departamento'].isin(deptos_autorizados)]
-    else:
-        # Se ele selecionou um subconjunto específico dos dele
-        df_f = df_f[df_f['Departamento'].isin(f_deptos_sel)]
-
-    df_f = df_f.sort_values(['Data_Dt', 'Horario'])
+    with med.etapa("filtros"):
+        # Aplica restrição: Apenas eventos dos deptos autorizados (ou o subconjunto escolhido dos dele).
+        # O índice de datas devolve direto as posições de cada departamento a partir de f_data.
+        deptos_filtro = deptos_autorizados if "Todos" in f_deptos_sel or not f_deptos_sel else f_deptos_sel
+        df_f = df_ev.iloc[get_indice_datas().atualizar(df_ev, versao_dados, get_quadro_eventos().mudanca).posicoes(f_data, departamentos=deptos_filtro)]
 
     # --- Renderização dos Cards ---
     if df_f.empty:
         st.info("Nenhum evento encontrado.")
     else:
-        for idx, row in df_f.iterrows():
-            linha_planilha = idx + 2
-            bg = cores_niveis.get(str(row['Nível']).strip(), "#f0f0f0")
-            dia_nome = dias_semana.get(row['Data_Dt'].strftime('%A'), "")
+        df_pag = paginacao.pagina_atual(df_f, "pag_escala", modo_pag, tam_pag, (f_data, tuple(f_deptos_sel)))
+        with med.etapa("cartoes", linhas=len(df_pag)):
+            for idx, row in df_pag.iterrows():
+                linha_planilha = idx + 2
+                bg = cores_niveis.get(str(row['Nível']).strip(), "#f0f0f0")
+                dia_nome = dias_semana.get(row['Data_Dt'].strftime('%A'), "")
             
-            with st.container():
-                st.markdown(f"""
-                <div class="card-container" style="background-color: {bg}; border-left: 10px solid rgba(0,0,0,0.2);">
-                    <div style="line-height: 1.6;">
-                        <b>📅 Data: {row['Data Específica']} ({dia_nome})</b><br>
-                        <b>⏰ Horário: {row['Horario']}</b><br>
-                        <b>🎭 Evento: {row['Nível']} - {row['Nome do Evento']}</b><br>
-                        <b>🏢 Departamento: {row['Departamento']}</b>
+                with st.container():
+                    st.markdown(f"""
+                    <div class="card-container" style="background-color: {bg}; border-left: 10px solid rgba(0,0,0,0.2);">
+                        <div style="line-height: 1.6;">
+                            <b>📅 Data: {row['Data Específica']} ({dia_nome})</b><br>
+                            <b>⏰ Horário: {row['Horario']}</b><br>
+                            <b>🎭 Evento: {row['Nível']} - {row['Nome do Evento']}</b><br>
+                            <b>🏢 Departamento: {row['Departamento']}</b>
+                        </div>
                     </div>
-                </div>
-                """, unsafe_allow_html=True)
+                    """, unsafe_allow_html=True)
                 
-                c1, c2 = st.columns(2)
-                for i, col_name in enumerate(['Voluntário 1', 'Voluntário 2']):
-                    with [c1, c2][i]:
-                        vol_nome = str(row[col_name]).strip()
-                        if vol_nome and vol_nome not in ["", "---", "nan"]:
-                            st.success(f"**✅ {vol_nome}**")
-                            if st.button(f"Remover {vol_nome.split()[0]}", key=f"rem_{idx}_{i}", use_container_width=True):
-                                cancelar_dialog(linha_planilha, 8+i, vol_nome)
-                        else:
-                            if st.button(f"➕ Vaga {i+1}", key=f"add_{idx}_{i}", use_container_width=True):
-                                gerenciar_inscricao_dialog(linha_planilha, row, 8+i, df_us, df_ev)
-                st.divider()
+                    c1, c2 = st.columns(2)
+                    for i, col_name in enumerate(['Voluntário 1', 'Voluntário 2']):
+                        with [c1, c2][i]:
+                            vol_nome = str(row[col_name]).strip()
+                            if vol_nome and vol_nome not in ["", "---", "nan"]:
+                                st.success(f"**✅ {vol_nome}**")
+                                if st.button(f"Remover {vol_nome.split()[0]}", key=f"rem_{idx}_{i}", use_container_width=True):
+                                    cancelar_dialog(linha_planilha, 8+i, vol_nome, row)
+                            else:
+                                if st.button(f"➕ Vaga {i+1}", key=f"add_{idx}_{i}", use_container_width=True):
+                                    gerenciar_inscricao_dialog(linha_planilha, row, 8+i, df_us)
+                    st.divider()
+        paginacao.navegacao("pag_escala")
+
+# Diagnóstico do rerun (?debug=1 na URL); todo usuário deste app é diretor
+if medicao.depuracao_pedida(): medicao.mostrar(med, st.session_state.menu_ativo)
+else: med.concluir(st.session_state.menu_ativo)
@@ -0,0 +1,167 @@
+# --- BENCHMARK DOS CAMINHOS QUENTES ---
+# Gera uma planilha sintética, serve pela PlanilhaFalsa (sem Google) e mede os caminhos que
+# cada rerun dos apps percorre. O relatório em JSON serve para comparar revisões:
+#   python benchmark.py --eventos 1000 10000 100000 --saida antes.json
+#   python benchmark.py --eventos 1000 10000 100000 --comparar antes.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date
+
+import pandas as pd
+
+from conexao import ConexaoPlanilha, Cota
+from elegibilidade import MotorElegibilidade, visao_usuario
+from espelho import EspelhoLocal, Sincronizador
+from indices import IndiceConflitos, IndiceDatas, fatia_por_data
+import lote
+from planilha_falsa import ClienteFalso, PlanilhaFalsa, gerar_planilha
+from preparo import preparar_eventos
+from responsaveis import IndiceDias, html_por_atividade, html_por_departamento
+
+COLUNAS_USUARIOS = ['Email', 'Nome', 'Telefone', 'Departamentos', 'Nivel']
+CORES = {"AV1": "#E1BEE7", "AV2": "#B3E5FC", "AV3": "#C8E6C9"}
+
+
+def _medir(funcao, repeticoes, preparar=None):
+    # Mediana e mínimo em ms; `preparar` roda antes de cada repetição, fora do tempo medido
+    tempos = []
+    for _ in range(repeticoes):
+        args = preparar() if preparar else ()
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {"mediana_ms": round(statistics.median(tempos), 3), "min_ms": round(min(tempos), 3), "repeticoes": repeticoes}
+
+
+def _novo_espelho(pasta, ss):
+    espelho = EspelhoLocal(os.path.join(pasta, f"bench-{time.perf_counter_ns()}.db"))
+    conexao = ConexaoPlanilha(ClienteFalso(ss), "bench", cota=Cota(por_minuto=10 ** 6))
+    return espelho, Sincronizador(espelho, conexao)
+
+
+def _carregar(espelho, mapa):
+    # Mesmo trabalho do load_data_cached do app.py
+    return preparar_eventos(espelho.ler_aba("Calendario_Eventos"), mapa), espelho.ler_aba("Usuarios", COLUNAS_USUARIOS)
+
+
+def _filtrar_painel(df_ev, user, mapa, deps):
+    # Construção da visão do usuário + as combinações de filtro de status do dashboard
+    v = visao_usuario(df_ev, mapa.get(user['Nivel'], 0), deps, user['Nome'])
+    v = v.iloc[slice(*fatia_por_data(v['Data_Dt'].to_numpy(), date.today()))]
+    for flag in ('Aberta', 'Vazia', 'Minha', None):
+        df_ev.iloc[v['Pos'][v[flag]] if flag else v['Pos']]
+
+
+def medir_tamanho(eventos, pasta, repeticoes, **opcoes):
+    abas, mapa = gerar_planilha(eventos=eventos, **opcoes)
+    ss = PlanilhaFalsa(abas)
+    pesadas = max(1, repeticoes // 3)  # caminhos que refazem o espelho inteiro
+    r = {}
+
+    r["sincronizacao_fria"] = _medir(lambda e, s: s.sincronizar(completo=True), pesadas, lambda: _novo_espelho(pasta, ss))
+    espelho, sinc = _novo_espelho(pasta, ss)
+    sinc.sincronizar(completo=True)
+    r["carregadores_frio"] = _medir(lambda e: _carregar(e, mapa), pesadas, lambda: (EspelhoLocal(espelho.caminho),))
+    _carregar(espelho, mapa)
+    r["carregadores_sem_mudanca"] = _medir(lambda: _carregar(espelho, mapa), repeticoes)
+    linhas = iter(range(2, eventos + 2))
+    r["inscricao_e_recarga"] = _medir(
+        lambda: (espelho.atualizar_celula("Calendario_Eventos", next(linhas), 8, "Bench"), _carregar(espelho, mapa)), repeticoes)
+    r["envio_lote"] = _medir(sinc.enviar_pendentes, 1)
+
+    df_ev, df_us = _carregar(espelho, mapa)
+    user = df_us.iloc[0]
+    deps = [d.strip() for d in str(user['Departamentos']).split(",") if d.strip()]
+    r["filtro_painel"] = _medir(lambda: _filtrar_painel(df_ev, user, mapa, deps), repeticoes)
+
+    r["indice_datas_montagem"] = _medir(lambda: IndiceDatas().atualizar(df_ev, 1), pesadas)
+    indice_datas = IndiceDatas().atualizar(df_ev, 1)
+    deps_admin = sorted(df_ev['Departamento'].astype(str).unique())[:3]
+    r["escala_admin_a_partir_de"] = _medir(lambda: df_ev.iloc[indice_datas.posicoes(date.today(), departamentos=deps_admin)], repeticoes)
+    r["conflitos_indice"] = _medir(lambda: IndiceConflitos().atualizar(df_ev, 1), pesadas)
+    indice = IndiceConflitos().atualizar(df_ev, 1)
+    amostra = df_ev.sample(min(len(df_ev), 1000), random_state=1)
+    consultas = list(zip(amostra['Data Específica'], amostra['Horario'], df_us['Nome'].sample(len(amostra), replace=True, random_state=2)))
+    r["conflitos_1000_consultas"] = _medir(lambda: [indice.conflito(*c) for c in consultas], repeticoes)
+
+    r["elegibilidade_motor"] = _medir(lambda: MotorElegibilidade(df_us, mapa), repeticoes)
+    motor = MotorElegibilidade(df_us, mapa)
+    vagas = list(zip(amostra['Departamento'], amostra['Nível'], amostra['Tipo'], amostra['Data Específica'], amostra['Horario']))[:100]
+    r["elegibilidade_100_dialogos"] = _medir(
+        lambda: [motor.rotulos(motor.aptos(d, n, t, indice.ocupados(dt, h))) for d, n, t, dt, h in vagas], repeticoes)
+
+    semana = pd.Timestamp(date.today()) + pd.Timedelta(weeks=1)
+    r["lote_copia_semana"] = _medir(lambda: lote.planejar_copia(df_ev, indice_datas, semana, 1, deps_admin, motor, indice), repeticoes)
+    plano = lote.planejar_limpeza(lote.vagas(df_ev.iloc[indice_datas.posicoes(date.today(), semana, deps_admin)]))
+    celulas = list(zip(plano['linha'], plano['coluna'], plano['valor']))
+    r["lote_preenchimento_4_semanas"] = _medir(
+        lambda: lote.planejar_automatico(df_ev, indice_datas, date.today(), semana + pd.Timedelta(weeks=3), deps_admin, motor, indice), pesadas)
+    r["lote_gravacao"] = _medir(lambda: espelho.atualizar_celulas("Calendario_Eventos", celulas), repeticoes)
+
+    dia = df_ev['Data_Dt'].dt.date.value_counts().idxmax()  # o dia mais cheio
+    df_dia = df_ev[df_ev['Data_Dt'].dt.date == dia]
+    r["responsaveis_dia"] = _medir(lambda: html_por_atividade(df_ev[df_ev['Data_Dt'].dt.date == dia], CORES), repeticoes)
+    r["painel_departamentos"] = _medir(lambda: html_por_departamento(df_ev[df_ev['Data_Dt'].dt.date == dia]), repeticoes)
+    r["indice_dias_montagem"] = _medir(lambda: IndiceDias("atividade", CORES).atualizar(df_ev, 1), pesadas)
+    indice_dias = IndiceDias("atividade", CORES).atualizar(df_ev, 1)
+    datas = sorted(df_ev['Data_Dt'].dt.date.dropna().unique())
+    r["indice_dias_troca_de_data"] = _medir(lambda: [(indice_dias.html(d), indice_dias.vagas(d)) for d in datas], repeticoes)
+    return {"linhas_dia": len(df_dia), "caminhos": r}
+
+
+def _revisao():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _imprimir(relatorio, base=None):
+    for n, dados in relatorio["resultados"].items():
+        print(f"\n== {n} eventos ({dados['linhas_dia']} linhas no dia mais cheio) ==")
+        anteriores = (base or {}).get("resultados", {}).get(n, {}).get("caminhos", {})
+        for caminho, m in dados["caminhos"].items():
+            linha = f"  {caminho:<28} {m['mediana_ms']:>10.2f} ms   (mín {m['min_ms']:.2f}, n={m['repeticoes']})"
+            if caminho in anteriores and anteriores[caminho]["mediana_ms"]:
+                linha += f"   x{m['mediana_ms'] / anteriores[caminho]['mediana_ms']:.2f} vs {base['meta'].get('revisao')}"
+            print(linha)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Mede os caminhos quentes dos apps com uma planilha sintética.")
+    p.add_argument("--eventos", type=int, nargs="+", default=[1000, 10000, 100000])
+    p.add_argument("--departamentos", type=int, default=8)
+    p.add_argument("--niveis", type=int, default=5)
+    p.add_argument("--usuarios", type=int, default=300)
+    p.add_argument("--dias", type=int, default=90)
+    p.add_argument("--repeticoes", type=int, default=9)
+    p.add_argument("--saida", help="grava o relatório em JSON")
+    p.add_argument("--comparar", help="relatório JSON anterior para comparar")
+    a = p.parse_args()
+    opcoes = {"departamentos": a.departamentos, "niveis": a.niveis, "usuarios": a.usuarios, "dias": a.dias}
+    relatorio = {
+        "meta": {"revisao": _revisao(), "data": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                 "pandas": pd.__version__, "repeticoes": a.repeticoes, **opcoes},
+        "resultados": {},
+    }
+    with tempfile.TemporaryDirectory() as pasta:
+        for n in a.eventos:
+            relatorio["resultados"][str(n)] = medir_tamanho(n, pasta, a.repeticoes, **opcoes)
+    base = None
+    if a.comparar:
+        with open(a.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+    _imprimir(relatorio, base)
+    if a.saida:
+        with open(a.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# --- TESTE DE CARGA COM SESSÕES CONCORRENTES ---
+# Sobe N sessões simultâneas do app.py (voluntários) e do app2.py (diretores) pelo AppTest do
+# Streamlit, todas no mesmo processo e com a PlanilhaFalsa no lugar do Google. Assim compartilham
+# st.cache_resource, o espelho SQLite e o Sincronizador, como num servidor real.
+#   python carga.py --sessoes 30 --diretores 3 --eventos 2000 --saida carga.json
+# O AppTest não consegue clicar em botões dentro de um st.dialog (o rerun fecha o dialog). Por
+# isso o harness mede a abertura do dialog pelo app e faz a escrita pelo mesmo caminho que o
+# botão de confirmar usa: espelho.atualizar_celula com a coluna e o valor esperado tirados do cartão
+# que a sessão viu (não do espelho atual) + acordar o Sincronizador.
+import argparse
+import json
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+SEGREDOS = ["TYPE", "PROJECT_ID", "PRIVATE_KEY_ID", "CLIENT_EMAIL", "CLIENT_ID", "AUTH_URI", "TOKEN_URI",
+            "AUTH_PROVIDER_X509_CERT_URL", "CLIENT_X509_CERT_URL"] + [f"S{i}" for i in range(1, 22)]
+NIVEIS_APP = ["BAS", "AV1", "IN", "AV2", "AV3", "AV4"]  # chaves de cores_niveis nos apps
+
+
+class Carga:
+    def __init__(self, planilha, espelho, timeout):
+        self.planilha = planilha
+        self.espelho = espelho  # outra conexão ao mesmo arquivo SQLite dos apps
+        self.timeout = timeout
+        self.tempos = defaultdict(list)
+        self.escritas = []  # (ticket, aba, linha, coluna, valor, sessão)
+        self.recusadas = []  # (aba, linha, colunas, valor, sessão): a vaga já não tinha o valor que a sessão viu
+        self.falhas = []
+        self._trava = threading.Lock()
+
+    def _app(self, arquivo):
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(os.path.join(PASTA, arquivo), default_timeout=self.timeout)
+        for chave in SEGREDOS:
+            at.secrets[chave] = "carga"
+        return at
+
+    def _passo(self, nome, funcao):
+        inicio = time.perf_counter()
+        at = funcao()
+        with self._trava:
+            self.tempos[nome].append((time.perf_counter() - inicio) * 1000)
+        if at.exception:
+            raise RuntimeError(f"{nome}: {at.exception[0].message}")
+        return at
+
+    def _escrever(self, sessao, linha, colunas, valor, esperado):
+        # Como os dialogs: a primeira coluna de `colunas` que ainda tem `esperado` recebe o valor
+        inicio = time.perf_counter()
+        ticket, coluna = None, None
+        for coluna in colunas:
+            ticket = self.espelho.atualizar_celula("Calendario_Eventos", linha, coluna, valor, esperado=esperado)
+            if ticket is not None:
+                break
+        if ticket is not None:
+            _acordar_sincronizadores()
+        with self._trava:
+            self.tempos["escrita"].append((time.perf_counter() - inicio) * 1000)
+            if ticket is None:
+                self.recusadas.append(("Calendario_Eventos", linha, tuple(colunas), valor, sessao))
+            else:
+                self.escritas.append((ticket, "Calendario_Eventos", linha, coluna, valor, sessao))
+
+    def voluntario(self, n, email, nome):
+        at = self._app("app.py")
+        self._passo("abrir", at.run)
+        at.text_input[0].input(email)
+        next(b for b in at.button if b.label == "Entrar no Sistema").click()
+        self._passo("login", at.run)
+        next(p for p in at.get("button_group") if p.label == "Status:").set_value("Vagas Vazias")
+        self._passo("filtro", at.run)
+        next(p for p in at.get("button_group") if p.label == "Status:").set_value("Vagas Abertas")
+        self._passo("filtro", at.run)
+        # Cada cartão tem um botão só (inscrito/cheio/quero): o k-ésimo cartão é o do k-ésimo botão
+        cartoes = [m.value for m in at.markdown if 'class="card-container"' in m.value]
+        botoes = [b for b in at.button if b.key and b.key[:3] in ("bi_", "bf_", "bq_")]
+        quero = [(b, c) for b, c in zip(botoes, cartoes) if b.label == "Quero me inscrever"]
+        if not quero:
+            return
+        escolhido, cartao = quero[n % min(len(quero), 3)]  # poucas vagas disputadas por muitas sessões
+        escolhido.click()
+        self._passo("quero_me_inscrever", at.run)
+        if any(b.label == "Confirmar Inscrição" for b in at.button):
+            linha = int(escolhido.key.split("_")[1]) + 2
+            # Coluna pelo que o cartão mostrava, como o app.py (8 if v1 == "" else 9), mesmo que o
+            # espelho já tenha mudado: é essa disputa que "recusadas" e "sobrescritas" medem
+            v1 = re.search(r"<b>Vol\. 1:</b> (.*?)<br>", cartao).group(1)
+            coluna = 8 if v1 == "---" else 9
+            self._escrever(f"voluntario-{n}", linha, (coluna, 17 - coluna), nome, "")
+            self._passo("rerun_apos_escrita", at.run)
+
+    def diretor(self, n, email):
+        at = self._app("app2.py")
+        self._passo("admin_abrir", at.run)
+        at.text_input[0].input(email)
+        next(b for b in at.button if b.label == "Acessar Painel").click()
+        self._passo("admin_login", at.run)
+        vagas = [b for b in at.button if b.label.startswith("➕")]
+        if vagas:
+            vagas[n % len(vagas)].click()
+            at = self._passo("admin_abrir_inscricao", at.run)
+            aptos = next((s for s in at.selectbox if s.label == "Selecione o Voluntário:"), None)
+            if aptos is not None and len(aptos.options) > 1:
+                _, idx, coluna = vagas[n % len(vagas)].key.split("_")
+                self._escrever(f"diretor-{n}", int(idx) + 2, (8 + int(coluna),), aptos.options[1].split(" (")[0], "")
+        # Cada vaga preenchida mostra o nome (st.success) e logo depois o botão de remover
+        remover = list(zip([b for b in at.button if b.label.startswith("Remover")], [s.value for s in at.success if s.value.startswith("**✅")]))
+        if remover:
+            botao, nome = remover[n % len(remover)]
+            botao.click()
+            self._passo("admin_abrir_remocao", at.run)
+            _, idx, coluna = botao.key.split("_")
+            self._escrever(f"diretor-{n}", int(idx) + 2, (8 + int(coluna),), "", nome[len("**✅ "):-len("**")])
+
+    def executar(self, tarefas, paralelas):
+        with ThreadPoolExecutor(max_workers=paralelas) as pool:
+            for futuro in [pool.submit(*t) for t in tarefas]:
+                try:
+                    futuro.result()
+                except Exception as e:
+                    quadro = traceback.extract_tb(e.__traceback__)[-1]
+                    self.falhas.append(f"{e!r} em {os.path.basename(quadro.filename)}:{quadro.lineno}")
+
+    def conferir(self, espera):
+        # Descarrega a fila e compara a planilha com a última escrita de cada célula
+        limite = time.monotonic() + espera
+        while self.espelho.total_pendentes() and time.monotonic() < limite:
+            _acordar_sincronizadores()
+            time.sleep(0.2)
+        valores = self.planilha.worksheet("Calendario_Eventos").get_all_values()
+        status = self.espelho.status_escritas([e[0] for e in self.escritas])
+        por_celula = defaultdict(list)
+        for e in sorted(self.escritas):
+            por_celula[(e[2], e[3])].append(e)
+        perdidas, sobrescritas = [], []
+        for (linha, coluna), escritas in por_celula.items():
+            final = valores[linha - 1][coluna - 1] if linha <= len(valores) and coluna <= len(valores[linha - 1]) else ""
+            if final != escritas[-1][4]:
+                perdidas.append(escritas[-1])
+            # Inscrição apagada por outra sessão que gravou na mesma vaga sem ver a primeira
+            sobrescritas += [e for e in escritas[:-1] if e[4] and e[4] != escritas[-1][4]]
+        return {
+            "total": len(self.escritas), "celulas": len(por_celula),
+            "gravadas": sum(1 for s, _ in status.values() if s == "ok"),
+            "com_erro": sum(1 for s, _ in status.values() if s == "erro"),
+            "substituidas": sum(1 for s, _ in status.values() if s == "substituida"),
+            "recusadas": len(self.recusadas),
+            "pendentes": self.espelho.total_pendentes(),
+            "perdidas": len(perdidas), "sobrescritas": len(sobrescritas),
+            "exemplos_sobrescritas": [{"linha": e[2], "coluna": e[3], "valor": e[4], "sessao": e[5]} for e in sobrescritas[:5]],
+        }
+
+
+def _runtime_compartilhado():
+    # Cada AppTest.run() instala um Runtime falso global e o apaga ao terminar; com várias
+    # sessões rodando ao mesmo tempo, uma apagaria o Runtime da outra. Mantém o último visto.
+    from streamlit.runtime import Runtime
+    ultimo = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            ultimo[:] = [cls._instance]
+        elif not ultimo:
+            raise RuntimeError("Runtime hasn't been created!")
+        return cls._instance or ultimo[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(ultimo))
+
+    # O servidor real compila o script uma vez para todas as sessões; cada AppTest cria o seu
+    # ScriptCache, e compilações simultâneas do mesmo arquivo quebram o compilador do CPython.
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    compilados, trava, original = {}, threading.Lock(), ScriptCache.get_bytecode
+
+    def get_bytecode(self, script_path):
+        with trava:
+            if script_path not in compilados:
+                compilados[script_path] = original(self, script_path)
+            return compilados[script_path]
+
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def _acordar_sincronizadores():
+    from espelho import Sincronizador
+    for t in threading.enumerate():
+        if isinstance(t, Sincronizador):
+            t.acordar()
+
+
+def _percentis(tempos):
+    ordenados = sorted(tempos)
+    p = lambda q: round(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))], 1)
+    return {"n": len(ordenados), "p50_ms": p(0.5), "p90_ms": p(0.9), "p99_ms": p(0.99),
+            "max_ms": round(ordenados[-1], 1), "media_ms": round(statistics.mean(ordenados), 1)}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Sessões simultâneas do app.py/app2.py contra uma planilha falsa.")
+    p.add_argument("--sessoes", type=int, default=20, help="voluntários simultâneos")
+    p.add_argument("--diretores", type=int, default=2)
+    p.add_argument("--paralelas", type=int, default=None, help="sessões rodando ao mesmo tempo (padrão: todas)")
+    p.add_argument("--eventos", type=int, default=1000)
+    p.add_argument("--usuarios", type=int, default=200)
+    p.add_argument("--departamentos", type=int, default=4)
+    p.add_argument("--timeout", type=float, default=120)
+    p.add_argument("--saida", help="grava o relatório em JSON")
+    a = p.parse_args()
+
+    # Os apps leem estas variáveis ao importar o espelho / abrir a conexão: precisa vir antes
+    pasta = tempfile.mkdtemp(prefix="carga-")
+    os.environ["ESCALA_DB"] = os.path.join(pasta, "escala_local.db")
+    os.environ.setdefault("GOOGLE_CREDS", "{}")
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    from espelho import EspelhoLocal
+    from planilha_falsa import ClienteFalso, PlanilhaFalsa, gerar_planilha
+
+    abas, _ = gerar_planilha(eventos=a.eventos, usuarios=a.usuarios, departamentos=a.departamentos, niveis=NIVEIS_APP,
+                             dias=30, preenchimento=0.2)
+    # Cada diretor cuida de todos os departamentos
+    todos = ", ".join(f"Departamento {d + 1}" for d in range(a.departamentos))
+    abas["Diretores"] = [["Email", "Departamento"]] + [[f"diretor{i}@exemplo.com", todos] for i in range(a.diretores)]
+    planilha = PlanilhaFalsa(abas)
+    _runtime_compartilhado()
+    gspread.authorize = lambda *args, **kwargs: ClienteFalso(planilha)
+    ServiceAccountCredentials.from_json_keyfile_dict = classmethod(lambda cls, *args, **kwargs: None)
+
+    carga = Carga(planilha, EspelhoLocal(os.environ["ESCALA_DB"]), a.timeout)
+    inicio = time.perf_counter()
+    carga.executar([(carga._passo, "partida_fria", carga._app("app.py").run)], 1)  # cache_resource + 1ª sincronização
+    partida = time.perf_counter() - inicio
+    antes = sum(planilha.chamadas.values())
+
+    usuarios = abas["Usuarios"][1:]
+    tarefas = [(carga.voluntario, i, usuarios[i % len(usuarios)][0], usuarios[i % len(usuarios)][1]) for i in range(a.sessoes)]
+    tarefas += [(carga.diretor, i, f"diretor{i}@exemplo.com") for i in range(a.diretores)]
+    inicio = time.perf_counter()
+    carga.executar(tarefas, a.paralelas or len(tarefas))
+    duracao = time.perf_counter() - inicio
+    escritas = carga.conferir(espera=30)
+
+    acoes = sum(len(t) for nome, t in carga.tempos.items() if nome != "partida_fria")
+    chamadas = sum(planilha.chamadas.values()) - antes
+    relatorio = {
+        "parametros": vars(a), "partida_fria_s": round(partida, 2), "duracao_s": round(duracao, 2),
+        "passos": {nome: _percentis(t) for nome, t in carga.tempos.items()},
+        "api": {"chamadas": chamadas, "por_acao": round(chamadas / max(acoes, 1), 3), "por_metodo": dict(planilha.chamadas)},
+        "escritas": escritas, "falhas_de_sessao": carga.falhas,
+    }
+    print(f"partida fria {relatorio['partida_fria_s']}s; {len(tarefas)} sessões em {relatorio['duracao_s']}s")
+    for nome, m in relatorio["passos"].items():
+        print(f"  {nome:<24} n={m['n']:<4} p50 {m['p50_ms']:>8.1f}  p90 {m['p90_ms']:>8.1f}  p99 {m['p99_ms']:>8.1f}  máx {m['max_ms']:>8.1f} ms")
+    print(f"API: {chamadas} chamadas, {relatorio['api']['por_acao']} por ação  {relatorio['api']['por_metodo']}")
+    print(f"escritas: {json.dumps({k: v for k, v in escritas.items() if k != 'exemplos_sobrescritas'}, ensure_ascii=False)}")
+    if carga.falhas:
+        print(f"sessões com falha: {len(carga.falhas)}  ex.: {carga.falhas[0]}")
+    if a.saida:
+        with open(a.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# --- CONEXÃO COM A PLANILHA ---
+# Guarda o Spreadsheet e os Worksheet abertos pela vida toda do processo. Abrir a planilha e
+# localizar uma aba custam, cada um, uma ida à API de metadados. O token de acesso é renovado
+# antes de vencer, e os handles só são resolvidos de novo quando uma aba some da planilha.
+# Toda chamada à API passa por aqui: respeita a cota por minuto (compartilhada por todas as
+# sessões do processo) e repete erros de cota/servidor com espera exponencial aleatória. O append
+# não é repetido: a falha pode chegar depois de a planilha já ter gravado as linhas.
+import datetime
+import logging
+import random
+import threading
+import time
+
+import gspread
+import requests
+
+log = logging.getLogger(__name__)
+
+MARGEM_TOKEN = 300  # s: renova o token quando faltar menos que isso para vencer
+REQUISICOES_POR_MINUTO = 60  # cota padrão do Sheets por usuário
+RESERVA_ESCRITA = 10  # fichas que as leituras não podem usar: escrita nunca fica sem vez
+TENTATIVAS = 5
+ESPERA_BASE = 1.0  # s; dobra a cada tentativa, sorteada entre 0 e o teto
+ESPERA_MAXIMA = 32.0
+
+
+class Cota:
+    # Balde de fichas: enche `por_minuto` fichas por minuto, cada requisição gasta uma.
+    # Leituras deixam uma reserva para as escritas e esperam enquanto houver escrita na fila.
+    def __init__(self, por_minuto=REQUISICOES_POR_MINUTO, reserva_escrita=RESERVA_ESCRITA):
+        self.capacidade = float(por_minuto)
+        self.taxa = por_minuto / 60.0
+        self.reserva = min(reserva_escrita, por_minuto - 1)
+        self._fichas = self.capacidade
+        self._ultimo = time.monotonic()
+        self._escritas_esperando = 0
+        self._cond = threading.Condition()
+
+    def consumir(self, escrita=False):
+        # Bloqueia até haver ficha; devolve quanto tempo esperou
+        inicio = time.monotonic()
+        minimo = 1 if escrita else 1 + self.reserva
+        with self._cond:
+            self._escritas_esperando += escrita
+            try:
+                while True:
+                    self._repor()
+                    if self._fichas >= minimo and (escrita or not self._escritas_esperando):
+                        self._fichas -= 1
+                        return time.monotonic() - inicio
+                    self._cond.wait(max((minimo - self._fichas) / self.taxa, 0.05))
+            finally:
+                self._escritas_esperando -= escrita
+                self._cond.notify_all()
+
+    def esgotar(self):
+        # A API respondeu 429: ninguém do processo tenta de novo antes do balde voltar a encher
+        with self._cond:
+            self._repor()
+            self._fichas = min(self._fichas, 0.0)
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+
+class ConexaoPlanilha:
+    def __init__(self, cliente, chave, margem_token=MARGEM_TOKEN, cota=None, tentativas=TENTATIVAS):
+        self.cliente = cliente
+        self.chave = chave
+        self.margem_token = margem_token
+        self.cota = cota or Cota()
+        self.tentativas = tentativas
+        self.contadores = {"requisicoes": 0, "repeticoes": 0, "falhas": 0, "espera_cota_s": 0.0, "espera_erro_s": 0.0, "tempo_api_s": 0.0}
+        self._planilha = None
+        self._abas = {}
+        self._trava = threading.RLock()
+        self._trava_contadores = threading.Lock()
+
+    def planilha(self):
+        with self._trava:
+            self._renovar_token()
+            if self._planilha is None:
+                self._planilha, self._abas = self._chamar(lambda: self.cliente.open_by_key(self.chave)), {}
+            return self._planilha
+
+    def aba(self, nome):
+        with self._trava:
+            ss = self.planilha()
+            if nome not in self._abas:
+                try:
+                    self._abas[nome] = self._chamar(lambda: ss.worksheet(nome))
+                except gspread.exceptions.WorksheetNotFound:
+                    # A planilha aberta pode estar desatualizada: reabre uma vez antes de desistir
+                    self.invalidar()
+                    ss = self.planilha()
+                    self._abas[nome] = self._chamar(lambda: ss.worksheet(nome))
+            return self._abas[nome]
+
+    # --- Chamadas usadas pelo Sincronizador ---
+    def marca(self):
+        # Data de modificação do arquivo no Drive. gspread >= 6 expõe get_lastUpdateTime();
+        # versões anteriores, a propriedade lastUpdateTime.
+        ss = self.planilha()
+        obter = getattr(ss, "get_lastUpdateTime", None)
+        return self._chamar(obter if obter else lambda: ss.lastUpdateTime)
+
+    def ler_intervalos(self, intervalos):
+        ss = self.planilha()
+        return self._chamar(lambda: ss.values_batch_get(intervalos))
+
+    def acrescentar_linhas(self, aba, linhas):
+        ws = self.aba(aba)
+        return self._chamar(lambda: ws.append_rows(linhas, value_input_option="RAW"), escrita=True, repetir=False)
+
+    def atualizar_intervalos(self, data):
+        ss = self.planilha()
+        return self._chamar(lambda: ss.values_batch_update({"valueInputOption": "RAW", "data": data}), escrita=True)
+
+    def estatisticas(self):
+        with self._trava_contadores:
+            return dict(self.contadores)
+
+    def _chamar(self, funcao, escrita=False, repetir=True):
+        for tentativa in range(self.tentativas if repetir else 1):
+            espera = self.cota.consumir(escrita)
+            self._contar(requisicoes=1, espera_cota_s=espera)
+            try:
+                return self._cronometrar(funcao)
+            except Exception as e:
+                if not repetir or not _repetivel(e) or tentativa == self.tentativas - 1:
+                    self._contar(falhas=1)
+                    raise
+                if _codigo(e) == 429:
+                    self.cota.esgotar()
+                pausa = random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** tentativa))
+                log.info("API da planilha respondeu %s; nova tentativa em %.1fs", e, pausa)
+                self._contar(repeticoes=1, espera_erro_s=pausa)
+                time.sleep(pausa)
+
+    def _cronometrar(self, funcao):
+        inicio = time.perf_counter()
+        try:
+            return funcao()
+        finally:
+            self._contar(tempo_api_s=time.perf_counter() - inicio)
+
+    def _contar(self, **valores):
+        with self._trava_contadores:
+            for chave, valor in valores.items():
+                self.contadores[chave] += valor
+
+    def invalidar(self):
+        # Próximo acesso reabre a planilha e volta a localizar as abas (ex.: aba renomeada ou apagada)
+        with self._trava:
+            self._planilha, self._abas = None, {}
+
+    def _renovar_token(self):
+        credenciais = _credenciais(self.cliente)
+        restante = _validade(credenciais)
+        if restante is not None and restante < self.margem_token:
+            _renovar(credenciais)
+
+
+def _codigo(e):
+    return getattr(e, "code", None) if isinstance(e, gspread.exceptions.APIError) else None
+
+
+def _repetivel(e):
+    # Cota (429), erro do servidor (5xx) ou queda de rede: vale tentar de novo
+    codigo = _codigo(e)
+    if codigo is not None:
+        return codigo == 429 or codigo >= 500
+    return isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _credenciais(cliente):
+    # gspread >= 6 guarda as credenciais (já convertidas para google-auth) no http_client
+    return getattr(getattr(cliente, "http_client", None), "auth", None) or getattr(cliente, "auth", None)
+
+
+def _validade(credenciais):
+    # Segundos até o token vencer; None quando ainda não há token (o primeiro pedido busca um)
+    if credenciais is None:
+        return None
+    if hasattr(credenciais, "_expires_in"):  # oauth2client
+        return credenciais._expires_in()
+    expira = getattr(credenciais, "expiry", None)  # google-auth (UTC sem fuso)
+    if expira is None:
+        return None
+    return (expira - datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)).total_seconds()
+
+
+def _renovar(credenciais):
+    if hasattr(credenciais, "_expires_in"):
+        import httplib2
+        credenciais.refresh(httplib2.Http())
+    else:
+        from google.auth.transport.requests import Request
+        credenciais.refresh(Request())
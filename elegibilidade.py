@@ -0,0 +1,80 @@
+# --- ELEGIBILIDADE DE VOLUNTÁRIOS ---
+# Matriz usuário x departamento e níveis numéricos montados uma vez por versão dos dados.
+# "Quem pode assumir esta vaga" vira uma combinação de máscaras numpy, para uma vaga ou várias.
+import numpy as np
+import pandas as pd
+
+from indices import normalizar_nome
+
+TIPO_ESTRITO = "Nível Superior"
+NIVEL_DESCONHECIDO = 99  # nível de atividade fora do mapa: ninguém está apto (mesma regra do app.py)
+
+
+def niveis_atividade(niveis, mapa_niveis_num):
+    return np.array([mapa_niveis_num.get(str(n).strip(), NIVEL_DESCONHECIDO) for n in niveis], dtype=np.int16)
+
+
+def regra_nivel(niv_usuario, niv_atividade, tipo):
+    # Regras da coluna Tipo do app.py: "Nível Superior" exige nível estritamente maior; "Nível da
+    # atividade e superiores" e Tipo vazio aceitam nível igual ou maior. Aceita arrays (broadcast).
+    return np.where(np.asarray(tipo) == TIPO_ESTRITO, niv_usuario > niv_atividade, niv_usuario >= niv_atividade)
+
+
+class MotorElegibilidade:
+    def __init__(self, df_us, mapa_niveis_num):
+        self.nomes = df_us['Nome'].astype(str).to_numpy()
+        self.niveis_txt = df_us['Nivel'].astype(str).to_numpy()
+        self.nomes_norm = np.array([normalizar_nome(n) for n in self.nomes], dtype=object)
+        self.niveis = np.array([mapa_niveis_num.get(n.strip(), 0) for n in self.niveis_txt], dtype=np.int16)
+        deps = df_us['Departamentos'].astype(str).str.split(",").explode().str.strip()
+        deps = deps[deps != ""]
+        self.departamentos = {d: i for i, d in enumerate(sorted(deps.unique()))}
+        self.membros = np.zeros((len(df_us), len(self.departamentos)), dtype=bool)
+        posicoes = df_us.index.get_indexer(deps.index)
+        self.membros[posicoes, deps.map(self.departamentos).to_numpy()] = True
+        self._mapa = mapa_niveis_num
+        self._posicao = {}
+        for i, n in enumerate(self.nomes_norm):
+            self._posicao.setdefault(n, i)
+
+    def aptos(self, departamento, nivel, tipo, ocupados=()):
+        # Máscara booleana sobre os usuários para uma vaga
+        col = self.departamentos.get(str(departamento).strip())
+        if col is None:
+            return np.zeros(len(self.nomes), dtype=bool)
+        niv = self._mapa.get(str(nivel).strip(), NIVEL_DESCONHECIDO)
+        mascara = self.membros[:, col] & regra_nivel(self.niveis, niv, tipo)
+        if ocupados:
+            mascara &= ~np.isin(self.nomes_norm, list(ocupados))
+        return mascara
+
+    def aptos_lote(self, departamentos, niveis, tipos):
+        # Matriz vagas x usuários para muitas vagas de uma vez (sem checar conflitos de horário)
+        cols = np.array([self.departamentos.get(str(d).strip(), -1) for d in departamentos], dtype=np.intp)
+        membros = np.concatenate([self.membros, np.zeros((len(self.nomes), 1), dtype=bool)], axis=1)
+        niv = niveis_atividade(niveis, self._mapa)
+        return membros[:, cols].T & regra_nivel(self.niveis[None, :], niv[:, None], np.asarray(tipos)[:, None])
+
+    def posicoes(self, nomes):
+        # Usuário de cada nome (pelo nome normalizado, como na escala); -1 para quem não está cadastrado
+        return np.array([self._posicao.get(normalizar_nome(n), -1) for n in nomes], dtype=np.intp)
+
+    def rotulos(self, mascara):
+        return [f"{n} ({l})" for n, l in zip(self.nomes[mascara], self.niveis_txt[mascara])]
+
+
+def visao_usuario(df_ev, nivel_usuario, departamentos, nome):
+    # Atividades que um voluntário pode ver, já com as marcas de status. Fica em cache por
+    # (e-mail, versão): trocar um filtro do painel vira máscara sobre este quadro pequeno.
+    # Pos é a posição da linha em df_ev (para iloc); o índice continua sendo o original.
+    mascara = df_ev['Departamento'].isin(departamentos).to_numpy() & regra_nivel(
+        nivel_usuario, df_ev['Niv_N'].to_numpy(), df_ev['Tipo'].astype(str).to_numpy())
+    pos = np.flatnonzero(mascara)
+    sub = df_ev.iloc[pos]
+    v1_vazio, v2_vazio = (sub['Voluntário 1'] == "").to_numpy(), (sub['Voluntário 2'] == "").to_numpy()
+    nome = normalizar_nome(nome)
+    return pd.DataFrame({
+        'Pos': pos, 'Data_Dt': sub['Data_Dt'].to_numpy(), 'Departamento': sub['Departamento'], 'Nível': sub['Nível'],
+        'Aberta': v1_vazio | v2_vazio, 'Vazia': v1_vazio & v2_vazio,
+        'Minha': ((sub['Vol1_Norm'] == nome) | (sub['Vol2_Norm'] == nome)).to_numpy(),
+    }, index=sub.index)
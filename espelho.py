@@ -0,0 +1,622 @@
+# --- ESPELHO LOCAL DA PLANILHA (SQLite) ---
+# Todas as telas leem daqui. O Sincronizador roda em segundo plano: envia as escritas
+# pendentes para o Google Sheets e traz de volta o conteúdo atualizado das abas.
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import gspread
+import pandas as pd
+from gspread.utils import absolute_range_name, fill_gaps, rowcol_to_a1
+
+log = logging.getLogger(__name__)
+
+ABAS = ("Calendario_Eventos", "Usuarios", "Diretores")
+CAMINHO_PADRAO = os.environ.get("ESCALA_DB", "escala_local.db")
+MAX_TENTATIVAS = 5
+RESERVA_EXPIRA = 120  # s: envio reservado por um processo que morreu volta para a fila
+LIDERANCA_EXPIRA = 120  # s: sem renovação nesse prazo, outro processo assume as sincronizações
+INTERVALO = 60  # s: um só calendário de sincronização para todos os apps que dividem o espelho
+VIGIA = 2.0  # s: de quanto em quanto tempo cada processo confere a versão, a liderança e a fila
+FOLGA_RELOGIO = 1.0  # s: diferença tolerada entre o relógio do Google e o local
+VERSAO_ESQUEMA = 2
+
+# Cada linha guarda a versão em que mudou pela última vez: quem já tem o quadro montado
+# busca só as linhas com versão maior. "estrutura" muda quando o cabeçalho muda ou linhas
+# somem, e aí o quadro precisa ser remontado inteiro.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS abas (
+    aba TEXT PRIMARY KEY, cabecalho TEXT NOT NULL, estrutura INTEGER NOT NULL, atualizado_em REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS linhas (
+    aba TEXT NOT NULL, linha INTEGER NOT NULL, valores TEXT NOT NULL, versao INTEGER NOT NULL,
+    PRIMARY KEY (aba, linha)
+);
+CREATE INDEX IF NOT EXISTS linhas_versao ON linhas (aba, versao);
+CREATE TABLE IF NOT EXISTS pendentes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    aba TEXT NOT NULL, tipo TEXT NOT NULL, linha INTEGER, coluna INTEGER NOT NULL, valores TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pendente', tentativas INTEGER NOT NULL DEFAULT 0, erro TEXT,
+    criado_em REAL NOT NULL, dono TEXT, reservado_em REAL, concluido_em REAL
+);
+"""
+
+
+class EspelhoLocal:
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self._trava = threading.RLock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False, timeout=30)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        if self._con.execute("PRAGMA user_version").fetchone()[0] < VERSAO_ESQUEMA:
+            # Espelho de uma versão anterior: descarta a cópia das abas (a fila de envio é mantida)
+            self._con.executescript("DROP TABLE IF EXISTS abas; DROP TABLE IF EXISTS linhas;")
+            self._con.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+        self._con.executescript(ESQUEMA)
+        colunas = {c[1] for c in self._con.execute("PRAGMA table_info(pendentes)")}
+        if "dono" not in colunas:
+            self._con.executescript(
+                "ALTER TABLE pendentes ADD COLUMN dono TEXT; ALTER TABLE pendentes ADD COLUMN reservado_em REAL;")
+        if "concluido_em" not in colunas:
+            self._con.execute("ALTER TABLE pendentes ADD COLUMN concluido_em REAL")
+        self._quadros = {}  # aba -> (versão, estrutura, DataFrame) já montado em memória
+        # Id sorteado uma vez por arquivo: se o espelho for recriado, a contagem de versões recomeça e
+        # o que foi gravado com o id antigo (ex.: instantâneos em disco) não vale mais
+        with self._con:
+            self._con.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('id', ?)", (uuid.uuid4().hex,))
+        self.id = self.meta("id")
+
+    # --- 1. LEITURA ---
+    def versao(self):
+        with self._trava:
+            r = self._con.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()
+        return int(r[0]) if r else 0
+
+    def meta(self, chave):
+        with self._trava:
+            r = self._con.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return r[0] if r else None
+
+    def gravar_meta(self, chave, valor):
+        with self._trava, self._con:
+            self._con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, str(valor)))
+
+    def liderar(self, dono, duracao=LIDERANCA_EXPIRA, chave="lider"):
+        # Concessão com prazo: só o processo líder consulta a planilha, os outros leem o espelho.
+        # Renovar é a mesma operação; se o líder morrer, o primeiro a tentar depois do prazo assume.
+        # Outras `chave`s dão concessões independentes (ex.: quem grava cada instantâneo).
+        agora = time.time()
+        with self._trava, self._con:
+            self._con.execute(
+                "INSERT INTO meta (chave, valor) VALUES (:chave, :valor) ON CONFLICT(chave) DO UPDATE "
+                "SET valor = excluded.valor WHERE json_extract(meta.valor, '$.dono') = :dono "
+                "OR json_extract(meta.valor, '$.expira') < :agora",
+                {"chave": chave, "valor": json.dumps({"dono": dono, "expira": agora + duracao}), "dono": dono, "agora": agora})
+            return json.loads(self.meta(chave))["dono"] == dono
+
+    def vazio(self, abas=ABAS):
+        with self._trava:
+            presentes = {r[0] for r in self._con.execute("SELECT aba FROM abas")}
+        return not set(abas) <= presentes
+
+    def ler_aba(self, aba, colunas_padrao=None):
+        with self._trava:
+            r = self._con.execute("SELECT cabecalho, estrutura FROM abas WHERE aba = ?", (aba,)).fetchone()
+            cabecalho = [c.strip() for c in json.loads(r[0])] if r else []
+            if not cabecalho:
+                return pd.DataFrame(columns=list(colunas_padrao or []))
+            cache = self._quadros.get(aba)
+            if cache and cache[1] == r[1]:
+                # Só as linhas alteradas desde a última leitura são decodificadas e mescladas
+                versao, _, df = cache
+                delta = self._con.execute(
+                    "SELECT linha, valores, versao FROM linhas WHERE aba = ? AND versao > ? ORDER BY linha",
+                    (aba, versao)).fetchall()
+                if delta:
+                    df = _mesclar_quadro(df, _montar_quadro(delta, cabecalho))
+            else:
+                versao, delta = 0, self._con.execute(
+                    "SELECT linha, valores, versao FROM linhas WHERE aba = ? ORDER BY linha", (aba,)).fetchall()
+                df = _montar_quadro(delta, cabecalho)
+            self._quadros[aba] = (max([versao] + [v for _, _, v in delta]), r[1], df)
+        return df.copy()
+
+    def linhas_desde(self, aba, versao):
+        # Só as linhas que mudaram depois de `versao` (mesmo formato do ler_aba), ou None se a
+        # estrutura da aba mudou nesse meio (cabeçalho novo ou linhas removidas)
+        with self._trava:
+            r = self._con.execute("SELECT cabecalho, estrutura FROM abas WHERE aba = ?", (aba,)).fetchone()
+            if r is None or r[1] > versao:
+                return None
+            delta = self._con.execute(
+                "SELECT linha, valores, versao FROM linhas WHERE aba = ? AND versao > ? ORDER BY linha",
+                (aba, versao)).fetchall()
+        return _montar_quadro(delta, [c.strip() for c in json.loads(r[0])])
+
+    # --- 2. ESCRITA LOCAL (entra na fila de envio) ---
+    # `esperado`: valor que a tela mostrava na célula. Se o espelho já tem outro (outra sessão ou
+    # processo gravou antes), a escrita é recusada e volta None em vez do ticket.
+    def atualizar_celula(self, aba, linha, coluna, valor, esperado=None):
+        return self._registrar(aba, "celula", linha, coluna, [valor], esperado)
+
+    def atualizar_linha(self, aba, linha, coluna, valores):
+        return self._registrar(aba, "intervalo", linha, coluna, list(valores))
+
+    def acrescentar_linha(self, aba, valores):
+        return self._registrar(aba, "acrescimo", None, 1, list(valores))
+
+    # Lotes: todas as escritas entram numa transação só e andam a versão uma vez. O Sincronizador
+    # já junta a fila num único values_batch_update (células) ou append_rows (linhas novas).
+    # celulas: (linha, coluna, valor) ou (linha, coluna, valor, esperado); recusadas voltam None.
+    def atualizar_celulas(self, aba, celulas):
+        return self._registrar_lote(aba, [("celula", c[0], c[1], [c[2]], c[3] if len(c) > 3 else None) for c in celulas])
+
+    def acrescentar_linhas(self, aba, linhas):
+        return self._registrar_lote(aba, [("acrescimo", None, 1, list(valores), None) for valores in linhas])
+
+    def _registrar(self, aba, tipo, linha, coluna, valores, esperado=None):
+        return self._registrar_lote(aba, [(tipo, linha, coluna, valores, esperado)])[0]
+
+    def _registrar_lote(self, aba, itens):
+        ids, escritas, versao = [], [], None
+        with self._trava, self._con:
+            for tipo, linha, coluna, valores, esperado in itens:
+                if tipo == "acrescimo":
+                    ultima = self._con.execute("SELECT MAX(linha) FROM linhas WHERE aba = ?", (aba,)).fetchone()[0]
+                    linha = (ultima or 1) + 1
+                linha, coluna = int(linha), int(coluna)  # índices do pandas chegam como numpy.int64
+                r = self._con.execute("SELECT valores FROM linhas WHERE aba = ? AND linha = ?", (aba, linha)).fetchone()
+                atual = json.loads(r[0]) if r else []
+                if esperado is not None and _celula(atual, coluna) != str(esperado).strip():
+                    ids.append(None)
+                    continue
+                if versao is None:
+                    versao = self._nova_versao()  # só anda se alguma escrita entrar
+                self._con.execute(
+                    "INSERT OR REPLACE INTO linhas (aba, linha, valores, versao) VALUES (?, ?, ?, ?)",
+                    (aba, linha, json.dumps(_sobrepor(atual, coluna, valores)), versao))
+                cur = self._con.execute(
+                    "INSERT INTO pendentes (aba, tipo, linha, coluna, valores, criado_em) VALUES (?, ?, ?, ?, ?, ?)",
+                    (aba, tipo, linha, coluna, json.dumps(valores), time.time()))
+                escritas.append((linha, coluna, valores))
+                ids.append(cur.lastrowid)
+            if escritas:
+                self._corrigir_quadro(aba, escritas, versao)
+        return ids
+
+    def _corrigir_quadro(self, aba, escritas, versao):
+        # Aplica as escritas direto no quadro em memória, sem reler nada do SQLite. Se nenhuma outra
+        # linha da aba mudou desde o quadro, ele passa a valer para a versão nova; senão outra
+        # escrita (de outro processo) entrou no meio e a próxima leitura busca o resto pelo delta.
+        cache = self._quadros.get(aba)
+        if cache is None:
+            return
+        versao_quadro, estrutura, df = cache
+        celulas = {}  # (índice, coluna) -> valor; a última escrita do lote na mesma célula vale
+        for linha, coluna, valores in escritas:
+            for j, v in enumerate(valores[:max(0, len(df.columns) - coluna + 1)]):
+                celulas[(linha - 2, coluna - 1 + j)] = str(v)
+        novas = sorted({i for i, _ in celulas} - set(df.index))
+        if novas:
+            df = pd.concat([df, pd.DataFrame("", columns=df.columns, index=pd.Index(novas, dtype="int64"))]).sort_index()
+        por_coluna = {}
+        for (i, j), v in celulas.items():
+            por_coluna.setdefault(j, {})[i] = v
+        for j, valores in por_coluna.items():
+            df.loc[list(valores), df.columns[j]] = list(valores.values())
+        # As linhas deste lote são as únicas com a versão nova; qualquer outra acima do quadro é alheia
+        outras = self._con.execute(
+            "SELECT MAX(versao) FROM linhas WHERE aba = ? AND versao < ?", (aba, versao)).fetchone()[0] or 0
+        self._quadros[aba] = (versao if outras <= versao_quadro else versao_quadro, estrutura, df)
+
+    def _nova_versao(self):
+        self._con.execute(
+            "INSERT INTO meta (chave, valor) VALUES ('versao', '1') "
+            "ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1")
+        return int(self._con.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0])
+
+    # --- 3. FILA DE ENVIO ---
+    def total_pendentes(self):
+        with self._trava:
+            return self._con.execute("SELECT COUNT(*) FROM pendentes WHERE status = 'pendente'").fetchone()[0]
+
+    def reservar_pendentes(self, limite=500):
+        # Reserva atômica (vale entre processos que dividem o arquivo): cada escrita é enviada por um só
+        dono = uuid.uuid4().hex
+        agora = time.time()
+        with self._trava, self._con:
+            self._con.execute("DELETE FROM pendentes WHERE status IN ('ok', 'substituida') AND criado_em < ?", (agora - 86400,))
+            self._con.execute(
+                "UPDATE pendentes SET status = 'enviando', dono = ?, reservado_em = ? WHERE id IN ("
+                "SELECT id FROM pendentes WHERE status = 'pendente' OR (status = 'enviando' AND reservado_em < ?) "
+                "ORDER BY id LIMIT ?)", (dono, agora, agora - RESERVA_EXPIRA, limite))
+            linhas = self._con.execute(
+                "SELECT id, aba, tipo, linha, coluna, valores, tentativas FROM pendentes WHERE dono = ? AND status = 'enviando' ORDER BY id",
+                (dono,)).fetchall()
+        return [{"id": i, "aba": a, "tipo": t, "linha": l, "coluna": c, "valores": json.loads(v), "tentativas": n}
+                for i, a, t, l, c, v, n in linhas]
+
+    def concluir(self, ids):
+        with self._trava, self._con:
+            self._con.executemany("UPDATE pendentes SET status = 'ok', erro = NULL, concluido_em = ? WHERE id = ?",
+                                  [(time.time(), i) for i in ids])
+
+    def substituir(self, ids):
+        # Escritas que outra escrita posterior na mesma célula sobrescreveu antes do envio: o valor
+        # delas nunca chega à planilha, então não são confirmadas como 'ok'
+        with self._trava, self._con:
+            self._con.executemany(
+                "UPDATE pendentes SET status = 'substituida', erro = 'outra escrita na mesma célula veio depois', "
+                "concluido_em = ? WHERE id = ?", [(time.time(), i) for i in ids])
+
+    def registrar_falha(self, ids, erro, definitiva=False):
+        # Erro temporário devolve a escrita para a fila; depois de MAX_TENTATIVAS (ou erro definitivo)
+        # ela é abandonada e a próxima leitura da planilha prevalece
+        with self._trava, self._con:
+            self._con.executemany(
+                "UPDATE pendentes SET tentativas = tentativas + 1, erro = ?, "
+                "status = CASE WHEN ? OR tentativas + 1 >= ? THEN 'erro' ELSE 'pendente' END WHERE id = ?",
+                [(str(erro), definitiva, MAX_TENTATIVAS, i) for i in ids])
+            return self._con.execute(
+                f"SELECT COUNT(*) FROM pendentes WHERE status = 'erro' AND id IN ({','.join('?' * len(ids))})",
+                list(ids)).fetchone()[0]
+
+    def status_escritas(self, ids):
+        # Confirmação por escrita para a tela que a fez: {id: (status, erro)}; status 'pendente',
+        # 'enviando', 'ok', 'erro' ou 'substituida'
+        if not ids:
+            return {}
+        with self._trava:
+            linhas = self._con.execute(
+                f"SELECT id, status, erro FROM pendentes WHERE id IN ({','.join('?' * len(ids))})", list(ids)).fetchall()
+        return {i: (st, erro) for i, st, erro in linhas}
+
+    # --- 4. CARGA VINDA DA PLANILHA ---
+    def mesclar_aba(self, aba, valores, baixado_em=None):
+        # Compara o conteúdo baixado com o espelho e grava só as linhas que mudaram.
+        # Se nada mudou a versão não anda e os caches de todas as sessões continuam valendo.
+        cabecalho, corpo = (valores[0], valores[1:]) if valores else ([], [])
+        novas = {i + 2: v for i, v in enumerate(corpo)}
+        with self._trava, self._con:
+            # Escritas ainda não enviadas continuam valendo por cima do que veio da planilha. As que
+            # outro processo concluiu depois do início do download (`baixado_em`) podem não ter
+            # entrado nele e também continuam valendo.
+            for l, c, v in self._con.execute(
+                    "SELECT linha, coluna, valores FROM pendentes WHERE aba = ? AND (status IN ('pendente', 'enviando') "
+                    "OR (status = 'ok' AND concluido_em >= ?)) ORDER BY id",
+                    (aba, time.time() if baixado_em is None else baixado_em)).fetchall():
+                novas[l] = _sobrepor(list(novas.get(l, [])), c, json.loads(v))
+            novas = {l: json.dumps(v) for l, v in novas.items()}
+            atuais = dict(self._con.execute("SELECT linha, valores FROM linhas WHERE aba = ?", (aba,)).fetchall())
+            mudadas = [l for l, v in novas.items() if atuais.get(l) != v]
+            removidas = [l for l in atuais if l not in novas]
+            r = self._con.execute("SELECT cabecalho, estrutura FROM abas WHERE aba = ?", (aba,)).fetchone()
+            mesmo_cabecalho = r is not None and r[0] == json.dumps(cabecalho)
+            if mesmo_cabecalho and not mudadas and not removidas:
+                return []
+            versao = self._nova_versao()
+            estrutura = r[1] if mesmo_cabecalho and not removidas else versao
+            self._con.execute(
+                "INSERT OR REPLACE INTO abas (aba, cabecalho, estrutura, atualizado_em) VALUES (?, ?, ?, ?)",
+                (aba, json.dumps(cabecalho), estrutura, time.time()))
+            self._con.executemany("DELETE FROM linhas WHERE aba = ? AND linha = ?", [(aba, l) for l in removidas])
+            self._con.executemany(
+                "INSERT OR REPLACE INTO linhas (aba, linha, valores, versao) VALUES (?, ?, ?, ?)",
+                [(aba, l, novas[l], versao) for l in mudadas])
+        return mudadas
+
+
+def _sobrepor(atual, coluna, valores):
+    fim = coluna - 1 + len(valores)
+    atual.extend([""] * (fim - len(atual)))
+    atual[coluna - 1:fim] = [str(v) for v in valores]
+    return atual
+
+
+def _celula(valores, coluna):
+    return str(valores[coluna - 1]).strip() if coluna <= len(valores) else ""
+
+
+def _montar_quadro(linhas, cabecalho):
+    # índice = linha da planilha - 2, igual ao get_all_records (o app soma 2 para escrever)
+    n = len(cabecalho)
+    return pd.DataFrame([(json.loads(v) + [""] * n)[:n] for _, v, _ in linhas], columns=cabecalho,
+                        index=pd.Index([l - 2 for l, _, _ in linhas], dtype="int64"))
+
+
+def _mesclar_quadro(df, delta):
+    existentes = delta.index.intersection(df.index)
+    df.loc[existentes] = delta.loc[existentes]
+    novas = delta.index.difference(df.index)
+    return pd.concat([df, delta.loc[novas]]).sort_index() if len(novas) else df
+
+
+class Sincronizador(threading.Thread):
+    def __init__(self, espelho, conexao, abas=ABAS, intervalo=INTERVALO, reconciliar_a_cada=12,
+                 espera_lote=1.0, lote_maximo=50):
+        super().__init__(name="sincronizador-planilha", daemon=True)
+        self.espelho = espelho
+        self.conexao = conexao  # ConexaoPlanilha: planilha e abas abertas uma vez só
+        self.abas = abas
+        self.intervalo = intervalo
+        self.reconciliar_a_cada = reconciliar_a_cada
+        self.espera_lote = espera_lote
+        self.lote_maximo = lote_maximo
+        self.ultimo_erro = None
+        self._ao_atualizar = []
+        self._versao_avisada = None
+        self._rodadas = 0
+        self.dono = uuid.uuid4().hex
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._rodada = threading.Lock()
+
+    def sincronizar(self, completo=False):
+        # A sonda (data de modificação do arquivo no Drive) é uma chamada pequena. As abas só são
+        # baixadas quando alguém mudou a planilha por fora do app; as nossas próprias escritas já
+        # estão no espelho. A cada `reconciliar_a_cada` rodadas baixa tudo mesmo assim, por garantia.
+        with self._rodada:
+            inicio = time.time()
+            pedida = self._recarga_pedida()
+            marca = self.conexao.marca()
+            externa = not self._marca_em_dia(marca)
+            enviada, de_fora = self._enviar_com_marca()
+            if enviada is not None:
+                # Edição de fora junto com o nosso envio: baixa as abas agora, já com as nossas
+                # escritas, em vez de esconder a edição até a próxima reconciliação
+                marca, externa = enviada, externa or de_fora
+            self._rodadas += 1
+            if completo or pedida or externa or self._rodadas % self.reconciliar_a_cada == 0:
+                baixado_em = time.time()
+                for aba, valores in self.baixar_abas().items():
+                    self.espelho.mesclar_aba(aba, valores, baixado_em)
+            self._gravar_marca(marca)
+            self.espelho.gravar_meta("sincronizado_em", inicio)
+
+    def _marca_em_dia(self, marca):
+        return all(self.espelho.meta(f"marca:{aba}") == marca for aba in self.abas)
+
+    def _gravar_marca(self, marca):
+        for aba in self.abas:
+            self.espelho.gravar_meta(f"marca:{aba}", marca)
+
+    def _enviar_com_marca(self):
+        # Envia a fila e, se algo foi enviado, lê a marca nova: (marca, pode_ser_de_fora), ou
+        # (None, False) se a fila estava vazia. A marca só é "nossa" se cair dentro do nosso envio;
+        # se não der para afirmar isso (edição de fora logo depois, ou marca que não é uma data),
+        # pode_ser_de_fora vem True.
+        envio = time.time()
+        if not self.enviar_pendentes():
+            return None, False
+        fim_envio = time.time()
+        marca = self.conexao.marca()
+        instante = _instante(marca)
+        return marca, instante is None or not envio - FOLGA_RELOGIO <= instante <= fim_envio + FOLGA_RELOGIO
+
+    def atualizado_em(self):
+        # Última conferência bem-sucedida com a planilha (fica no espelho, vale entre reinícios)
+        valor = self.espelho.meta("sincronizado_em")
+        return datetime.fromtimestamp(float(valor)) if valor else None
+
+    def desatualizado(self):
+        # A última tentativa de sincronizar falhou, neste processo ou no líder
+        return self.ultimo_erro is not None or bool(self.espelho.meta("erro_sincronizacao"))
+
+    def _recarga_pedida(self):
+        # Pedido feito depois do início da última sincronização bem-sucedida
+        return float(self.espelho.meta("recarga_pedida") or 0) > float(self.espelho.meta("sincronizado_em") or 0)
+
+    def _atrasada(self):
+        return time.time() - float(self.espelho.meta("sincronizado_em") or 0) >= self.intervalo
+
+    def ao_atualizar(self, funcao):
+        # funcao(versao) roda nesta thread sempre que a versão do espelho muda: os apps usam para
+        # montar os quadros da versão nova antes que alguma sessão precise deles
+        self._ao_atualizar.append(funcao)
+
+    def _avisar(self):
+        versao = self.espelho.versao()
+        if versao == self._versao_avisada:
+            return
+        self._versao_avisada = versao
+        try:
+            for aba in self.abas:
+                self.espelho.ler_aba(aba)  # quadros em memória em dia: escritas locais só corrigem o que já está montado
+            for funcao in self._ao_atualizar:
+                funcao(versao)
+        except Exception as e:
+            log.warning("Falha ao preparar a versão %s dos dados: %s", versao, e)
+
+    def baixar_abas(self):
+        # Todas as abas num único values_batch_get (uma ida à API em vez de uma por aba).
+        # A API corta células e linhas vazias do fim; fill_gaps deixa igual ao get_all_values.
+        resposta = self.conexao.ler_intervalos([absolute_range_name(aba) for aba in self.abas])
+        return {aba: fill_gaps(intervalo.get("values", []))
+                for aba, intervalo in zip(self.abas, resposta.get("valueRanges", []))}
+
+    def enviar_pendentes(self):
+        # Junta as escritas de todas as sessões: acréscimos viram um append_rows por aba e as
+        # edições de célula viram um único values_batch_update. Várias escritas na mesma célula
+        # se fundem e só o último valor é enviado.
+        lote = self.espelho.reservar_pendentes()
+        acrescimos, edicoes = defaultdict(list), [p for p in lote if p["tipo"] != "acrescimo"]
+        substituidas = _substituidas(edicoes)
+        if substituidas:
+            self.espelho.substituir(substituidas)
+            edicoes = [p for p in edicoes if p["id"] not in substituidas]
+        for p in lote:
+            if p["tipo"] == "acrescimo":
+                acrescimos[p["aba"]].append(p)
+        envios = [(itens, lambda itens, aba=aba: self.conexao.acrescentar_linhas(aba, [p["valores"] for p in itens]))
+                  for aba, itens in acrescimos.items()]
+        if edicoes:
+            envios.append((edicoes, lambda itens: self.conexao.atualizar_intervalos(_intervalos(itens))))
+        erros = []
+        for itens, chamada in envios:
+            try:
+                self._enviar(itens, chamada)
+            except Exception as e:
+                erros.append(e)
+        if erros:
+            raise erros[0]
+        return len(lote)
+
+    def _enviar(self, itens, chamada):
+        if itens[0]["tipo"] == "acrescimo" and any(p["tipo"] == "acrescimo" and p["tentativas"] for p in itens):
+            itens = self._sem_acrescimos_gravados(itens)
+            if not itens:
+                return
+        try:
+            chamada(itens)
+        except Exception as e:
+            definitiva = _erro_definitivo(e)
+            if definitiva and len(itens) > 1 and itens[0]["tipo"] != "acrescimo":
+                # Requisição inválida: reenvia uma a uma para que só a escrita culpada falhe
+                for p in itens:
+                    try:
+                        self._enviar([p], chamada)
+                    except Exception:
+                        continue
+                return
+            if self.espelho.registrar_falha([p["id"] for p in itens], e, definitiva):
+                self.recarregar()  # escrita abandonada: o espelho volta a mostrar o que está na planilha
+            raise
+        self.espelho.concluir([p["id"] for p in itens])
+
+    def _sem_acrescimos_gravados(self, itens):
+        # Um append que falhou por rede/servidor pode ter sido gravado mesmo assim: antes de reenviar,
+        # confere na planilha. Linhas já presentes são dadas como enviadas, as outras seguem no lote.
+        aba = itens[0]["aba"]
+        resposta = self.conexao.ler_intervalos([absolute_range_name(aba)])
+        na_planilha = Counter(_linha_normalizada(v) for v in fill_gaps(resposta["valueRanges"][0].get("values", [])))
+        gravados, faltando = [], []
+        for p in itens:
+            linha = _linha_normalizada(p["valores"])
+            if p["tentativas"] and na_planilha[linha] > 0:
+                na_planilha[linha] -= 1
+                gravados.append(p["id"])
+            else:
+                faltando.append(p)
+        if gravados:
+            self.espelho.concluir(gravados)
+        return faltando
+
+    def acordar(self):
+        self._acordar.set()
+
+    def parar(self):
+        # Encerra o laço de run() na próxima volta (o que estiver em andamento termina antes)
+        self._parar.set()
+        self.acordar()
+
+    def recarregar(self):
+        # Pedido de sincronização completa: quem pediu não espera por ela. Fica no espelho para que o
+        # processo líder atenda, seja qual for o app que pediu.
+        self.espelho.gravar_meta("recarga_pedida", time.time())
+        self.acordar()
+
+    def descarregar(self):
+        # Envio entre as rodadas (ou de um processo que não é o líder). A marca que o envio deixa na
+        # planilha fica registrada no espelho como nossa, senão a próxima rodada do líder baixaria
+        # tudo de novo. Se a planilha já tinha mudado por fora antes, ou pode ter mudado junto,
+        # pede a recarga em vez de registrar.
+        if self.espelho.total_pendentes():
+            with self._rodada:
+                em_dia = self._marca_em_dia(self.conexao.marca())
+                marca, de_fora = self._enviar_com_marca()
+                if marca is None:
+                    return
+                if em_dia and not de_fora:
+                    self._gravar_marca(marca)
+                else:
+                    self.recarregar()
+
+    def run(self):
+        # Todos os processos enviam as próprias escritas e acompanham a versão do espelho; só o líder
+        # baixa a planilha, quando a última sincronização (de quem quer que tenha sido) fica velha ou
+        # quando algum app pede. Depois de uma falha, o líder espera um `intervalo` para tentar de novo.
+        proxima_tentativa = 0.0
+        while not self._parar.is_set():
+            try:
+                lider = self.espelho.liderar(self.dono)
+                if lider and time.monotonic() >= proxima_tentativa and (self._recarga_pedida() or self._atrasada()):
+                    try:
+                        self.sincronizar()
+                    except Exception as e:
+                        proxima_tentativa = time.monotonic() + self.intervalo
+                        self.espelho.gravar_meta("erro_sincronizacao", e)
+                        raise
+                    self.espelho.gravar_meta("erro_sincronizacao", "")
+                else:
+                    self.descarregar()
+                self.ultimo_erro = None
+            except Exception as e:
+                self.ultimo_erro = e
+                if _erro_definitivo(e):
+                    self.conexao.invalidar()  # aba renomeada/apagada: resolve os handles de novo na próxima rodada
+                log.warning("Falha ao sincronizar com a planilha: %s", e)
+            self._avisar()
+            if self._acordar.wait(VIGIA):
+                # Chegou escrita: espera um pouco para juntar outras no mesmo lote, a menos que já esteja cheio
+                limite = time.monotonic() + self.espera_lote
+                while self.espelho.total_pendentes() < self.lote_maximo and time.monotonic() < limite:
+                    self._acordar.clear()
+                    self._acordar.wait(limite - time.monotonic())
+            self._acordar.clear()
+
+
+def _substituidas(edicoes):
+    # Ids das edições com alguma célula que uma edição posterior do mesmo lote troca por outro valor
+    finais = {}
+    for p in edicoes:
+        for k, v in enumerate(p["valores"]):
+            finais[(p["aba"], p["linha"], p["coluna"] + k)] = str(v)
+    return {p["id"] for p in edicoes
+            if any(finais[(p["aba"], p["linha"], p["coluna"] + k)] != str(v) for k, v in enumerate(p["valores"]))}
+
+
+def _intervalos(edicoes):
+    # Funde as edições célula a célula (a última vence) e reagrupa colunas vizinhas da mesma linha
+    celulas = {}
+    for p in edicoes:
+        for k, v in enumerate(p["valores"]):
+            celulas[(p["aba"], p["linha"], p["coluna"] + k)] = v
+    data, atual = [], None
+    for (aba, linha, coluna), v in sorted(celulas.items()):
+        if atual and atual[:2] == (aba, linha) and atual[3] == coluna - 1:
+            atual[3] = coluna
+            atual[4].append(v)
+        else:
+            atual = [aba, linha, coluna, coluna, [v]]
+            data.append(atual)
+    return [{"range": absolute_range_name(aba, f"{rowcol_to_a1(l, c1)}:{rowcol_to_a1(l, c2)}"), "values": [vals]}
+            for aba, l, c1, c2, vals in data]
+
+
+def _instante(marca):
+    # Marca do Drive ("2024-05-01T12:00:00.123Z") em segundos desde a época; None se não for uma data
+    try:
+        return datetime.fromisoformat(str(marca).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _linha_normalizada(valores):
+    linha = [str(v) for v in valores]
+    while linha and linha[-1] == "":
+        linha.pop()
+    return tuple(linha)
+
+
+def _erro_definitivo(e):
+    # 4xx (menos 429, que é cota) não adianta repetir
+    codigo = getattr(e, "code", None) if isinstance(e, gspread.exceptions.APIError) else None
+    return codigo is not None and 400 <= codigo < 500 and codigo != 429
+
@@ -0,0 +1,286 @@
+# --- ÍNDICES SOBRE A TABELA DE EVENTOS ---
+# Estruturas montadas uma vez por versão dos dados e compartilhadas entre as sessões
+# (ficam em st.cache_resource nos apps). Cada uma sabe se está em dia com a versão do espelho.
+import bisect
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+
+from preparo import faixas_horario
+
+VAZIOS = {"", "---", "nan", "none"}
+COLUNAS_VOLUNTARIOS = ("Voluntário 1", "Voluntário 2")
+
+
+def normalizar_nome(nome):
+    return str(nome).lower().strip()
+
+
+def remendo(mudanca, versao_atual, versao):
+    # (linhas antes, linhas depois) quando a `mudanca` do QuadroEventos (preparo.py) leva um índice
+    # que está em `versao_atual` exatamente até `versao`; senão None e o índice remonta tudo
+    if mudanca is None or mudanca[0] != versao_atual or mudanca[1] != versao:
+        return None
+    return mudanca[2], mudanca[3]
+
+
+def fatia_por_data(datas, inicio=None, fim=None):
+    # datas em ordem crescente com NaT no fim, como saem de preparar_eventos: devolve (a, b) com as
+    # posições de inicio <= data < fim, por busca binária. Sem `fim`, vai até a última data válida.
+    a = 0 if inicio is None else np.searchsorted(datas, pd.Timestamp(inicio).to_datetime64(), 'left')
+    b = np.searchsorted(datas, np.datetime64('NaT') if fim is None else pd.Timestamp(fim).to_datetime64(), 'left')
+    return int(a), int(max(a, b))
+
+
+class IndiceDatas:
+    # Consultas por intervalo de datas sobre df_ev (já ordenado por data) sem máscara sobre a tabela
+    # inteira: "a partir de", "esta semana" e "departamento D no intervalo" viram fatias O(log n + k).
+    # Por departamento guarda as posições dele em ordem de data e as datas correspondentes.
+    def __init__(self):
+        self.versao = None
+        self._datas = np.array([], dtype='datetime64[ns]')
+        self._por_depto = {}
+
+    def atualizar(self, df_ev, versao, mudanca=None):
+        if versao == self.versao:
+            return self
+        trocas = remendo(mudanca, self.versao, versao)
+        if trocas is not None and trocas[0]['Departamento'].astype(str).equals(trocas[1]['Departamento'].astype(str)):
+            # mesmas datas (garantido pelo remendo) e mesmos departamentos: as posições continuam valendo
+            self.versao = versao
+            return self
+        datas = df_ev['Data_Dt'].to_numpy()
+        validas = fatia_por_data(datas)[1]
+        deps = df_ev['Departamento'].astype(str).to_numpy()[:validas]
+        ordem = np.argsort(deps, kind='stable')  # estável: dentro de cada departamento segue a ordem de data
+        nomes, inicios = np.unique(deps[ordem], return_index=True)
+        por_depto = {}
+        for nome, a, b in zip(nomes, inicios, list(inicios[1:]) + [validas]):
+            por_depto[nome] = (ordem[a:b], datas[ordem[a:b]])
+        self._datas, self._por_depto, self.versao = datas, por_depto, versao
+        return self
+
+    def posicoes(self, inicio=None, fim=None, departamentos=None):
+        # Posições (para iloc) em ordem de data; departamentos=None é a agenda inteira
+        if departamentos is None:
+            return np.arange(*fatia_por_data(self._datas, inicio, fim))
+        partes = []
+        for depto in dict.fromkeys(departamentos):
+            if depto in self._por_depto:
+                pos, datas = self._por_depto[depto]
+                a, b = fatia_por_data(datas, inicio, fim)
+                partes.append(pos[a:b])
+        return np.sort(np.concatenate(partes)) if partes else np.array([], dtype=np.intp)
+
+
+class _Agenda:
+    # Compromissos de um voluntário num dia em ordem de início, com o maior fim até cada posição:
+    # "algo se sobrepõe a [a, b)?" é uma busca binária pelo primeiro início >= b
+    __slots__ = ("inicios", "fins", "horarios", "fim_max")
+
+    def __init__(self):
+        self.inicios, self.fins, self.horarios, self.fim_max = [], [], [], []
+
+    def incluir(self, inicio, fim, horario):
+        i = bisect.bisect_right(self.inicios, inicio)
+        self.inicios.insert(i, inicio)
+        self.fins.insert(i, fim)
+        self.horarios.insert(i, horario)
+        self._refazer(i)
+
+    def remover(self, horario):
+        if horario in self.horarios:
+            i = self.horarios.index(horario)
+            del self.inicios[i], self.fins[i], self.horarios[i]
+            self._refazer(i)
+
+    def sobreposto(self, inicio, fim):
+        # Horario de um compromisso que cruza [inicio, fim), ou None
+        i = bisect.bisect_left(self.inicios, fim)
+        if i == 0 or self.fim_max[i - 1] <= inicio:
+            return None
+        return next(self.horarios[j] for j in range(i - 1, -1, -1) if self.fins[j] > inicio)
+
+    def _refazer(self, i):
+        anterior = self.fim_max[i - 1] if i else float("-inf")
+        self.fim_max[i:] = list(itertools.accumulate(self.fins[i:], max, initial=anterior))[1:]
+
+
+class IndiceConflitos:
+    # (data, horário, voluntário normalizado) -> atividade que ocupa aquele horário. Além do
+    # horário idêntico, conta como conflito qualquer sobreposição das faixas "09:00-11:00" x
+    # "10:00-12:00" (agenda de cada voluntário por dia); Horario sem hora legível só conflita com o
+    # mesmo texto. Também guarda quantas atividades cada voluntário tem em cada semana.
+    # df_ev vem de preparar_eventos (Data_Dt, Inicio_Min e Fim_Min já prontos).
+    def __init__(self):
+        self.versao = None
+        self._ocupacao = {}  # (data, horário, nome) -> atividades, na ordem da tabela (a mesma pessoa pode estar em duas)
+        self._por_horario = {}  # (data, horário) -> nomes normalizados ocupados
+        self._horarios_dia = {}  # data -> horários com alguém ocupado
+        self._agendas = {}  # data -> nome normalizado -> _Agenda
+        self._semanas = {}  # (nome normalizado, segunda-feira) -> atividades
+        self._faixas = {}  # horário -> (início, fim) em minutos, ou None
+        self._trava = threading.Lock()
+
+    def atualizar(self, df_ev, versao, mudanca=None):
+        if versao == self.versao:
+            return self
+        with self._trava:
+            trocas = remendo(mudanca, self.versao, versao)
+            if trocas is not None:
+                # Só as linhas que mudaram: saem os voluntários de antes, entram os de depois
+                antes, depois = trocas
+                self._trocar([(row, nome, None) for _, row in antes.iterrows() for nome in self._nomes(row)]
+                             + [(row, None, nome) for _, row in depois.iterrows() for nome in self._nomes(row)])
+                self.versao = versao
+                return self
+        ocupacao, partes = {}, []
+        for col in COLUNAS_VOLUNTARIOS:
+            nomes = df_ev[col].astype(str).str.lower().str.strip()
+            sub = df_ev[~nomes.isin(VAZIOS)]
+            datas, horarios = sub['Data Específica'].astype(str).str.strip(), sub['Horario'].astype(str).str.strip()
+            # listas Python: iterar direto sobre colunas de texto do Arrow custa bem mais
+            chaves = zip(datas.tolist(), horarios.tolist(), nomes[sub.index].tolist())
+            for chave, ev, dep, hor in zip(chaves, sub['Nome do Evento'].tolist(), sub['Departamento'].tolist(), sub['Horario'].tolist()):
+                ocupacao.setdefault(chave, []).append({'Nome do Evento': ev, 'Departamento': dep, 'Horario': hor})
+            partes.append(pd.DataFrame({'data': datas, 'nome': nomes[sub.index], 'horario': horarios,
+                                        'inicio': sub['Inicio_Min'], 'fim': sub['Fim_Min'], 'data_dt': sub['Data_Dt']}))
+        compromissos = pd.concat(partes, ignore_index=True)
+        por_horario, horarios_dia = {}, {}
+        for data, horario, nome in ocupacao:
+            por_horario.setdefault((data, horario), set()).add(nome)
+        for data, horario in por_horario:
+            horarios_dia.setdefault(data, set()).add(horario)
+        distintos = compromissos.drop_duplicates('horario')
+        faixas = {h: self._faixa_de(i, f) for h, i, f in zip(distintos['horario'], distintos['inicio'], distintos['fim'])}
+
+        # Agendas montadas já em ordem (dia, voluntário, início): cada compromisso entra no fim da lista
+        legiveis = compromissos[compromissos['inicio'].notna()].sort_values(['data', 'nome', 'inicio'], kind='stable')
+        agendas = {}
+        for data, nome, horario in zip(legiveis['data'].tolist(), legiveis['nome'].tolist(), legiveis['horario'].tolist()):
+            agenda = agendas.setdefault(data, {}).get(nome)
+            if agenda is None:
+                agenda = agendas[data][nome] = _Agenda()
+            inicio, fim = faixas[horario]
+            agenda.inicios.append(inicio)
+            agenda.fins.append(fim)
+            agenda.horarios.append(horario)
+            agenda.fim_max.append(max(agenda.fim_max[-1], fim) if agenda.fim_max else fim)
+        semanas = compromissos.groupby(['nome', compromissos['data_dt'].dt.to_period('W-SUN').dt.start_time]).size().to_dict()
+        with self._trava:
+            self._ocupacao, self._por_horario, self._horarios_dia = ocupacao, por_horario, horarios_dia
+            self._agendas, self._semanas = agendas, semanas
+            self._faixas.update(faixas)
+            self.versao = versao
+        return self
+
+    def conflito(self, data, horario, nome):
+        data, horario, nome = str(data).strip(), str(horario).strip(), normalizar_nome(nome)
+        igual = self._ocupacao.get((data, horario, nome))
+        if igual:
+            return igual[0]
+        agenda, faixa = self._agendas.get(data, {}).get(nome), self.faixa(horario)
+        if agenda is None or faixa is None:
+            return None
+        outro = agenda.sobreposto(*faixa)
+        if outro is None:
+            return None
+        # a mesma pessoa em duas atividades de horário idêntico: a que ficou na agenda ainda vale
+        return (self._ocupacao.get((data, outro, nome)) or [{'Nome do Evento': "", 'Departamento': "", 'Horario': outro}])[0]
+
+    def ocupados(self, data, horario):
+        # Nomes normalizados com atividade que cruza este horário na data (poucos horários por dia)
+        data, horario = str(data).strip(), str(horario).strip()
+        ocupados = set()
+        for outro in self._horarios_dia.get(data, ()):
+            if self.cruzam(horario, outro):
+                ocupados.update(self._por_horario[(data, outro)])
+        return ocupados
+
+    def carga_semanal(self, nome, data):
+        # Atividades do voluntário na semana (segunda a domingo) que contém `data`
+        semana = pd.Timestamp(data).to_period('W-SUN').start_time if pd.notna(data) else None
+        return self._semanas.get((normalizar_nome(nome), semana), 0)
+
+    def faixa(self, horario):
+        # (início, fim) em minutos para o texto do Horario; None quando não tem hora legível
+        horario = str(horario).strip()
+        if horario not in self._faixas:
+            inicio, fim = faixas_horario(pd.Series([horario], dtype=object))
+            self._faixas[horario] = self._faixa_de(inicio.iloc[0], fim.iloc[0])
+        return self._faixas[horario]
+
+    def cruzam(self, horario_a, horario_b):
+        # Dois horários do mesmo dia que não podem ter a mesma pessoa
+        a, b = self.faixa(horario_a), self.faixa(horario_b)
+        if str(horario_a).strip() == str(horario_b).strip():
+            return True
+        return a is not None and b is not None and a[0] < b[1] and b[0] < a[1]
+
+    @staticmethod
+    def _faixa_de(inicio, fim):
+        if pd.isna(inicio):
+            return None
+        return float(inicio), float(inicio + 1 if pd.isna(fim) else fim)  # só o início: vale o minuto de início
+
+    # --- Atualização incremental depois de uma escrita feita pelo próprio app ---
+    # Se a versão só andou por causa desta escrita, o índice continua em dia sem reconstrução.
+    def ocupar(self, row, nome, versao_antes, versao_depois):
+        self.aplicar([(row, None, nome)], versao_antes, versao_depois)
+
+    def liberar(self, row, nome, versao_antes, versao_depois):
+        self.aplicar([(row, nome, None)], versao_antes, versao_depois)
+
+    def aplicar(self, mudancas, versao_antes, versao_depois):
+        # Várias vagas numa escrita só (ações em lote): [(row, nome que sai, nome que entra)]
+        with self._trava:
+            self._trocar(mudancas)
+            self._avancar(versao_antes, versao_depois)
+
+    def _trocar(self, mudancas):
+        for row, sai, entra in mudancas:
+            faixa = self.faixa(row['Horario'])
+            semana = self._semana(row)
+            atividade = {k: row[k] for k in ('Nome do Evento', 'Departamento', 'Horario')}
+            if sai:
+                chave = self._chave(row, sai)
+                atividades = self._ocupacao.get(chave, [])
+                if atividade in atividades:
+                    atividades.remove(atividade)
+                if not atividades:  # só deixa o horário livre se a pessoa não estiver em outra atividade nele
+                    self._ocupacao.pop(chave, None)
+                    self._por_horario.get(chave[:2], set()).discard(chave[2])
+                agenda = self._agendas.get(chave[0], {}).get(chave[2])
+                if agenda is not None:
+                    agenda.remover(chave[1])
+                if (chave[2], semana) in self._semanas:
+                    self._semanas[(chave[2], semana)] -= 1
+            if entra:
+                chave = self._chave(row, entra)
+                self._ocupacao.setdefault(chave, []).append(atividade)
+                self._por_horario.setdefault(chave[:2], set()).add(chave[2])
+                self._horarios_dia.setdefault(chave[0], set()).add(chave[1])
+                if faixa is not None:
+                    self._agendas.setdefault(chave[0], {}).setdefault(chave[2], _Agenda()).incluir(*faixa, chave[1])
+                if semana is not None:
+                    self._semanas[(chave[2], semana)] = self._semanas.get((chave[2], semana), 0) + 1
+
+    @staticmethod
+    def _nomes(row):
+        return [row[col] for col in COLUNAS_VOLUNTARIOS if normalizar_nome(row[col]) not in VAZIOS]
+
+    def _chave(self, row, nome):
+        return (str(row['Data Específica']).strip(), str(row['Horario']).strip(), normalizar_nome(nome))
+
+    @staticmethod
+    def _semana(row):
+        data = row.get('Data_Dt')
+        if data is None:
+            data = pd.to_datetime(str(row['Data Específica']).strip(), errors='coerce', dayfirst=True)
+        return pd.Timestamp(data).to_period('W-SUN').start_time if pd.notna(data) else None
+
+    def _avancar(self, versao_antes, versao_depois):
+        if self.versao == versao_antes and versao_depois == versao_antes + 1:
+            self.versao = versao_depois
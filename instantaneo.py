@@ -0,0 +1,80 @@
+# --- INSTANTÂNEOS DOS QUADROS EM DISCO (Parquet) ---
+# Os quadros já preparados pelos loaders ficam gravados ao lado do espelho, com a versão dos dados.
+# Depois de um reinício o loader lê o instantâneo da versão atual em vez de remontar tudo a partir
+# do SQLite. Quem grava é o Sincronizador (fora das sessões) do processo que tem a concessão
+# daquele instantâneo; quem lê é o loader em cache.
+# O manifesto guarda também o id do espelho (EspelhoLocal.id): um espelho recriado recomeça a
+# contagem de versões, e sem o id um instantâneo antigo passaria por atual. Pelo mesmo motivo
+# guarda a versão do preparo (preparo.VERSAO_PREPARO) e a impressão digital do mapa de níveis:
+# quadros montados por outro código ou com outros níveis não servem.
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+import pandas as pd
+
+from espelho import CAMINHO_PADRAO
+from preparo import VERSAO_PREPARO
+
+log = logging.getLogger(__name__)
+
+PASTA_PADRAO = CAMINHO_PADRAO + ".instantaneos"
+
+
+def _manifesto(pasta, nome):
+    return os.path.join(pasta, f"{nome}.json")
+
+
+def _identidade(versao, espelho_id, niveis):
+    digital = hashlib.sha1(json.dumps(niveis, sort_keys=True).encode()).hexdigest()[:16]
+    return {"versao": versao, "espelho": espelho_id, "preparo": VERSAO_PREPARO, "niveis": digital}
+
+
+def _mesma(manifesto, identidade):
+    return all(manifesto.get(k) == v for k, v in identidade.items())
+
+
+def ler(nome, versao, espelho_id, niveis=None, pasta=PASTA_PADRAO):
+    # Tupla de DataFrames gravada para exatamente esta versão deste espelho, com o mesmo preparo e
+    # o mesmo mapa de níveis, ou None
+    try:
+        with open(_manifesto(pasta, nome), encoding="utf-8") as f:
+            manifesto = json.load(f)
+        if not _mesma(manifesto, _identidade(versao, espelho_id, niveis)):
+            return None
+        return tuple(pd.read_parquet(os.path.join(pasta, arquivo)) for arquivo in manifesto["arquivos"])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning("Instantâneo %s ilegível, remontando os dados: %s", nome, e)
+        return None
+
+
+def gravar(nome, versao, espelho_id, niveis, quadros, pasta=PASTA_PADRAO):
+    # Cada gravação usa arquivos novos e só então troca o manifesto: quem lê nunca vê uma mistura
+    # de versões. Os arquivos do manifesto anterior são apagados depois da troca.
+    caminho = _manifesto(pasta, nome)
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            anterior = json.load(f)
+    except Exception:
+        anterior = {"versao": None, "arquivos": []}
+    identidade = _identidade(versao, espelho_id, niveis)
+    if _mesma(anterior, identidade):
+        return
+    os.makedirs(pasta, exist_ok=True)
+    marca = uuid.uuid4().hex[:8]
+    arquivos = [f"{nome}-{versao}-{marca}-{i}.parquet" for i in range(len(quadros))]
+    for df, arquivo in zip(quadros, arquivos):
+        df.to_parquet(os.path.join(pasta, arquivo))
+    temporario = f"{caminho}.{marca}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({**identidade, "arquivos": arquivos}, f)
+    os.replace(temporario, caminho)
+    for arquivo in anterior["arquivos"]:
+        try:
+            os.remove(os.path.join(pasta, arquivo))
+        except OSError:
+            pass
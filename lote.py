@@ -0,0 +1,154 @@
+# --- AÇÕES EM LOTE DA ESCALA (app2.py) ---
+# Cada função monta um plano com uma linha por célula: onde gravar (linha/coluna da planilha), o
+# valor novo e, quando a célula não pode mudar, o motivo. Nada aqui escreve: o app mostra o plano e
+# grava as linhas sem motivo de uma vez só (EspelhoLocal.atualizar_celulas / acrescentar_linhas).
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import alocacao
+from indices import COLUNAS_VOLUNTARIOS, VAZIOS, normalizar_nome
+
+CAMPOS_EVENTO = ['Data_Dt', 'Data Específica', 'Horario', 'Departamento', 'Nível', 'Nome do Evento']
+CAMPOS_USUARIO = ['Email', 'Nome', 'Telefone', 'Departamentos', 'Nivel']
+
+
+def vagas(df):
+    # Uma linha por vaga (evento x Voluntário 1/2), na ordem de df; coluna 8/9 como nos dialogs
+    partes = []
+    for n, col in enumerate(COLUNAS_VOLUNTARIOS, 1):
+        parte = df[CAMPOS_EVENTO].copy()
+        parte['Tipo'] = df['Tipo'].astype(str) if 'Tipo' in df.columns else ""
+        parte['Vaga'] = n
+        parte['Atual'] = df[col].astype(str).str.strip()
+        parte['linha'], parte['coluna'] = df.index + 2, 7 + n
+        parte['_ordem'] = np.arange(len(df))
+        partes.append(parte)
+    if not partes[0].empty:
+        return pd.concat(partes).sort_values(['_ordem', 'Vaga'], kind='stable').drop(columns='_ordem').reset_index(drop=True)
+    return pd.DataFrame(columns=[*CAMPOS_EVENTO, 'Tipo', 'Vaga', 'Atual', 'linha', 'coluna'])
+
+
+def _vazia(atual):
+    return atual.str.lower().isin(VAZIOS)
+
+
+def _validar(plano, motor, indice):
+    # Regras dos dialogs para cada linha ainda sem motivo: voluntário cadastrado, apto pelo
+    # departamento e nível/Tipo, e sem outra atividade que cruze o horário, contando o próprio lote
+    motivo = plano['motivo'].to_numpy(dtype=object).copy()
+    pos = motor.posicoes(plano['valor'])
+    aptos = motor.aptos_lote(plano['Departamento'], plano['Nível'], plano['Tipo'])
+    linhas = np.arange(len(plano))
+    apto = aptos[linhas, np.maximum(pos, 0)] & (pos >= 0) if len(plano) else np.zeros(0, dtype=bool)
+    no_lote = {}  # (data, nome) -> horários já aceitos neste lote
+    for i, (data, horario, nome) in enumerate(zip(plano['Data Específica'], plano['Horario'], plano['valor'])):
+        if motivo[i]:
+            continue
+        if pos[i] < 0:
+            motivo[i] = "voluntário não cadastrado"
+            continue
+        if not apto[i]:
+            motivo[i] = "fora do departamento ou do nível da atividade"
+            continue
+        chave = (str(data).strip(), normalizar_nome(nome))
+        if indice.conflito(data, horario, nome) or any(indice.cruzam(horario, h) for h in no_lote.get(chave, ())):
+            motivo[i] = "já tem atividade neste horário"
+            continue
+        no_lote.setdefault(chave, []).append(horario)
+    return plano.assign(motivo=motivo)
+
+
+def validar(plano, df_ev, motor, indice):
+    # Confere de novo, na hora de gravar, um plano montado com dados que podem ter mudado desde então:
+    # a célula ainda precisa ter o valor de 'Atual' e quem entra continua apto e sem conflito
+    idx = pd.Index(plano['linha'].astype(np.int64)) - 2
+    atual = np.where(plano['coluna'].to_numpy() == 8, df_ev[COLUNAS_VOLUNTARIOS[0]].reindex(idx).to_numpy(dtype=object),
+                     df_ev[COLUNAS_VOLUNTARIOS[1]].reindex(idx).to_numpy(dtype=object))
+    atual = pd.Series(atual, index=plano.index).fillna("").astype(str).str.strip()
+    plano = plano.assign(motivo=np.where(atual != plano['Atual'].astype(str).str.strip(), "a vaga mudou desde que o plano foi montado", ""))
+    entra = plano['valor'].astype(str).str.strip() != ""
+    if entra.any():
+        plano.loc[entra, 'motivo'] = _validar(plano[entra], motor, indice)['motivo'].to_numpy()
+    return plano
+
+
+def planejar_inscricao(selecionadas, nome, motor, indice):
+    # O mesmo voluntário em todas as vagas selecionadas
+    plano = selecionadas.assign(valor=nome, motivo=np.where(_vazia(selecionadas['Atual']), "", "vaga já ocupada"))
+    return _validar(plano, motor, indice)
+
+
+def planejar_limpeza(selecionadas):
+    return selecionadas.assign(valor="", motivo=np.where(_vazia(selecionadas['Atual']), "vaga já vazia", ""))
+
+
+def planejar_copia(df_ev, indice_datas, inicio, semanas, departamentos, motor, indice):
+    # Repete a escala das `semanas` anteriores a `inicio` nas `semanas` seguintes: cada vaga preenchida
+    # vai para o mesmo evento (departamento, nome, horário e vaga) na data + semanas * 7 dias
+    desloc = pd.Timedelta(weeks=semanas)
+    inicio = pd.Timestamp(inicio)
+    origem = vagas(df_ev.iloc[indice_datas.posicoes(inicio - desloc, inicio, departamentos)])
+    destino = vagas(df_ev.iloc[indice_datas.posicoes(inicio, inicio + desloc, departamentos)])
+    origem = origem[~_vazia(origem['Atual'])]
+    chaves = ['Data_Dt', 'Departamento', 'Nome do Evento', 'Horario', 'Vaga']
+    origem = origem.assign(Data_Dt=origem['Data_Dt'] + desloc)
+    for df in (origem, destino):
+        for c in ('Departamento', 'Nome do Evento', 'Horario'):
+            df[c] = df[c].astype(str)
+    plano = destino.merge(origem[chaves + ['Atual']].rename(columns={'Atual': 'valor'}), on=chaves, how='inner')
+    plano = plano.drop_duplicates(['linha', 'coluna'])
+    plano = plano[plano['Atual'].map(normalizar_nome) != plano['valor'].map(normalizar_nome)]  # já está lá
+    plano = plano.assign(motivo=np.where(_vazia(plano['Atual']), "", "vaga já ocupada"))
+    return _validar(plano.reset_index(drop=True), motor, indice)
+
+
+def planejar_automatico(df_ev, indice_datas, inicio, fim, departamentos, motor, indice):
+    # Proposta para todas as vagas vazias do período nos departamentos: quem já está em outra
+    # atividade que cruza o horário fica de fora e a carga de partida é o que cada um já tem no período
+    # (em qualquer departamento)
+    todas = vagas(df_ev.iloc[indice_datas.posicoes(inicio, fim)])
+    pos = motor.posicoes(todas.loc[~_vazia(todas['Atual']), 'Atual'])
+    carga = np.bincount(pos[pos >= 0], minlength=len(motor.nomes))
+    abertas = todas[_vazia(todas['Atual']) & todas['Departamento'].astype(str).isin(departamentos)].reset_index(drop=True)
+    grupos = list(zip(abertas['Data Específica'].astype(str).str.strip(), abertas['Horario'].astype(str).str.strip()))
+    aptos = motor.aptos_lote(abertas['Departamento'], abertas['Nível'], abertas['Tipo'])
+    por_horario = {}
+    for i, g in enumerate(grupos):
+        por_horario.setdefault(g, []).append(i)
+    for g, linhas in por_horario.items():
+        ocupados = motor.posicoes(indice.ocupados(*g))
+        aptos[np.ix_(linhas, ocupados[ocupados >= 0])] = False
+    # Horários diferentes do mesmo dia que se cruzam ("09:00-11:00" x "10:00-12:00") também se excluem
+    por_data, sobreposicoes = {}, {}
+    for g in por_horario:
+        por_data.setdefault(g[0], []).append(g)
+    for mesmo_dia in por_data.values():
+        for a, b in itertools.combinations(mesmo_dia, 2):
+            if indice.cruzam(a[1], b[1]):
+                sobreposicoes.setdefault(a, []).append(b)
+                sobreposicoes.setdefault(b, []).append(a)
+    escolha = alocacao.alocar(aptos, grupos, carga, sobreposicoes)
+    return abertas.assign(valor=np.where(escolha >= 0, motor.nomes[np.maximum(escolha, 0)], ""),
+                          motivo=np.where(escolha >= 0, "", "nenhum voluntário disponível"))
+
+
+def validar_usuarios(df_csv, df_us, departamentos, niveis):
+    # Linhas do CSV para a aba Usuarios; os departamentos precisam estar entre os do diretor
+    faltando = [c for c in CAMPOS_USUARIO if c not in df_csv.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes no CSV: {', '.join(faltando)}")
+    df = df_csv[CAMPOS_USUARIO].fillna("").astype(str).apply(lambda c: c.str.strip())
+    df['Email'] = df['Email'].str.lower()
+    deps = df['Departamentos'].str.split(",").map(lambda ds: [d.strip() for d in ds if d.strip()])
+    df['Departamentos'] = deps.map(",".join)
+    cadastrados = set(df_us['Email'].astype(str).str.strip().str.lower())
+    fora = deps.map(lambda ds: [d for d in ds if d not in departamentos])
+    motivo = np.select(
+        [df['Email'] == "", ~df['Email'].str.contains("@", regex=False), df['Email'].isin(cadastrados),
+         df['Email'].duplicated(), df['Nome'] == "", ~df['Nivel'].isin(niveis), deps.map(len) == 0, fora.map(len) > 0],
+        ["sem e-mail", "e-mail inválido", "já cadastrado", "repetido no arquivo", "sem nome", "nível inválido",
+         "sem departamento", "departamento fora da sua gestão: " + fora.map(", ".join)],
+        default="")
+    return df.assign(motivo=motivo)
@@ -0,0 +1,103 @@
+# --- MEDIÇÃO POR RERUN ---
+# Cronometra as etapas de cada rerun (carga, filtros, cartões, escritas) e grava uma linha de log
+# em JSON por rerun no logger "escala.medicao": etapas, acerto/falta dos caches, chamadas à API no
+# período e tempo total. Diretores veem o mesmo registro num expander abrindo o app com ?debug=1.
+# O logger tem o próprio handler (stderr, nível INFO): sem ele o Python só mostraria WARNING para
+# cima e os registros sumiriam. ESCALA_MEDICAO=WARNING desliga.
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+log = logging.getLogger("escala.medicao")
+if not log.handlers:
+    _saida = logging.StreamHandler(sys.stderr)
+    _saida.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    log.addHandler(_saida)
+    log.setLevel(os.environ.get("ESCALA_MEDICAO", "INFO").upper())
+    log.propagate = False  # com o root configurado (logging.basicConfig) a linha sairia duas vezes
+_local = threading.local()  # cada sessão do Streamlit roda o script na sua própria thread
+
+
+class Medidor:
+    def __init__(self, app):
+        self.app = app
+        self.inicio = time.perf_counter()
+        self.etapas = []
+        self.cache = {}
+        self.dados = {}
+        self._faltas = set()
+        self._conexao = None
+        self._api_antes = None
+        self.registro = None
+        _local.atual = self
+
+    @contextmanager
+    def etapa(self, nome, cache=None, **dados):
+        # cache = nome da função em st.cache_*: se ela rodar de fato (falta()), conta como falta
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas.append({"etapa": nome, "ms": round((time.perf_counter() - inicio) * 1000, 2), **dados})
+            if cache:
+                self.cache[cache] = "falta" if cache in self._faltas else "acerto"
+
+    def anotar(self, **dados):
+        self.dados.update(dados)
+
+    def acompanhar_api(self, conexao):
+        self._conexao, self._api_antes = conexao, conexao.estatisticas()
+
+    def concluir(self, tela):
+        if self.registro is not None:
+            return self.registro
+        registro = {"app": self.app, "tela": tela, "total_ms": round((time.perf_counter() - self.inicio) * 1000, 2),
+                    "etapas": self.etapas, "cache": {**dict.fromkeys(self._faltas, "falta"), **self.cache}, **self.dados}
+        if self._conexao is not None:
+            depois = self._conexao.estatisticas()
+            registro["api"] = {k: round(v - self._api_antes.get(k, 0), 3) for k, v in depois.items()}
+        self.registro = registro
+        log.info(json.dumps(registro, ensure_ascii=False, default=str))
+        return registro
+
+
+def iniciar(app):
+    return Medidor(app)
+
+
+@contextmanager
+def medir(app, tela, **dados):
+    # Registro avulso para escritas feitas em dialogs: o dialog roda como fragmento, fora do rerun
+    # que criou o medidor principal. Conclui mesmo quando o bloco termina com st.rerun().
+    anterior = getattr(_local, "atual", None)
+    medidor = Medidor(app)
+    try:
+        with medidor.etapa(tela, **dados):
+            yield medidor
+    finally:
+        medidor.concluir(tela)
+        _local.atual = anterior
+
+
+def falta(nome):
+    # Chamada dentro do corpo das funções em cache: só roda quando o cache não tinha a entrada
+    medidor = getattr(_local, "atual", None)
+    if medidor is not None:
+        medidor._faltas.add(nome)
+
+
+def depuracao_pedida():
+    return st.query_params.get("debug") == "1"
+
+
+def mostrar(medidor, tela):
+    registro = medidor.concluir(tela)
+    with st.expander(f"⏱️ Diagnóstico do rerun: {registro['total_ms']:.0f} ms"):
+        st.dataframe(registro["etapas"], use_container_width=True, hide_index=True)
+        st.json({k: v for k, v in registro.items() if k != "etapas"})
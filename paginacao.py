@@ -0,0 +1,64 @@
+# --- PAGINAÇÃO DOS CARTÕES ---
+# Mostra só uma janela da lista (N cartões, um dia ou uma semana). O custo de cada rerun passa a
+# depender do tamanho da página e não do tamanho do calendário. As chaves dos botões continuam
+# sendo o índice original da linha, então não mudam de uma página para outra.
+import pandas as pd
+import streamlit as st
+
+MODOS = ["Cartões", "Dia", "Semana"]
+TAMANHOS = [10, 20, 50, 100]
+
+
+def paginar(df, modo, tamanho, pagina):
+    # Devolve (fatia, total de páginas, página efetiva, rótulo da página). df vem ordenado por data.
+    if df.empty:
+        return df, 1, 0, ""
+    if modo == "Cartões":
+        total = -(-len(df) // tamanho)
+        pagina = min(max(pagina, 0), total - 1)
+        ini = pagina * tamanho
+        fatia = df.iloc[ini:ini + tamanho]
+        return fatia, total, pagina, f"{ini + 1}–{ini + len(fatia)} de {len(df)}"
+    datas = df['Data_Dt'].dt.normalize()
+    if modo == "Semana":
+        datas = datas - pd.to_timedelta(datas.dt.weekday, unit="D")  # semana de segunda a domingo
+    codigos, grupos = pd.factorize(datas)
+    total = max(len(grupos), 1)
+    pagina = min(max(pagina, 0), total - 1)
+    fatia = df[codigos == pagina]
+    inicio = grupos[pagina]
+    rotulo = inicio.strftime("%d/%m/%Y") if modo == "Dia" else f"{inicio:%d/%m} a {inicio + pd.Timedelta(days=6):%d/%m/%Y}"
+    return fatia, total, pagina, rotulo
+
+
+def controles(chave):
+    c1, c2 = st.columns(2)
+    with c1: modo = st.pills("Exibir:", MODOS, default="Cartões", key=f"{chave}_modo") or "Cartões"
+    with c2: tamanho = st.selectbox("Cartões por página:", TAMANHOS, index=1, key=f"{chave}_tam", disabled=modo != "Cartões")
+    return modo, tamanho
+
+
+def pagina_atual(df, chave, modo, tamanho, filtros):
+    # Volta para a primeira página sempre que algum filtro muda
+    estado = st.session_state.setdefault(chave, {"filtros": None, "pagina": 0})
+    if estado["filtros"] != (filtros, modo, tamanho):
+        estado.update(filtros=(filtros, modo, tamanho), pagina=0)
+    fatia, total, estado["pagina"], rotulo = paginar(df, modo, tamanho, estado["pagina"])
+    estado["total"] = total
+    st.caption(f"📋 {len(df)} atividades encontradas · página {estado['pagina'] + 1} de {total}" + (f" · {rotulo}" if rotulo else ""))
+    return fatia
+
+
+def navegacao(chave):
+    estado = st.session_state.get(chave)
+    if not estado or estado.get("total", 1) <= 1:
+        return
+    c1, c2, c3 = st.columns([1, 2, 1])
+    # Callback: a página muda antes do rerun, sem precisar de um segundo st.rerun()
+    c1.button("⬅️ Anterior", key=f"{chave}_ant", disabled=estado["pagina"] == 0, use_container_width=True, on_click=_mudar_pagina, args=(chave, -1))
+    c2.markdown(f"<div style='text-align: center; padding-top: 6px;'>Página {estado['pagina'] + 1} de {estado['total']}</div>", unsafe_allow_html=True)
+    c3.button("Próxima ➡️", key=f"{chave}_prox", disabled=estado["pagina"] >= estado["total"] - 1, use_container_width=True, on_click=_mudar_pagina, args=(chave, 1))
+
+
+def _mudar_pagina(chave, passo):
+    st.session_state[chave]["pagina"] += passo
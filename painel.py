@@ -1,10 +1,15 @@
 import streamlit as st
-import pandas as pd
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import json
 import os
 from datetime import date
+from espelho import EspelhoLocal, Sincronizador
+from conexao import ConexaoPlanilha
+from preparo import QuadroEventos
+from responsaveis import IndiceDias
+import medicao
+import instantaneo
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(page_title="Quem está na Escala?", layout="wide")
@@ -12,20 +17,63 @@ st.set_page_config(page_title="Quem está na Escala?", layout="wide")
 st.title("🏃‍♂️ Responsáveis por Departamento")
 
 # --- CONEXÃO COM GOOGLE SHEETS ---
-@st.cache_data(ttl=600)  # Atualiza os dados a cada 10 minutos
-def carregar_dados():
+@st.cache_resource
+def get_espelho():
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     creds_dict = json.loads(os.environ["GOOGLE_CREDS"])
     creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
     client = gspread.authorize(creds)
-    ss = client.open_by_key("1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c")
-    
-    df = pd.DataFrame(ss.worksheet("Calendario_Eventos").get_all_records())
-    df['Data_Formatada'] = pd.to_datetime(df['Data Específica'], format='%d/%m/%Y').dt.date
-    return df
+    espelho = EspelhoLocal()
+    sinc = Sincronizador(espelho, ConexaoPlanilha(client, "1paP1ZB2ufwCc95T_gdCR92kx-suXbROnDfbWMC_ka0c"))  # um só calendário para todos os apps (espelho.INTERVALO)
+    if espelho.vazio(sinc.abas): sinc.sincronizar()
+    # A versão nova já fica pronta (e gravada em disco para o próximo reinício) antes do próximo acesso
+    def preparar_versao(versao):
+        df = carregar_dados(versao)
+        get_indice_dias().atualizar(df, versao, get_quadro_eventos().mudanca)  # só os dias das linhas alteradas
+        if espelho.liderar(sinc.dono, chave="instantaneo:painel"):  # um processo grava, não todos
+            instantaneo.gravar("painel", versao, espelho.id, None, (df,))
+    sinc.ao_atualizar(preparar_versao)
+    sinc.start()
+    return espelho, sinc
+
+# Mesmo quadro para todos os visitantes, sem a cópia por rerun do cache_data; ninguém o altera
+@st.cache_resource(max_entries=2)
+def carregar_dados(versao):
+    medicao.falta("carregar_dados")
+    espelho, _ = get_espelho()
+    quadro = get_quadro_eventos()
+    if quadro.versao is None:  # depois de um reinício: quadro desta versão já pronto em disco
+        salvo = instantaneo.ler("painel", versao, espelho.id)
+        if salvo is not None: quadro.guardar(salvo[0], versao); return salvo[0]
+    return quadro.atualizar(espelho, versao)  # a partir da versão anterior, só as linhas alteradas
+
+# Último quadro preparado: a versão seguinte é um remendo dele, não uma preparação completa
+@st.cache_resource
+def get_quadro_eventos():
+    return QuadroEventos()
+
+# Cartões de cada departamento, por data: montados uma vez por versão para todas as datas,
+# trocar a data é só uma consulta ao índice
+@st.cache_resource
+def get_indice_dias():
+    return IndiceDias("departamento")
+
+# O painel costuma ficar aberto numa tela sem ninguém mexendo: quando qualquer app grava ou o
+# espelho recebe mudanças da planilha, a versão compartilhada anda e o painel se redesenha sozinho
+@st.fragment(run_every=10)
+def vigiar_versao(versao):
+    espelho, _ = get_espelho()
+    if espelho.versao() != versao: st.rerun()
 
+med = medicao.iniciar("painel")  # painel público: só o log estruturado, sem expander
 try:
-    df_total = carregar_dados()
+    with med.etapa("espelho"): espelho, sinc = get_espelho()
+    med.acompanhar_api(sinc.conexao)
+    versao = espelho.versao()
+    vigiar_versao(versao)
+    if sinc.desatualizado():
+        quando = sinc.atualizado_em()
+        st.warning(f"⚠️ Sem conexão com a planilha no momento. Exibindo os dados de {quando:%d/%m às %H:%M}." if quando else "⚠️ Sem conexão com a planilha no momento. Exibindo os últimos dados salvos.")
 
     # --- FILTRO DE DATA ---
     col_data, col_info = st.columns([1, 2])
@@ -35,41 +83,28 @@ try:
     with col_info:
         st.info(f"Mostrando escala para: **{data_selecionada.strftime('%d/%m/%Y')}**")
 
-    # Filtrar dados pela data
-    df_dia = df_total[df_total['Data_Formatada'] == data_selecionada]
+    # HTML do dia pronto no índice por data (o quadro só é lido se o índice ainda não está nesta versão)
+    with med.etapa("html_dia"):
+        indice_dias = get_indice_dias()
+        if indice_dias.versao != versao: indice_dias.atualizar(carregar_dados(versao), versao, get_quadro_eventos().mudanca)
+        cartoes = indice_dias.html(data_selecionada)
+    med.anotar(versao=versao, departamentos=len(cartoes))
 
-    if df_dia.empty:
+    if not cartoes:
         st.warning("Nenhuma atividade ou voluntário escalado para esta data.")
     else:
         # --- EXIBIÇÃO POR DEPARTAMENTO ---
-        # Pegamos todos os departamentos únicos para criar a grade
-        departamentos = sorted(df_dia['Departamento'].unique())
-        
         # Criamos colunas para o layout (3 colunas por linha)
         cols = st.columns(3)
-        
-        for i, depto in enumerate(departamentos):
-            with cols[i % 3]:
-                st.subheader(f"🏢 {depto}")
-                eventos_depto = df_dia[df_dia['Departamento'] == depto]
-                
-                for _, row in eventos_depto.iterrows():
-                    v1 = str(row['Voluntário 1']).strip()
-                    v2 = str(row['Voluntário 2']).strip()
-                    horario = row['Horario']
-                    evento = row['Nome do Evento']
-                    nivel = row['Nível']
-                    
-                    # Estilização do Card
-                    with st.container():
-                        st.markdown(f"""
-                        <div style="border: 1px solid #ddd; padding: 10px; border-radius: 10px; margin-bottom: 10px; background-color: #f9f9f9;">
-                            <small style="color: #666;">{horario} - {nivel}</small><br>
-                            <b style="color: #1565c0;">{evento}</b><br>
-                            👤 {v1 if v1 not in ['', '---', 'nan'] else '<i>Vaga Aberta</i>'}<br>
-                            👤 {v2 if v2 not in ['', '---', 'nan'] else '<i>Vaga Aberta</i>'}
-                        </div>
-                        """, unsafe_allow_html=True)
+        blocos = [[], [], []]
+        for i, (depto, html) in enumerate(cartoes.items()):
+            preenchidas, abertas = indice_dias.vagas(data_selecionada, depto)
+            blocos[i % 3].append(f"### 🏢 {depto}\n\n🟢 {preenchidas} preenchidas · 🔴 {abertas} abertas\n\n{html}")
+        for col, bloco in zip(cols, blocos):
+            with col:
+                if bloco: st.markdown("\n\n".join(bloco), unsafe_allow_html=True)
 
 except Exception as e:
+    med.anotar(erro=str(e))
     st.error(f"Erro ao carregar dados: {e}")
+med.concluir("painel")
@@ -0,0 +1,180 @@
+# --- PLANILHA FALSA (substituto offline do gspread) ---
+# Imita a parte da API do gspread usada pelo app (Client -> Spreadsheet -> Worksheet),
+# guardando tudo em memória. Serve para testar a sincronização sem acessar o Google.
+import copy
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+import gspread
+from gspread.utils import a1_to_rowcol
+
+
+def _intervalo(a1):
+    # "B2:E2" -> (2, 2, 2, 5); "C7" -> (7, 3, 7, 3)
+    ini, _, fim = a1.partition(":")
+    l1, c1 = a1_to_rowcol(ini)
+    l2, c2 = a1_to_rowcol(fim) if fim else (l1, c1)
+    return l1, c1, l2, c2
+
+
+class AbaFalsa:
+    def __init__(self, planilha, titulo, valores):
+        self.planilha = planilha
+        self.title = titulo
+        self._valores = [[str(v) for v in linha] for linha in valores]
+
+    # --- LEITURA ---
+    def get_all_values(self):
+        with self.planilha._trava:
+            self.planilha._contar("get_all_values")
+            return copy.deepcopy(self._valores)
+
+    def get_all_records(self):
+        valores = self.get_all_values()
+        if not valores:
+            return []
+        cabecalho = valores[0]
+        return [dict(zip(cabecalho, linha + [""] * (len(cabecalho) - len(linha)))) for linha in valores[1:]]
+
+    def row_values(self, linha):
+        with self.planilha._trava:
+            self.planilha._contar("row_values")
+            return list(self._valores[linha - 1]) if linha <= len(self._valores) else []
+
+    def col_values(self, coluna):
+        with self.planilha._trava:
+            self.planilha._contar("col_values")
+            return [l[coluna - 1] if coluna <= len(l) else "" for l in self._valores]
+
+    # --- ESCRITA ---
+    def update_cell(self, linha, coluna, valor):
+        with self.planilha._trava:
+            self.planilha._contar("update_cell")
+            self._gravar(linha, coluna, [[valor]])
+
+    def update(self, range_name=None, values=None, **kwargs):
+        with self.planilha._trava:
+            self.planilha._contar("update")
+            l1, c1, _, _ = _intervalo(range_name)
+            self._gravar(l1, c1, values)
+
+    def append_row(self, valores, **kwargs):
+        with self.planilha._trava:
+            self.planilha._contar("append_row")
+            self._gravar(len(self._valores) + 1, 1, [valores])
+
+    def append_rows(self, linhas, **kwargs):
+        with self.planilha._trava:
+            self.planilha._contar("append_rows")
+            self._gravar(len(self._valores) + 1, 1, linhas)
+
+    def _gravar(self, linha, coluna, matriz):
+        for i, valores in enumerate(matriz):
+            while len(self._valores) < linha + i:
+                self._valores.append([])
+            atual = self._valores[linha + i - 1]
+            fim = coluna - 1 + len(valores)
+            atual.extend([""] * (fim - len(atual)))
+            atual[coluna - 1:fim] = [str(v) for v in valores]
+        self.planilha._modificado()
+
+
+class PlanilhaFalsa:
+    def __init__(self, abas, id="planilha-falsa"):
+        self.id = id
+        self._trava = threading.RLock()
+        self._abas = {nome: AbaFalsa(self, nome, valores) for nome, valores in abas.items()}
+        self.chamadas = Counter()
+        self.revisao = 0
+        self._modificado_em = time.time()
+
+    def _contar(self, metodo):
+        self.chamadas[metodo] += 1
+
+    def _modificado(self):
+        # Como o Drive: data da última modificação, em milissegundos (e sempre crescente aqui)
+        self.revisao += 1
+        self._modificado_em = max(time.time(), self._modificado_em + 0.001)
+
+    def get_lastUpdateTime(self):
+        with self._trava:
+            self._contar("get_lastUpdateTime")
+            return datetime.fromtimestamp(self._modificado_em, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    def values_batch_get(self, ranges, params=None):
+        # Só abas inteiras ("'Aba'"), como o Sincronizador pede. Igual à API, corta o vazio do fim.
+        with self._trava:
+            self._contar("values_batch_get")
+            saida = []
+            for intervalo in ranges:
+                valores = [list(l) for l in self._abas[intervalo.strip("'")]._valores]
+                for linha in valores:
+                    while linha and linha[-1] == "":
+                        linha.pop()
+                while valores and not valores[-1]:
+                    valores.pop()
+                item = {"range": intervalo, "majorDimension": "ROWS"}
+                if valores:
+                    item["values"] = valores
+                saida.append(item)
+            return {"spreadsheetId": self.id, "valueRanges": saida}
+
+    def values_batch_update(self, body):
+        with self._trava:
+            self._contar("values_batch_update")
+            for item in body["data"]:
+                nome, _, a1 = item["range"].rpartition("!")
+                l1, c1, _, _ = _intervalo(a1)
+                self._abas[nome.strip("'")]._gravar(l1, c1, item["values"])
+
+    def worksheet(self, nome):
+        with self._trava:
+            self._contar("worksheet")
+            if nome not in self._abas:
+                raise gspread.exceptions.WorksheetNotFound(nome)
+            return self._abas[nome]
+
+    def worksheets(self):
+        with self._trava:
+            self._contar("worksheets")
+            return list(self._abas.values())
+
+
+class ClienteFalso:
+    def __init__(self, planilha):
+        self.planilha = planilha
+
+    def open_by_key(self, chave):
+        self.planilha._contar("open_by_key")
+        return self.planilha
+
+
+# --- PLANILHA SINTÉTICA ---
+CABECALHO_EVENTOS = ["Data Específica", "Horario", "Nome do Evento", "Nível", "Departamento", "Tipo", "Obs", "Voluntário 1", "Voluntário 2"]
+CABECALHO_USUARIOS = ["Email", "Nome", "Telefone", "Departamentos", "Nivel"]
+HORARIOS = ["08:00-10:00", "09:00-11:00", "10:00-12:00", "14:00-16:00", "19:00-21:00", "19h às 21h30"]
+TIPOS = ["", "Nível Superior", "Nível da atividade e superiores"]
+
+
+def gerar_planilha(eventos=1000, departamentos=8, niveis=5, usuarios=300, dias=90, preenchimento=0.4, seed=1):
+    # Abas no formato da planilha real (Calendario_Eventos, Usuarios, Diretores), com datas a
+    # partir de hoje. `niveis` é a quantidade ou a lista de nomes; `preenchimento` é a chance
+    # de cada vaga já ter voluntário.
+    r = random.Random(seed)
+    deps = [f"Departamento {i + 1}" for i in range(departamentos)]
+    nivs = [f"AV{i + 1}" for i in range(niveis)] if isinstance(niveis, int) else list(niveis)
+    us = [CABECALHO_USUARIOS]
+    for i in range(usuarios):
+        meus = r.sample(deps, min(len(deps), r.randint(1, 3)))
+        us.append([f"voluntario{i}@exemplo.com", f"Voluntário {i} Silva", f"1199{i:07d}", ",".join(meus), r.choice(nivs + ["Nenhum"])])
+    hoje = date.today()
+    ev = [CABECALHO_EVENTOS]
+    for i in range(eventos):
+        vagas = [r.choice(us[1:])[1] if r.random() < preenchimento else "" for _ in range(2)]
+        ev.append([(hoje + timedelta(days=r.randrange(dias))).strftime("%d/%m/%Y"), r.choice(HORARIOS), f"Evento {i % 40}",
+                   r.choice(nivs), r.choice(deps), r.choice(TIPOS), ""] + vagas)
+    dirs = [["Email", "Departamento"], ["diretor@exemplo.com", ", ".join(deps[:max(1, departamentos // 2)])]]
+    return {"Calendario_Eventos": ev, "Usuarios": us, "Diretores": dirs}, {n: i + 1 for i, n in enumerate(nivs)}
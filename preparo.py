@@ -0,0 +1,103 @@
+# --- PREPARAÇÃO DA TABELA DE EVENTOS ---
+# Roda uma vez por versão dos dados, dentro dos loaders em cache. Cada rerun dos apps recebe o
+# quadro já tipado, ordenado e normalizado, sem repetir to_datetime, mapeamento de níveis e .str.
+import threading
+
+import numpy as np
+import pandas as pd
+
+NIVEL_DESCONHECIDO = 99
+VERSAO_PREPARO = 1  # sobe quando muda o que preparar_eventos monta: instantâneos de outra versão são descartados
+RE_HORA = r'(\d{1,2})\s*(?:[:hH]\s*(\d{2})?)?'
+
+
+def _minutos(partes):
+    h = pd.to_numeric(partes[0], errors='coerce')
+    m = pd.to_numeric(partes[1], errors='coerce').fillna(0)
+    return (h * 60 + m).where(h <= 24)
+
+
+def faixas_horario(horarios):
+    # Horario -> minutos do dia de início e fim ("09:00-11:00", "19h às 21h30", "8h"); um fim que
+    # passa da meia-noite fica depois de 1440. Sem hora reconhecível, NaN.
+    inicio = _minutos(horarios.str.extract(rf'^\D*{RE_HORA}'))
+    fim = _minutos(horarios.str.extract(rf'(?:-|–|às|as|até|a)\s*{RE_HORA}\s*$'))
+    return inicio, fim.where(~(fim < inicio), fim + 1440)
+
+
+def preparar_eventos(df_ev, mapa_niveis_num=None):
+    df = df_ev.copy()
+    for col in ['Data Específica', 'Horario', 'Nome do Evento', 'Departamento', 'Nível', 'Tipo', 'Voluntário 1', 'Voluntário 2']:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip()
+    df['Data_Dt'] = pd.to_datetime(df['Data Específica'], errors='coerce', dayfirst=True)
+    # Início e fim em minutos, para o índice de conflitos comparar faixas que se cruzam
+    df['Inicio_Min'], df['Fim_Min'] = faixas_horario(df['Horario'])
+
+    if mapa_niveis_num is not None:
+        df['Niv_N'] = df['Nível'].map(mapa_niveis_num).fillna(NIVEL_DESCONHECIDO).astype(np.int16)
+    for col, norm in [('Voluntário 1', 'Vol1_Norm'), ('Voluntário 2', 'Vol2_Norm')]:
+        df[norm] = df[col].str.lower()
+    for col in ['Departamento', 'Nível', 'Tipo']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    # Ordem de exibição; o índice original (linha da planilha - 2) é mantido para as escritas
+    return df.sort_values(['Data_Dt', 'Horario'], kind='stable')
+
+
+def atualizar_eventos(df, mudadas, mapa_niveis_num=None):
+    # Quadro preparado + linhas cruas que mudaram desde ele -> (quadro novo, linhas antes, linhas
+    # depois), preparando só as mudadas. None quando não dá para remendar: linha nova, data ou
+    # horário diferente (muda a ordem) ou categoria que o quadro não conhece. O quadro recebido
+    # não é alterado (outras sessões ainda podem estar lendo a versão anterior).
+    if mudadas.empty:
+        return df, df.iloc[:0], df.iloc[:0]
+    depois = preparar_eventos(mudadas, mapa_niveis_num)
+    if list(depois.columns) != list(df.columns) or not depois.index.isin(df.index).all():
+        return None
+    antes = df.loc[depois.index]
+    datas_iguais = (antes['Data_Dt'] == depois['Data_Dt']) | (antes['Data_Dt'].isna() & depois['Data_Dt'].isna())
+    if not (datas_iguais.all() and (antes['Horario'] == depois['Horario']).all()):
+        return None
+    categorias = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if any(not depois[c].isin(df[c].cat.categories).all() for c in categorias):
+        return None
+    novo = df.copy()
+    for col in df.columns:
+        novo.loc[depois.index, col] = depois[col].astype(object) if col in categorias else depois[col]
+    return novo, antes, depois
+
+
+class QuadroEventos:
+    # Último quadro de eventos preparado, com a versão dele. A versão seguinte sai das linhas que
+    # mudaram no espelho (atualizar_eventos), sem repreparar a tabela inteira a cada escrita.
+    # `mudanca` = (versão anterior, versão nova, linhas antes, linhas depois) do último remendo, ou
+    # None depois de uma preparação completa: os índices usam para se atualizar do mesmo jeito.
+    def __init__(self, mapa_niveis_num=None):
+        self.mapa_niveis_num = mapa_niveis_num
+        self.versao = None
+        self.df = None
+        self.mudanca = None
+        self._trava = threading.Lock()
+
+    def atualizar(self, espelho, versao):
+        with self._trava:
+            if self.versao is not None and versao <= self.versao:
+                return self.df  # versão antiga pedida por uma sessão atrasada: o espelho já só tem a atual
+            remendo = None
+            if self.versao is not None:
+                mudadas = espelho.linhas_desde("Calendario_Eventos", self.versao)
+                if mudadas is not None:
+                    remendo = atualizar_eventos(self.df, mudadas, self.mapa_niveis_num)
+            if remendo is None:
+                self.df, self.mudanca = preparar_eventos(espelho.ler_aba("Calendario_Eventos"), self.mapa_niveis_num), None
+            else:
+                self.df, self.mudanca = remendo[0], (self.versao, versao, remendo[1], remendo[2])
+            self.versao = versao
+            return self.df
+
+    def guardar(self, df, versao):
+        # Quadro que veio pronto de outro lugar (instantâneo em disco): a próxima versão parte dele
+        with self._trava:
+            self.df, self.versao, self.mudanca = df, versao, None
@@ -0,0 +1,116 @@
+# --- RESPONSÁVEIS DO DIA (HTML) ---
+# Monta o HTML do dia inteiro de uma vez. Os trechos de cada linha saem de operações de texto
+# vetorizadas e são juntados por grupo num único groupby, sem iterrows nem um markdown por evento.
+# O IndiceDias faz o mesmo para todas as datas de uma vez, uma vez por versão dos dados.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indices import VAZIOS, remendo
+
+
+def _voluntario(col, antes, depois, vaga):
+    nomes = col.astype(str).str.strip()
+    return pd.Series(np.where(nomes.str.lower().isin(VAZIOS), vaga, antes + nomes + depois), index=col.index)
+
+
+def _juntar(textos, chaves):
+    # Igual a textos.groupby(chaves).agg("".join), mas num laço só: com dezenas de milhares de
+    # grupos (todas as datas de uma vez) o agg do pandas fatia uma Series por grupo
+    grupos = textos.groupby(chaves, observed=True)
+    partes = [[] for _ in range(grupos.ngroups)]
+    for codigo, texto in zip(grupos.ngroup().fillna(-1).astype(int).to_numpy(), textos.to_numpy()):
+        if codigo >= 0:
+            partes[codigo].append(texto)
+    return pd.Series(["".join(p) for p in partes], index=grupos.size().index, dtype=object)
+
+
+def _cartoes_atividade(df, cores_niveis, por=()):
+    # Um cartão por (*por, Nível, Evento, Horário); `por` recebe a coluna de datas no índice por dia
+    df = df.sort_values(['Horario', 'Nível'])
+    vagas = [_voluntario(df[col], '<span class="vol-filled">🟢 ', '</span>', '<span class="vol-empty">🔴 Vaga Aberta</span>') for col in ('Voluntário 1', 'Voluntário 2')]
+    caixas = '<div class="depto-box"><b>🏢 ' + df['Departamento'].astype(str) + '</b><div class="vol-status">' + vagas[0] + vagas[1] + '</div></div>'
+    corpos = _juntar(caixas, [*(c[df.index] for c in por), df['Nível'], df['Nome do Evento'], df['Horario']])
+    chaves = corpos.index.to_frame(index=False).iloc[:, len(por):].astype(str)
+    nivel, nome_ev, horario = chaves.iloc[:, 0], chaves.iloc[:, 1], chaves.iloc[:, 2]
+    bg_c = nivel.str.strip().map(cores_niveis).fillna("#f8f9fa")
+    tx_c = pd.Series(np.where(nivel.str.contains("AV2", regex=False), "#FFFFFF", "#000000"), index=nivel.index)
+    html = ('<div class="public-card" style="background-color: ' + bg_c + '; color: ' + tx_c + ';"><div class="public-title" style="border-color: '
+            + tx_c + '44;">' + nivel + ' - ' + nome_ev + ' - ' + horario + '</div>' + corpos.to_numpy() + '</div>')
+    return pd.Series(html.to_numpy(), index=corpos.index)
+
+
+def _cartoes_departamento(df):
+    vagas = [_voluntario(df[col], '👤 ', '', '👤 <i>Vaga Aberta</i>') for col in ('Voluntário 1', 'Voluntário 2')]
+    return ('<div style="border: 1px solid #ddd; padding: 10px; border-radius: 10px; margin-bottom: 10px; background-color: #f9f9f9;">'
+            '<small style="color: #666;">' + df['Horario'].astype(str) + ' - ' + df['Nível'].astype(str) + '</small><br>'
+            '<b style="color: #1565c0;">' + df['Nome do Evento'].astype(str) + '</b><br>' + vagas[0] + '<br>' + vagas[1] + '</div>')
+
+
+def html_por_atividade(df_dia, cores_niveis):
+    # Painel público do app.py: um cartão por (Nível, Evento, Horário), com os departamentos dentro
+    if df_dia.empty:
+        return ""
+    return "".join(_cartoes_atividade(df_dia, cores_niveis))
+
+
+def html_por_departamento(df_dia):
+    # painel.py: {departamento: cartões do dia}, departamentos em ordem alfabética
+    if df_dia.empty:
+        return {}
+    return _juntar(_cartoes_departamento(df_dia), df_dia['Departamento'].astype(str)).to_dict()
+
+
+class IndiceDias:
+    # data -> cartões do dia prontos e contagem de vagas (preenchidas, abertas), para todas as datas
+    # de uma vez. Fica em st.cache_resource como os índices de indices.py: trocar a data no painel
+    # vira uma consulta ao dicionário. por="atividade" (app.py) ou "departamento" (painel.py).
+    def __init__(self, por="atividade", cores_niveis=None):
+        self.por = por
+        self.cores_niveis = cores_niveis or {}
+        self.versao = None
+        self._html = {}
+        self._vagas = {}
+        self._trava = threading.Lock()
+
+    def atualizar(self, df_ev, versao, mudanca=None):
+        if versao == self.versao:
+            return self
+        with self._trava:
+            trocas = remendo(mudanca, self.versao, versao)
+            if trocas is None:
+                self._html, self._vagas = self._montar(df_ev)
+            else:
+                # Só os dias das linhas que mudaram são remontados (as datas delas não mudam)
+                dias = df_ev[df_ev['Data_Dt'].dt.normalize().isin(trocas[1]['Data_Dt'].dt.normalize())]
+                html, vagas = self._montar(dias) if len(dias) else ({}, {})
+                self._html, self._vagas = {**self._html, **html}, {**self._vagas, **vagas}
+            self.versao = versao
+        return self
+
+    def _montar(self, df_ev):
+        df = df_ev[df_ev['Data_Dt'].notna()]
+        dias = df['Data_Dt'].dt.date
+        if self.por == "atividade":
+            cartoes = _cartoes_atividade(df, self.cores_niveis, por=(dias,))
+            html = _juntar(cartoes, cartoes.index.get_level_values(0)).to_dict()
+        else:
+            cartoes = _juntar(_cartoes_departamento(df), [dias, df['Departamento'].astype(str)])
+            html = {dia: grupo.droplevel(0).to_dict() for dia, grupo in cartoes.groupby(level=0)}
+        cheias = sum((~df[col].astype(str).str.strip().str.lower().isin(VAZIOS)).astype(int) for col in ('Voluntário 1', 'Voluntário 2'))
+        contagem = pd.DataFrame({'Preenchidas': cheias, 'Abertas': 2 - cheias}).groupby([dias, df['Departamento'].astype(str)]).sum()
+        vagas = {dia: {d: (int(p), int(a)) for d, p, a in zip(grupo.index.get_level_values(1), grupo['Preenchidas'], grupo['Abertas'])}
+                 for dia, grupo in contagem.groupby(level=0)}
+        return html, vagas
+
+    def html(self, data):
+        # str no modo "atividade", {departamento: str} no modo "departamento"
+        return self._html.get(data, "" if self.por == "atividade" else {})
+
+    def vagas(self, data, departamento=None):
+        # (preenchidas, abertas) no dia, ou só no departamento
+        por_depto = self._vagas.get(data, {})
+        if departamento is not None:
+            return por_depto.get(departamento, (0, 0))
+        return tuple(map(sum, zip(*por_depto.values()))) if por_depto else (0, 0)
@@ -0,0 +1,100 @@
+# --- TESTES DO PREENCHIMENTO AUTOMÁTICO (alocacao.py + lote.planejar_automatico) ---
+import itertools
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import alocacao
+import lote
+from elegibilidade import MotorElegibilidade
+from indices import IndiceConflitos, IndiceDatas
+from preparo import preparar_eventos
+
+NIVEIS = {"Nenhum": 0, "BAS": 1, "AV1": 2, "AV2": 3}
+CABECALHO = ["Data Específica", "Horario", "Nome do Evento", "Nível", "Departamento", "Tipo", "Obs", "Voluntário 1", "Voluntário 2"]
+
+
+def conferir(escolha, aptos, grupos, sobreposicoes):
+    # Ninguém fora dos aptos, ninguém duas vezes no mesmo horário nem em horários que se cruzam
+    por_grupo = {}
+    for v, u in enumerate(escolha):
+        if u >= 0:
+            assert aptos[v, u]
+            por_grupo.setdefault(grupos[v], []).append(u)
+    for g, usuarios in por_grupo.items():
+        assert len(usuarios) == len(set(usuarios)), g
+        for outro in sobreposicoes.get(g, ()):
+            assert not set(usuarios) & set(por_grupo.get(outro, ())), (g, outro)
+
+
+def test_caminho_aumentante_preenche_o_que_a_gulosa_deixaria_vazio():
+    # v0 e v1 pegam os menos carregados (u0, u1); v2 só aceita u0/u1: v1 passa para u2 e v0 para u1
+    aptos = np.array([[1, 1, 0], [0, 1, 1], [1, 1, 0]], dtype=bool)
+    escolha = alocacao.alocar(aptos, ["h"] * 3, [0, 1, 5])
+    assert sorted(escolha) == [0, 1, 2]
+    conferir(escolha, aptos, ["h"] * 3, {})
+
+
+def test_horarios_que_se_cruzam_nao_repetem_voluntario():
+    aptos = np.ones((3, 1), dtype=bool)
+    grupos = [("12/10", "09:00-11:00"), ("12/10", "10:00-12:00"), ("12/10", "14:00-16:00")]
+    sobreposicoes = {grupos[0]: [grupos[1]], grupos[1]: [grupos[0]]}
+    escolha = alocacao.alocar(aptos, grupos, [0], sobreposicoes)
+    assert escolha.tolist() == [0, -1, 0]
+
+
+@pytest.mark.parametrize("semente", range(30))
+def test_um_horario_preenche_o_maximo_de_vagas(semente):
+    r = random.Random(semente)
+    vagas, usuarios = r.randint(1, 5), r.randint(1, 4)
+    aptos = np.array([[r.random() < 0.5 for _ in range(usuarios)] for _ in range(vagas)], dtype=bool)
+    escolha = alocacao.alocar(aptos, ["h"] * vagas, [r.randint(0, 3) for _ in range(usuarios)])
+    conferir(escolha, aptos, ["h"] * vagas, {})
+    # o maior emparelhamento possível, por força bruta
+    maximo = max(sum(u is not None and aptos[v, u] for v, u in enumerate(perm))
+                 for perm in itertools.permutations(list(range(usuarios)) + [None] * vagas, vagas))
+    assert (escolha >= 0).sum() == maximo
+
+
+@pytest.mark.parametrize("semente", range(10))
+def test_varios_horarios_respeitam_as_restricoes(semente):
+    r = random.Random(semente)
+    rotulos = [f"h{i}" for i in range(6)]
+    grupos = [r.choice(rotulos) for _ in range(40)]
+    aptos = np.array([[r.random() < 0.3 for _ in range(8)] for _ in grupos], dtype=bool)
+    sobreposicoes = {}
+    for a, b in itertools.combinations(rotulos, 2):
+        if r.random() < 0.3:
+            sobreposicoes.setdefault(a, []).append(b)
+            sobreposicoes.setdefault(b, []).append(a)
+    conferir(alocacao.alocar(aptos, grupos, np.zeros(8), sobreposicoes), aptos, grupos, sobreposicoes)
+
+
+def test_proposta_so_com_aptos_e_sem_ninguem_duas_vezes_no_horario():
+    df_ev = preparar_eventos(pd.DataFrame([
+        ["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "", ""],
+        ["12/10/2026", "09:00-11:00", "Portaria", "BAS", "Som", "", "", "", ""],
+        ["12/10/2026", "10:00-12:00", "Ensaio", "AV1", "Som", "Nível Superior", "", "", ""],
+        ["12/10/2026", "19:00-21:00", "Culto", "BAS", "Recepção", "", "", "Dani Reis", ""],
+        ["13/10/2026", "09:00-11:00", "Culto", "AV2", "Som", "", "", "", ""],
+    ], columns=CABECALHO), NIVEIS)
+    df_us = pd.DataFrame([["ana@x", "Ana Silva", "1", "Som", "AV2"],
+                          ["bia@x", "Bia Souza", "1", "Som", "BAS"],
+                          ["caio@x", "Caio Lima", "1", "Recepção", "AV2"],  # outro departamento
+                          ["dani@x", "Dani Reis", "1", "Som", "AV1"],
+                          ["edu@x", "Edu Alves", "1", "Som", "Nenhum"]],  # nível abaixo de tudo
+                         columns=lote.CAMPOS_USUARIO)
+    motor, indice = MotorElegibilidade(df_us, NIVEIS), IndiceConflitos().atualizar(df_ev, 1)
+    plano = lote.planejar_automatico(df_ev, IndiceDatas().atualizar(df_ev, 1), pd.Timestamp("2026-10-12"),
+                                     pd.Timestamp("2026-10-14"), ["Som"], motor, indice)
+    propostas = plano[plano['valor'] != ""]
+    assert not propostas['valor'].isin(["Caio Lima", "Edu Alves"]).any()
+    # cada proposta passa pelas mesmas regras dos dialogs (aptidão e conflitos, contando o lote)
+    assert (lote._validar(propostas.assign(motivo=""), motor, indice)['motivo'] == "").all()
+    assert not propostas.duplicated(['Data Específica', 'Horario', 'valor']).any()
+    # "Nível Superior" em AV1: só quem é AV2 (Ana), e ela já está no horário das 09:00 que cruza o Ensaio
+    ensaio = plano[plano['Nome do Evento'] == "Ensaio"]
+    assert set(ensaio['valor']) <= {"Ana Silva", ""}
+    assert plano.loc[plano['Data Específica'] == "13/10/2026", 'valor'].tolist().count("Ana Silva") == 1
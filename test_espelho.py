@@ -0,0 +1,204 @@
+# --- TESTES DO ESPELHO + SINCRONIZADOR (contra a planilha falsa) ---
+import time
+
+import gspread
+import pytest
+import requests
+
+import espelho as modulo_espelho
+from conexao import ConexaoPlanilha, Cota
+from espelho import EspelhoLocal, Sincronizador
+from planilha_falsa import ClienteFalso, PlanilhaFalsa
+
+EVENTOS = [["Data Específica", "Horario", "Nome do Evento", "Voluntário 1"],
+           ["12/10/2026", "09:00-11:00", "Culto", ""],
+           ["14/10/2026", "19:00-21:00", "Ensaio", "Ana Silva"],
+           ["15/10/2026", "19:00-21:00", "Portaria", ""]]
+USUARIOS = [["Email", "Nome"], ["a@x", "Ana Silva"]]
+DIRETORES = [["Email", "Departamento"], ["dir@x", "Som"]]
+
+
+class Resposta:
+    # O mínimo de uma resposta HTTP para montar um gspread APIError
+    def __init__(self, codigo):
+        self.status_code = codigo
+        self.text = "erro"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": "erro", "status": "ERRO"}}
+
+
+@pytest.fixture
+def planilha():
+    return PlanilhaFalsa({"Calendario_Eventos": EVENTOS, "Usuarios": USUARIOS, "Diretores": DIRETORES})
+
+
+@pytest.fixture
+def sinc(planilha, tmp_path):
+    espelho = EspelhoLocal(str(tmp_path / "espelho.db"))
+    return Sincronizador(espelho, ConexaoPlanilha(ClienteFalso(planilha), "teste", cota=Cota(por_minuto=10 ** 6)))
+
+
+@pytest.fixture
+def em_laco(sinc, monkeypatch):
+    # O laço de run() rodando de verdade, com a vigia curta para o teste não esperar 2 s por volta
+    monkeypatch.setattr(modulo_espelho, "VIGIA", 0.05)
+    sinc.intervalo, sinc.espera_lote = 1.0, 0
+    sinc.sincronizar()
+    sinc.start()
+    yield sinc
+    sinc.parar()
+    sinc.join(5)
+
+
+def valores(planilha, aba):
+    return planilha.worksheet(aba).get_all_values()
+
+
+def esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim, "tempo esgotado"
+        time.sleep(0.02)
+
+
+def test_sincronizacao_a_frio_copia_todas_as_abas(sinc):
+    assert sinc.espelho.vazio()
+    sinc.sincronizar()
+    assert not sinc.espelho.vazio()
+    df = sinc.espelho.ler_aba("Calendario_Eventos")
+    assert df["Nome do Evento"].tolist() == ["Culto", "Ensaio", "Portaria"]
+    assert df.index.tolist() == [0, 1, 2]  # linha da planilha - 2
+    assert sinc.espelho.ler_aba("Usuarios")["Email"].tolist() == ["a@x"]
+
+
+def test_escrita_local_e_enviada_e_confirmada(sinc, planilha):
+    sinc.sincronizar()
+    versao = sinc.espelho.versao()
+    i = sinc.espelho.atualizar_celula("Calendario_Eventos", 2, 4, "Bia Souza")
+    assert sinc.espelho.versao() > versao
+    assert sinc.espelho.ler_aba("Calendario_Eventos").loc[0, "Voluntário 1"] == "Bia Souza"
+    assert sinc.espelho.status_escritas([i])[i][0] == "pendente"
+    baixadas = planilha.chamadas["values_batch_get"]
+    sinc.sincronizar()
+    assert sinc.espelho.status_escritas([i]) == {i: ("ok", None)}
+    assert valores(planilha, "Calendario_Eventos")[1][3] == "Bia Souza"
+    assert planilha.chamadas["values_batch_get"] == baixadas  # a própria escrita não pede download
+
+
+def test_edicao_externa_e_detectada_e_mesclada(sinc, planilha):
+    sinc.sincronizar()
+    versao = sinc.espelho.versao()
+    sinc.sincronizar()
+    assert sinc.espelho.versao() == versao  # nada mudou: versão parada
+    planilha.worksheet("Calendario_Eventos").update_cell(4, 4, "Carlos Lima")
+    sinc.sincronizar()
+    assert sinc.espelho.versao() > versao
+    df = sinc.espelho.ler_aba("Calendario_Eventos")
+    assert df.loc[2, "Voluntário 1"] == "Carlos Lima"
+    assert df.loc[1, "Voluntário 1"] == "Ana Silva"
+
+
+def test_erro_4xx_no_lote_falha_so_a_escrita_culpada(sinc, planilha, monkeypatch):
+    sinc.sincronizar()
+    original = planilha.values_batch_update
+
+    def recusar_d3(body):
+        if any(d["range"].endswith("!D3:D3") for d in body["data"]):
+            raise gspread.exceptions.APIError(Resposta(400))
+        return original(body)
+
+    monkeypatch.setattr(planilha, "values_batch_update", recusar_d3)
+    ids = [sinc.espelho.atualizar_celula("Calendario_Eventos", linha, 4, f"Pessoa {linha}") for linha in (2, 3, 4)]
+    sinc.enviar_pendentes()
+    status = sinc.espelho.status_escritas(ids)
+    assert [status[i][0] for i in ids] == ["ok", "erro", "ok"]
+    assert [l[3] for l in valores(planilha, "Calendario_Eventos")[1:]] == ["Pessoa 2", "Ana Silva", "Pessoa 4"]
+    assert sinc.espelho.meta("recarga_pedida")  # a escrita abandonada pede uma recarga completa
+
+
+def test_escritas_pendentes_valem_por_cima_do_download(sinc, planilha):
+    sinc.sincronizar()
+    i = sinc.espelho.atualizar_celula("Calendario_Eventos", 3, 4, "Bia Souza")
+    for aba, v in sinc.baixar_abas().items():
+        sinc.espelho.mesclar_aba(aba, v)
+    assert sinc.espelho.ler_aba("Calendario_Eventos").loc[1, "Voluntário 1"] == "Bia Souza"
+    assert sinc.espelho.status_escritas([i])[i][0] == "pendente"
+    assert valores(planilha, "Calendario_Eventos")[2][3] == "Ana Silva"
+
+
+def test_acrescimo_gravado_apesar_do_erro_nao_e_repetido(sinc, planilha, monkeypatch):
+    sinc.sincronizar()
+    aba = planilha.worksheet("Usuarios")
+    original = aba.append_rows
+
+    def gravar_e_cair(linhas, **kwargs):
+        original(linhas, **kwargs)
+        raise requests.exceptions.ConnectionError("conexão caiu")
+
+    monkeypatch.setattr(aba, "append_rows", gravar_e_cair)
+    i = sinc.espelho.acrescentar_linha("Usuarios", ["b@x", "Bia Souza"])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        sinc.enviar_pendentes()
+    assert sinc.espelho.status_escritas([i])[i][0] == "pendente"
+    sinc.enviar_pendentes()
+    assert sinc.espelho.status_escritas([i])[i][0] == "ok"
+    assert valores(planilha, "Usuarios") == USUARIOS + [["b@x", "Bia Souza"]]
+    assert planilha.chamadas["append_rows"] == 1
+
+
+def test_escrita_com_valor_esperado_e_recusada_se_a_celula_mudou(sinc):
+    sinc.sincronizar()
+    versao = sinc.espelho.versao()
+    # Duas sessões viram a mesma vaga vazia: só a primeira entra
+    primeira = sinc.espelho.atualizar_celula("Calendario_Eventos", 2, 4, "Ana Silva", esperado="")
+    segunda = sinc.espelho.atualizar_celula("Calendario_Eventos", 2, 4, "Bia Souza", esperado="")
+    assert primeira is not None and segunda is None
+    assert sinc.espelho.versao() == versao + 1
+    assert sinc.espelho.ler_aba("Calendario_Eventos").loc[0, "Voluntário 1"] == "Ana Silva"
+    assert sinc.espelho.atualizar_celulas("Calendario_Eventos", [(3, 4, "", "Outra Pessoa"), (4, 4, "Bia Souza", "")]) == [None, primeira + 1]
+    assert sinc.espelho.total_pendentes() == 2
+
+
+def test_escrita_sobrescrita_na_fila_nao_e_confirmada(sinc, planilha):
+    sinc.sincronizar()
+    antes = sinc.espelho.atualizar_celula("Calendario_Eventos", 2, 4, "Ana Silva")
+    depois = sinc.espelho.atualizar_celula("Calendario_Eventos", 2, 4, "Bia Souza")
+    sinc.enviar_pendentes()
+    status = sinc.espelho.status_escritas([antes, depois])
+    assert status[antes][0] == "substituida" and status[depois] == ("ok", None)
+    assert valores(planilha, "Calendario_Eventos")[1][3] == "Bia Souza"
+
+
+def test_envio_entre_rodadas_nao_faz_a_rodada_seguinte_baixar_tudo(em_laco, planilha):
+    baixadas = planilha.chamadas["values_batch_get"]
+    for n in range(3):
+        rodada = em_laco.espelho.meta("sincronizado_em")
+        i = em_laco.espelho.atualizar_celula("Calendario_Eventos", 2, 4, f"Pessoa {n}")
+        em_laco.acordar()
+        esperar(lambda: em_laco.espelho.status_escritas([i])[i][0] == "ok")
+        assert em_laco.espelho.meta("sincronizado_em") == rodada  # foi enviada fora de uma rodada
+        esperar(lambda: em_laco.espelho.meta("sincronizado_em") != rodada)  # a rodada agendada seguinte
+    assert planilha.chamadas["values_batch_get"] == baixadas
+    assert valores(planilha, "Calendario_Eventos")[1][3] == "Pessoa 2"
+
+
+def test_envio_de_outro_processo_nao_faz_o_lider_baixar_tudo(sinc, planilha):
+    sinc.sincronizar()
+    outro = Sincronizador(EspelhoLocal(sinc.espelho.caminho), sinc.conexao)
+    i = outro.espelho.atualizar_celula("Calendario_Eventos", 2, 4, "Bia Souza")
+    outro.descarregar()
+    assert outro.espelho.status_escritas([i])[i][0] == "ok"
+    baixadas = planilha.chamadas["values_batch_get"]
+    sinc.sincronizar()
+    assert planilha.chamadas["values_batch_get"] == baixadas
+
+
+def test_edicao_de_fora_antes_de_um_envio_entre_rodadas_pede_recarga(sinc, planilha):
+    sinc.sincronizar()
+    planilha.worksheet("Calendario_Eventos").update_cell(4, 4, "Carlos Lima")
+    sinc.espelho.atualizar_celula("Calendario_Eventos", 2, 4, "Bia Souza")
+    sinc.descarregar()
+    assert sinc.espelho.meta("recarga_pedida")
+    sinc.sincronizar()
+    assert sinc.espelho.ler_aba("Calendario_Eventos").loc[2, "Voluntário 1"] == "Carlos Lima"
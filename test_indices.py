@@ -0,0 +1,78 @@
+# --- TESTES DO ÍNDICE DE CONFLITOS (faixas de horário que se cruzam) ---
+import pandas as pd
+import pytest
+
+import lote
+from elegibilidade import MotorElegibilidade
+from indices import IndiceConflitos
+from preparo import preparar_eventos
+
+NIVEIS = {"Nenhum": 0, "BAS": 1, "AV1": 2}
+CABECALHO = ["Data Específica", "Horario", "Nome do Evento", "Nível", "Departamento", "Tipo", "Obs", "Voluntário 1", "Voluntário 2"]
+
+
+def indice(*linhas):
+    df = preparar_eventos(pd.DataFrame([list(l) for l in linhas], columns=CABECALHO), NIVEIS)
+    return IndiceConflitos().atualizar(df, 1)
+
+
+def evento(horario, voluntario="Ana Silva", data="12/10/2026", nome="Culto"):
+    return [data, horario, nome, "BAS", "Som", "", "", voluntario, ""]
+
+
+@pytest.mark.parametrize("horario, esperado", [
+    ("09:00-11:00", (540.0, 660.0)),
+    ("19h às 21h30", (1140.0, 1290.0)),
+    ("8h", (480.0, 481.0)),  # só o início: vale o minuto de início
+    ("22:00-01:00", (1320.0, 1500.0)),  # passa da meia-noite
+    ("A combinar", None),
+    ("", None),
+])
+def test_faixa_do_horario(horario, esperado):
+    assert IndiceConflitos().faixa(horario) == esperado
+
+
+def test_faixas_que_so_se_encostam_nao_conflitam():
+    i = indice(evento("09:00-10:00"))
+    assert i.conflito("12/10/2026", "10:00-11:00", "Ana Silva") is None
+    assert i.conflito("12/10/2026", "08:00-09:00", "Ana Silva") is None
+    assert i.conflito("12/10/2026", "09:59-10:30", "Ana Silva")["Nome do Evento"] == "Culto"
+    assert i.conflito("12/10/2026", "08:00-12:00", "ANA SILVA ")["Horario"] == "09:00-10:00"
+
+
+def test_horario_sem_hora_so_conflita_com_o_mesmo_texto():
+    i = indice(evento("A combinar"), evento("09:00-11:00", data="13/10/2026"))
+    assert i.conflito("12/10/2026", "A combinar", "Ana Silva")["Nome do Evento"] == "Culto"
+    assert i.conflito("12/10/2026", "09:00-11:00", "Ana Silva") is None
+    assert i.conflito("13/10/2026", "A combinar", "Ana Silva") is None
+    assert not i.cruzam("A combinar", "09:00-11:00") and i.cruzam("A combinar", "A combinar")
+
+
+def test_faixa_que_passa_da_meia_noite():
+    i = indice(evento("22:00-01:00"))
+    assert i.conflito("12/10/2026", "23:30-23:45", "Ana Silva")["Nome do Evento"] == "Culto"
+    assert i.conflito("12/10/2026", "00:30-01:00", "Ana Silva") is None  # madrugada da mesma data vem antes
+    assert i.conflito("13/10/2026", "00:30-01:00", "Ana Silva") is None  # outra data, outra agenda
+
+
+def test_liberar_e_ocupar_mantem_a_agenda_e_a_carga_semanal():
+    i = indice(evento("09:00-11:00"), evento("19:00-21:00", data="14/10/2026"))
+    row = {'Data Específica': "12/10/2026", 'Horario': "09:00-11:00", 'Nome do Evento': "Culto", 'Departamento': "Som"}
+    assert i.carga_semanal("Ana Silva", pd.Timestamp("2026-10-15")) == 2
+    i.liberar(row, "Ana Silva", 1, 2)
+    assert i.versao == 2 and i.conflito("12/10/2026", "10:00-12:00", "Ana Silva") is None
+    assert i.carga_semanal("Ana Silva", pd.Timestamp("2026-10-15")) == 1
+    i.ocupar(row, "Bia Souza", 2, 3)
+    assert i.conflito("12/10/2026", "10:00-12:00", "Bia Souza")["Nome do Evento"] == "Culto"
+    i.ocupar(row, "Caio Lima", 5, 6)  # a versão pulou: o índice não finge estar em dia
+    assert i.versao == 3
+
+
+def test_conflitos_dentro_do_mesmo_lote():
+    df = preparar_eventos(pd.DataFrame([evento("09:00-11:00", "", nome="Culto"), evento("10:00-12:00", "", nome="Portaria"),
+                                        evento("11:00-12:00", "", nome="Ensaio")], columns=CABECALHO), NIVEIS)
+    motor = MotorElegibilidade(pd.DataFrame([["ana@x", "Ana Silva", "1", "Som", "AV1"]], columns=lote.CAMPOS_USUARIO), NIVEIS)
+    plano = lote.planejar_inscricao(lote.vagas(df), "Ana Silva", motor, IndiceConflitos().atualizar(df, 1))
+    # Culto (V1, V2), Portaria (V1, V2), Ensaio (V1, V2): só entram o Culto e o Ensaio, uma vaga cada
+    ocupada = "já tem atividade neste horário"
+    assert plano['motivo'].tolist() == ["", ocupada, ocupada, ocupada, "", ocupada]
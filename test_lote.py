@@ -0,0 +1,84 @@
+# --- TESTES DAS AÇÕES EM LOTE (lote.py) ---
+import pandas as pd
+import pytest
+
+import lote
+from elegibilidade import MotorElegibilidade
+from indices import IndiceConflitos
+from preparo import preparar_eventos
+
+NIVEIS = {"Nenhum": 0, "BAS": 1, "AV1": 2, "AV2": 3}
+CABECALHO = ["Data Específica", "Horario", "Nome do Evento", "Nível", "Departamento", "Tipo", "Obs", "Voluntário 1", "Voluntário 2"]
+
+
+def eventos(*linhas):
+    return preparar_eventos(pd.DataFrame([list(l) for l in linhas], columns=CABECALHO), NIVEIS)
+
+
+def usuarios(*linhas):
+    return pd.DataFrame([list(l) for l in linhas], columns=lote.CAMPOS_USUARIO)
+
+
+@pytest.fixture
+def df_us():
+    return usuarios(["ana@x", "Ana Silva", "1", "Som", "AV1"],
+                    ["bia@x", "Bia Souza", "1", "Som,Recepção", "BAS"],
+                    ["caio@x", "Caio Lima", "1", "Recepção", "AV2"])
+
+
+@pytest.fixture
+def motor(df_us):
+    return MotorElegibilidade(df_us, NIVEIS)
+
+
+def indice_de(df_ev):
+    return IndiceConflitos().atualizar(df_ev, 1)
+
+
+def test_validar_barra_vaga_que_mudou_desde_o_plano(motor):
+    antes = eventos(["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "", ""],
+                    ["12/10/2026", "14:00-16:00", "Ensaio", "BAS", "Som", "", "", "", ""])
+    plano = lote.planejar_inscricao(lote.vagas(antes).iloc[[0, 2]], "Ana Silva", motor, indice_de(antes))
+    assert plano['motivo'].tolist() == ["", ""]
+    # Outra sessão preencheu a primeira vaga depois que o plano foi montado
+    depois = eventos(["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "Bia Souza", ""],
+                     ["12/10/2026", "14:00-16:00", "Ensaio", "BAS", "Som", "", "", "", ""])
+    conferido = lote.validar(plano, depois, motor, indice_de(depois))
+    assert conferido['motivo'].tolist() == ["a vaga mudou desde que o plano foi montado", ""]
+
+
+def test_validar_barra_quem_passou_a_ter_conflito(motor):
+    antes = eventos(["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "", ""],
+                    ["12/10/2026", "10:00-12:00", "Portaria", "BAS", "Recepção", "", "", "", ""])
+    plano = lote.planejar_inscricao(lote.vagas(antes).iloc[[0]], "Bia Souza", motor, indice_de(antes))
+    depois = eventos(["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "", ""],
+                     ["12/10/2026", "10:00-12:00", "Portaria", "BAS", "Recepção", "", "", "Bia Souza", ""])
+    assert lote.validar(plano, depois, motor, indice_de(depois))['motivo'].tolist() == ["já tem atividade neste horário"]
+
+
+def test_validar_limpeza_so_confere_a_celula(motor):
+    df = eventos(["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "Ana Silva", "Bia Souza"])
+    plano = lote.planejar_limpeza(lote.vagas(df))
+    depois = eventos(["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "Ana Silva", ""])
+    assert lote.validar(plano, depois, motor, indice_de(depois))['motivo'].tolist() == ["", "a vaga mudou desde que o plano foi montado"]
+
+
+def test_validar_usuarios_da_um_motivo_por_linha(df_us):
+    csv = pd.DataFrame([[" Nova@X ", "Nova Pessoa", "11", "Som, Recepção", "BAS"],
+                        ["", "Sem Email", "", "Som", "BAS"],
+                        ["semarroba", "Fulano", "", "Som", "BAS"],
+                        ["ANA@x", "Ana Silva", "", "Som", "AV1"],
+                        ["nova@x", "Nova de Novo", "", "Som", "BAS"],
+                        ["sem.nome@x", "", "", "Som", "BAS"],
+                        ["nivel@x", "Nível Errado", "", "Som", "AV9"],
+                        ["sem.depto@x", "Sem Depto", "", " , ", "BAS"],
+                        ["fora@x", "De Fora", "", "Som,Louvor,Mídia", "BAS"]], columns=lote.CAMPOS_USUARIO)
+    r = lote.validar_usuarios(csv, df_us, ["Som", "Recepção"], list(NIVEIS))
+    assert r['motivo'].tolist() == ["", "sem e-mail", "e-mail inválido", "já cadastrado", "repetido no arquivo", "sem nome",
+                                    "nível inválido", "sem departamento", "departamento fora da sua gestão: Louvor, Mídia"]
+    assert r.loc[0, ['Email', 'Departamentos']].tolist() == ["nova@x", "Som,Recepção"]
+
+
+def test_validar_usuarios_exige_as_colunas(df_us):
+    with pytest.raises(ValueError, match="Telefone, Nivel"):
+        lote.validar_usuarios(pd.DataFrame(columns=["Email", "Nome", "Departamentos"]), df_us, ["Som"], list(NIVEIS))
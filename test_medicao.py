@@ -0,0 +1,23 @@
+# --- TESTES DO REGISTRO DE MEDIÇÃO (medicao.py) ---
+import io
+import json
+import logging
+
+import medicao
+
+
+def test_registro_do_rerun_sai_no_log():
+    saida = io.StringIO()
+    handler = next(h for h in medicao.log.handlers if type(h) is logging.StreamHandler)
+    anterior = handler.setStream(saida)
+    try:
+        med = medicao.iniciar("teste")
+        with med.etapa("carregar"):
+            medicao.falta("load_data_cached")
+        med.concluir("login")
+    finally:
+        handler.setStream(anterior)
+    registro = json.loads(saida.getvalue().split(" escala.medicao ", 1)[1])
+    assert registro["app"] == "teste" and registro["tela"] == "login"
+    assert registro["etapas"][0]["etapa"] == "carregar"
+    assert registro["cache"] == {"load_data_cached": "falta"}
@@ -0,0 +1,86 @@
+# --- TESTES DO QUADRO DE EVENTOS REMENDADO (preparo.QuadroEventos) ---
+import pandas as pd
+import pytest
+
+from espelho import EspelhoLocal
+from indices import IndiceConflitos, IndiceDatas
+from preparo import QuadroEventos, preparar_eventos
+from responsaveis import IndiceDias
+
+NIVEIS = {"Nenhum": 0, "BAS": 1, "AV1": 2}
+EVENTOS = [["Data Específica", "Horario", "Nome do Evento", "Nível", "Departamento", "Tipo", "Obs", "Voluntário 1", "Voluntário 2"],
+           ["12/10/2026", "09:00-11:00", "Culto", "BAS", "Som", "", "", "Ana Silva", ""],
+           ["12/10/2026", "10:00-12:00", "Portaria", "BAS", "Recepção", "", "", "", ""],
+           ["13/10/2026", "19:00-21:00", "Ensaio", "AV1", "Som", "", "", "Ana Silva", "Bia Souza"],
+           ["14/10/2026", "19:00-21:00", "Culto", "BAS", "Recepção", "", "", "", ""]]
+
+
+@pytest.fixture
+def espelho(tmp_path):
+    espelho = EspelhoLocal(str(tmp_path / "espelho.db"))
+    espelho.mesclar_aba("Calendario_Eventos", EVENTOS)
+    return espelho
+
+
+def montar(df, versao, mudanca=None, indices=None):
+    indices = indices or (IndiceConflitos(), IndiceDatas(), IndiceDias("atividade"), IndiceDias("departamento"))
+    for indice in indices:
+        indice.atualizar(df, versao, mudanca)
+    return indices
+
+
+def test_escrita_de_voluntario_remenda_o_quadro_e_os_indices(espelho):
+    quadro = QuadroEventos(NIVEIS)
+    antes = espelho.versao()
+    indices = montar(quadro.atualizar(espelho, antes), antes)
+    espelho.atualizar_celula("Calendario_Eventos", 3, 8, "Bia Souza")
+    espelho.atualizar_celulas("Calendario_Eventos", [(2, 8, ""), (4, 9, "")])
+    versao = espelho.versao()
+    df = quadro.atualizar(espelho, versao)
+    assert quadro.mudanca is not None and quadro.mudanca[:2] == (antes, versao)
+    completo = preparar_eventos(espelho.ler_aba("Calendario_Eventos"), NIVEIS)
+    pd.testing.assert_frame_equal(df, completo)
+    conflitos, datas, dias, deptos = montar(df, versao, quadro.mudanca, indices)
+    novos = montar(completo, versao)
+    assert conflitos.versao == versao
+    assert conflitos.conflito("12/10/2026", "09:30-10:30", "Bia Souza")["Nome do Evento"] == "Portaria"
+    assert conflitos.conflito("12/10/2026", "09:30-10:30", "Ana Silva") is None
+    assert conflitos.carga_semanal("Ana Silva", pd.Timestamp("2026-10-13")) == novos[0].carga_semanal("Ana Silva", pd.Timestamp("2026-10-13")) == 1
+    assert dias._html == novos[2]._html and dias._vagas == novos[2]._vagas
+    assert deptos._html == novos[3]._html
+    assert datas.posicoes(departamentos=["Som"]).tolist() == novos[1].posicoes(departamentos=["Som"]).tolist()
+
+
+def test_mesma_pessoa_em_duas_atividades_do_horario_continua_ocupada(espelho):
+    espelho.atualizar_celula("Calendario_Eventos", 3, 9, "Ana Silva")  # Ana no Culto (09-11) e na Portaria (10-12)
+    quadro = QuadroEventos(NIVEIS)
+    conflitos, *_ = montar(quadro.atualizar(espelho, espelho.versao()), espelho.versao())
+    espelho.atualizar_celula("Calendario_Eventos", 2, 8, "")
+    versao = espelho.versao()
+    conflitos.atualizar(quadro.atualizar(espelho, versao), versao, quadro.mudanca)
+    assert conflitos.versao == versao
+    assert conflitos.conflito("12/10/2026", "11:00-12:00", "Ana Silva")["Nome do Evento"] == "Portaria"
+
+
+def test_mudanca_de_data_ou_categoria_nova_prepara_tudo(espelho):
+    quadro = QuadroEventos(NIVEIS)
+    quadro.atualizar(espelho, espelho.versao())
+    espelho.atualizar_celula("Calendario_Eventos", 5, 1, "11/10/2026")
+    df = quadro.atualizar(espelho, espelho.versao())
+    assert quadro.mudanca is None
+    assert df["Nome do Evento"].tolist()[0] == "Culto" and df.index[0] == 3  # a linha foi para o começo
+    espelho.atualizar_celula("Calendario_Eventos", 2, 5, "Louvor")
+    df = quadro.atualizar(espelho, espelho.versao())
+    assert quadro.mudanca is None and "Louvor" in df["Departamento"].cat.categories
+
+
+def test_versao_sem_mudanca_nos_eventos_so_avanca_os_indices(espelho):
+    quadro = QuadroEventos(NIVEIS)
+    antes = espelho.versao()
+    df = quadro.atualizar(espelho, antes)
+    indices = montar(df, antes)
+    espelho.mesclar_aba("Usuarios", [["Email", "Nome"], ["a@x", "Ana Silva"]])
+    versao = espelho.versao()
+    assert quadro.atualizar(espelho, versao) is df
+    assert [i.versao for i in montar(df, versao, quadro.mudanca, indices)] == [versao] * 4
+    assert indices[2].html(pd.Timestamp("2026-10-12").date()) != ""